@@ -18,6 +18,7 @@ from prompts import (
 from tooldescriptions import (
     TWITTER_REPLY_CHECK_DESCRIPTION,
     TWITTER_ADD_REPLIED_DESCRIPTION,
+    TWITTER_FILTER_UNREPLIED_DESCRIPTION,
     TWITTER_REPOST_CHECK_DESCRIPTION,
     TWITTER_ADD_REPOSTED_DESCRIPTION,
     TWITTER_KNOWLEDGE_BASE_DESCRIPTION,
@@ -73,7 +74,7 @@ from twitter_agent.custom_twitter_actions import (
     create_get_user_tweets_tool,
     create_retweet_tool
 )
-from twitter_agent.twitter_state import TwitterState, MENTION_CHECK_INTERVAL, MAX_MENTIONS_PER_INTERVAL
+from twitter_agent.twitter_state import TwitterState, MENTION_CHECK_INTERVAL
 from twitter_agent.twitter_knowledge_base import TweetKnowledgeBase, update_knowledge_base
 
 from github_agent.custom_github_actions import GitHubAPIWrapper, create_evaluate_profiles_tool
@@ -89,6 +90,8 @@ from utils import (
     format_ai_message_content
 )
 from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase
+from kb_core.embeddings import get_embedding_registry_stats
+from kb_core.refresher import get_refresher, refresh_error
 
 async def generate_llm_podcast_query(llm: ChatAnthropic = None) -> str:
     """
@@ -290,7 +293,8 @@ def create_agent_tools(llm, knowledge_base, podcast_knowledge_base, agent_kit, c
         tools.append(Tool(
             name="query_twitter_knowledge_base",
             description=TWITTER_KNOWLEDGE_BASE_DESCRIPTION,
-            func=lambda query: knowledge_base.query_knowledge_base(query)
+            func=lambda query: knowledge_base.query_knowledge_base(query),
+            coroutine=knowledge_base.aquery_knowledge_base
         ))
 
     # Add Twitter State Management Tools if enabled
@@ -306,6 +310,13 @@ def create_agent_tools(llm, knowledge_base, podcast_knowledge_base, agent_kit, c
                 name="add_replied_to",
                 func=twitter_state.add_replied_tweet,
                 description=TWITTER_ADD_REPLIED_DESCRIPTION
+            ),
+            Tool(
+                name="filter_unreplied",
+                func=lambda tweet_ids: ", ".join(twitter_state.filter_unreplied(
+                    tweet_id.strip() for tweet_id in tweet_ids.split(",") if tweet_id.strip()
+                )) or "No unreplied tweets",
+                description=TWITTER_FILTER_UNREPLIED_DESCRIPTION
             )
         ])
 
@@ -346,11 +357,17 @@ def create_agent_tools(llm, knowledge_base, podcast_knowledge_base, agent_kit, c
 
     # Add Podcast Knowledge Base Tools if enabled
     if os.getenv("USE_PODCAST_KNOWLEDGE_BASE", "true").lower() == "true" and podcast_knowledge_base is not None:
+        async def aquery_podcast_knowledge_base(query: str) -> str:
+            return podcast_knowledge_base.format_query_results(
+                await podcast_knowledge_base.aquery_knowledge_base(query)
+            )
+
         tools.append(Tool(
             name="query_podcast_knowledge_base",
             func=lambda query: podcast_knowledge_base.format_query_results(
                 podcast_knowledge_base.query_knowledge_base(query)
             ),
+            coroutine=aquery_podcast_knowledge_base,
             description=PODCAST_KNOWLEDGE_BASE_DESCRIPTION
         ))
     
@@ -424,6 +441,8 @@ async def initialize_agent():
         print_system("Initializing knowledge bases...")
         knowledge_base = None
         podcast_knowledge_base = None
+        refresher = get_refresher()
+        twitter_refreshed = False
 
         # Configure Coinbase AgentKit first
         print_system("Initializing Coinbase AgentKit...")
@@ -522,11 +541,14 @@ async def initialize_agent():
                     
                     try:
                         print_system("\n=== Updating Knowledge Base ===")
-                        await update_knowledge_base(
+                        refresh_report = await update_knowledge_base(
                             twitter_client=twitter_client,
                             knowledge_base=knowledge_base,
                             kol_list=kol_list
                         )
+                        print_system(f"Knowledge base refresh report: {refresh_report}")
+                        # A failed startup refresh is retried by the background job right away
+                        twitter_refreshed = refresh_error(refresh_report) is None
                         stats = knowledge_base.get_collection_stats()
                         print_system(f"Updated knowledge base stats: {stats}")
                     except Exception as e:
@@ -539,6 +561,18 @@ async def initialize_agent():
                             print_error(json.dumps(kol_list[:2], indent=2))
                         import traceback
                         print_error(f"Full error traceback:\n{traceback.format_exc()}")
+                
+                # Keep topping up the KB in the background for the rest of the session
+                refresher.add_job(
+                    "twitter_knowledge_base",
+                    lambda: update_knowledge_base(
+                        twitter_client=twitter_client,
+                        knowledge_base=knowledge_base,
+                        kol_list=config['character'].get('kol_list', [])
+                    ),
+                    data_timestamp=lambda: knowledge_base.manifest.get_stats()["latest_ts"],
+                    refreshed_now=twitter_refreshed
+                )
             except Exception as e:
                 print_error(f"Error initializing Twitter knowledge base: {e}")
 
@@ -559,7 +593,7 @@ async def initialize_agent():
                 print_system(f"Current podcast knowledge base stats: {stats}")
                 
                 print_system("Checking for new podcast transcripts...")
-                podcast_knowledge_base.process_all_json_files()
+                ingestion_report = podcast_knowledge_base.process_all_json_files()
                 
                 # Get updated stats
                 new_stats = podcast_knowledge_base.get_collection_stats()
@@ -569,10 +603,22 @@ async def initialize_agent():
                     print_system(f"Added {new_stats['count'] - stats['count']} new segments to the knowledge base")
                 else:
                     print_system("No new segments were added to the knowledge base")
+                
+                # Pick up new transcripts in the background for the rest of the session
+                refresher.add_job(
+                    "podcast_knowledge_base",
+                    podcast_knowledge_base.process_all_json_files,
+                    data_timestamp=lambda: podcast_knowledge_base.manifest.get_stats()["latest_ts"],
+                    refreshed_now=refresh_error(ingestion_report) is None
+                )
                     
             except Exception as e:
                 print_error(f"Error initializing Podcast knowledge base: {e}")
 
+        if knowledge_base is not None or podcast_knowledge_base is not None:
+            print_system(f"Embedding model registry stats: {get_embedding_registry_stats()}")
+            refresher.start()
+
         # Create tools using the helper function
         tools = create_agent_tools(llm, knowledge_base, podcast_knowledge_base, agent_kit, config)
 
@@ -657,6 +703,7 @@ async def run_chat_mode(agent_executor, config, runnable_config):
     print_system("Commands:")
     print_system("  exit     - Exit the chat")
     print_system("  status   - Check if agent is responsive")
+    print_system("  kbstatus - Show knowledge base refresh times and lag")
     
     # Create the runnable config with required keys
     runnable_config = RunnableConfig(
@@ -671,7 +718,8 @@ async def run_chat_mode(agent_executor, config, runnable_config):
     while True:
         try:
             prompt = f"{Colors.BLUE}{Colors.BOLD}User: {Colors.ENDC}"
-            user_input = input(prompt)
+            # Read input off the event loop so background KB refreshes keep running while we wait
+            user_input = await asyncio.to_thread(input, prompt)
             
             if not user_input:
                 continue
@@ -681,6 +729,9 @@ async def run_chat_mode(agent_executor, config, runnable_config):
             elif user_input.lower() == "status":
                 print_system("Agent is responsive and ready for commands.")
                 continue
+            elif user_input.lower() == "kbstatus":
+                print_system(json.dumps(get_refresher().metrics(), indent=2, default=str))
+                continue
             
             print_system(f"\nStarted at: {datetime.now().strftime('%H:%M:%S')}")
             
@@ -731,6 +782,11 @@ async def run_twitter_automation(agent_executor, config, runnable_config):
                     await asyncio.sleep(wait_time)
                     continue
 
+            if not twitter_state.update_rate_limit():
+                print_system(f"Mention budget spent for this window; waiting {MENTION_CHECK_INTERVAL} seconds...")
+                await asyncio.sleep(MENTION_CHECK_INTERVAL)
+                continue
+
             # Update last_check_time at the start of each check
             twitter_state.last_check_time = datetime.now()
             twitter_state.save()
@@ -843,7 +899,7 @@ async def run_twitter_automation(agent_executor, config, runnable_config):
             - Determine the sentiment (positive, neutral, negative) of the mention
 
             2. Determine reply appropriateness:
-            - Check if you've already responded using has_replied_to()
+            - Check if you've already responded using has_replied_to(), or filter_unreplied() for a batch of mentions
             - Assess if the mention requires a response based on its content and relevance
             - Explain your decision to reply or not
 
@@ -960,6 +1016,12 @@ async def run_twitter_automation(agent_executor, config, runnable_config):
                     print_system(chunk["tools"]["messages"][0].content)
                 print_system("-------------------")
 
+            for name, metrics in get_refresher().metrics().items():
+                print_system(
+                    f"Knowledge base '{name}': last refresh {metrics['last_success']}, "
+                    f"lag {metrics['lag_seconds']}s, newest data {metrics['data_lag_seconds']}s old"
+                    + (" (STALE)" if metrics["stale"] else "")
+                )
             print_system(f"Completed cycle. Waiting {MENTION_CHECK_INTERVAL/60} minutes before next check...")
             await asyncio.sleep(MENTION_CHECK_INTERVAL)
 
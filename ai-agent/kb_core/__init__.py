@@ -0,0 +1,38 @@
+"""Shared building blocks for the Twitter and podcast knowledge bases."""
+
+from kb_core.embedding_cache import EmbeddingCache, get_embedding_cache
+from kb_core.embeddings import (
+    DEFAULT_EMBEDDING_BACKEND,
+    DEFAULT_EMBEDDING_MODEL,
+    EMBEDDING_BACKENDS,
+    EmbeddingModelRegistry,
+    SharedEmbeddingFunction,
+    embedding_registry,
+    get_embedding_function,
+    get_embedding_model,
+    get_embedding_registry_stats,
+)
+from kb_core.executor import get_query_executor, run_in_query_executor
+from kb_core.refresher import KnowledgeBaseRefresher, get_refresher
+from kb_core.rerank import DEFAULT_RERANK_MODEL, CrossEncoderReranker, get_reranker
+
+__all__ = [
+    "CrossEncoderReranker",
+    "DEFAULT_EMBEDDING_BACKEND",
+    "DEFAULT_EMBEDDING_MODEL",
+    "DEFAULT_RERANK_MODEL",
+    "EMBEDDING_BACKENDS",
+    "EmbeddingCache",
+    "EmbeddingModelRegistry",
+    "KnowledgeBaseRefresher",
+    "SharedEmbeddingFunction",
+    "embedding_registry",
+    "get_embedding_cache",
+    "get_embedding_function",
+    "get_embedding_model",
+    "get_embedding_registry_stats",
+    "get_query_executor",
+    "get_refresher",
+    "get_reranker",
+    "run_in_query_executor",
+]
@@ -0,0 +1,105 @@
+"""Compare embedding backends on throughput and agreement with the fp32 baseline.
+
+Usage:
+    python -m kb_core.backend_benchmark --backends torch torch-int8 onnx onnx-int8 --limit 512
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# Allow running from the ai-agent directory without installing anything
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_core.embeddings import DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKENDS, embedding_registry
+from utils import print_error, print_system
+
+
+def load_sentences(directory: str, limit: int) -> List[str]:
+    """Load transcript sentences from directory, falling back to synthetic text."""
+    sentences = []
+    if os.path.isdir(directory):
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            with open(os.path.join(directory, file_name), 'r', encoding='utf-8') as f:
+                sentences.extend(entry['content'] for entry in json.load(f) if entry.get('content'))
+            if len(sentences) >= limit:
+                break
+    if not sentences:
+        print_system(f"No transcripts found in {directory}, using synthetic sentences")
+        sentences = [
+            f"Episode {i} discussed rollups, restaking and {i % 7} new gaming launches on Ronin."
+            for i in range(limit)
+        ]
+    return sentences[:limit]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def run_benchmark(backends: List[str], sentences: List[str], model_name: str, batch_size: int) -> Dict:
+    """Encode sentences with every backend and compare against torch fp32."""
+    report = {"model": model_name, "sentences": len(sentences), "batch_size": batch_size, "backends": {}}
+    baseline = None
+    # The baseline always runs first so every other backend can be compared against it
+    ordered = ["torch"] + [backend for backend in backends if backend != "torch"]
+
+    for backend in ordered:
+        try:
+            model = embedding_registry.get(model_name, backend)
+        except Exception as e:
+            print_error(f"Could not load backend '{backend}': {e}")
+            report["backends"][backend] = {"error": str(e)}
+            continue
+
+        model.encode(sentences[:batch_size], batch_size=batch_size)  # warm-up
+        start = time.perf_counter()
+        vectors = np.asarray(model.encode(sentences, batch_size=batch_size), dtype=np.float32)
+        elapsed = time.perf_counter() - start
+
+        result = {
+            "sentences_per_second": round(len(sentences) / elapsed, 1),
+            "dimension": int(vectors.shape[1]),
+        }
+        if baseline is None:
+            baseline = _normalize(vectors)
+        else:
+            cosines = np.sum(baseline * _normalize(vectors), axis=1)
+            result["cosine_mean"] = round(float(cosines.mean()), 5)
+            result["cosine_min"] = round(float(cosines.min()), 5)
+        report["backends"][backend] = result
+        print_system(f"{backend}: {result}")
+
+    report["load_stats"] = embedding_registry.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--directory", default="jsonoutputs")
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", help="Optional path to write the JSON report to")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.directory, args.limit)
+    report = run_benchmark(args.backends, sentences, args.model, args.batch_size)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Recall, latency, throughput and memory benchmark for knowledge base configurations.
+
+Every configuration is ingested into its own throwaway Chroma directory and queried
+with a labeled query set: spans of transcript text whose source entry is known, and
+keyword subsets of synthetic tweets whose ID is known.
+
+Usage:
+    python -m kb_core.benchmark --chunk-tokens 0 256 --modes vector hybrid --tweets 2000 --output kb_benchmark.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Allow running from the ai-agent directory without installing anything
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_core.embeddings import DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKENDS, embedding_registry
+from kb_core.index import IndexSettings
+from kb_core.lexical import STOPWORDS
+from utils import print_error, print_system
+
+K_VALUES = (1, 5, 10)
+
+_ENTITIES = [
+    "Ronin", "Axie", "EigenLayer", "Base", "Solana", "Arbitrum", "Optimism", "Hyperbolic", "Pixels", "Lido",
+    "Celestia", "Polygon", "Avalanche", "Starknet", "zkSync", "Farcaster", "Uniswap", "Aave", "Pendle", "Blast",
+]
+_TOPICS = [
+    "restaking yields", "rollup fees", "daily active users", "token unlocks", "validator rewards", "GPU rentals",
+    "airdrop farming", "bridge security", "player retention", "sequencer decentralization", "data availability",
+    "stablecoin flows", "governance votes", "gas sponsorship", "account abstraction", "creator royalties",
+    "liquidity incentives", "node operators", "inference pricing", "mobile onboarding",
+]
+_TEMPLATES = [
+    "{entity} just shipped an upgrade focused on {topic} and saw {number} percent more activity",
+    "Honestly the {topic} story on {entity} is underrated, {number} teams are building there now",
+    "We talked with the {entity} founders about {topic} and why {number} is the number to watch",
+    "Hot take: {topic} decides whether {entity} keeps its {number} thousand users next quarter",
+    "Thread on {entity} {topic}: what changed after {number} days and what comes next",
+]
+
+
+def _synthetic_sentence(rng: random.Random) -> str:
+    return rng.choice(_TEMPLATES).format(
+        entity=rng.choice(_ENTITIES), topic=rng.choice(_TOPICS), number=rng.randint(2, 999)
+    )
+
+
+def write_synthetic_transcripts(directory: str, files: int, entries_per_file: int, seed: int):
+    """Write synthetic speaker-turn transcripts in the geminivideo output format."""
+    rng = random.Random(seed)
+    speakers = ["Jeff", "Aleksander", "Host", "Guest"]
+    for file_index in range(files):
+        entries = [
+            {"speaker": rng.choice(speakers), "content": " ".join(_synthetic_sentence(rng) for _ in range(rng.randint(1, 4)))}
+            for _ in range(entries_per_file)
+        ]
+        with open(os.path.join(directory, f"synthetic_{file_index}.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+
+
+def build_podcast_queries(directory: str, count: int, seed: int, query_words: int = 8) -> List[Dict]:
+    """Sample word spans from transcript entries as queries labeled with their source entry."""
+    rng = random.Random(seed)
+    transcripts = {}
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            file_path = os.path.join(directory, file_name)
+            with open(file_path, "r", encoding="utf-8") as f:
+                transcripts[file_path] = json.load(f)
+
+    candidates = [
+        (file_path, index, entry["content"].split())
+        for file_path, entries in transcripts.items()
+        for index, entry in enumerate(entries)
+        if len(entry.get("content", "").split()) >= query_words
+    ]
+    queries = []
+    for file_path, index, words in rng.sample(candidates, min(count, len(candidates))):
+        start = rng.randint(0, len(words) - query_words)
+        queries.append({
+            "query": " ".join(words[start:start + query_words]),
+            "source_file": file_path,
+            "entry_index": index,
+        })
+    return queries
+
+
+def build_synthetic_tweets(count: int, seed: int) -> List[Dict]:
+    """Generate a synthetic tweet corpus with distinct texts."""
+    rng = random.Random(seed)
+    start_ts = time.time() - 30 * 86400
+    return [
+        {
+            "id": str(10 ** 12 + i),
+            "text": f"{_synthetic_sentence(rng)} #{rng.choice(_ENTITIES).lower()}{i}",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start_ts + rng.uniform(0, 30 * 86400))),
+            "author_id": str(rng.randint(1, 50)),
+        }
+        for i in range(count)
+    ]
+
+
+def build_tweet_queries(tweets: List[Dict], count: int, seed: int, query_words: int = 6) -> List[Dict]:
+    """Use an in-order subset of each sampled tweet's content words as its query."""
+    rng = random.Random(seed)
+    queries = []
+    for tweet in rng.sample(tweets, min(count, len(tweets))):
+        words = [word for word in tweet["text"].split() if word.lower() not in STOPWORDS]
+        picked = sorted(rng.sample(range(len(words)), min(query_words, len(words))))
+        queries.append({"query": " ".join(words[i] for i in picked), "tweet_id": tweet["id"]})
+    return queries
+
+
+def evaluate(run_query: Callable[[str, int], List[Dict]], queries: List[Dict],
+             is_relevant: Callable[[Dict, Dict], bool]) -> Dict:
+    """Run queries and report recall@k, MRR and latency percentiles."""
+    k_max = max(K_VALUES)
+    if queries:
+        run_query(queries[0]["query"], k_max)  # warm-up, keeps model loading out of the latency numbers
+
+    ranks, latencies = [], []
+    for labeled in queries:
+        start = time.perf_counter()
+        results = run_query(labeled["query"], k_max)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(next((pos + 1 for pos, result in enumerate(results) if is_relevant(labeled, result)), None))
+
+    if not queries:
+        return {"queries": 0}
+    report = {"queries": len(queries)}
+    for k in K_VALUES:
+        report[f"recall@{k}"] = round(sum(1 for rank in ranks if rank is not None and rank <= k) / len(ranks), 4)
+    report[f"mrr@{k_max}"] = round(sum(1 / rank for rank in ranks if rank is not None) / len(ranks), 4)
+    report["latency_ms_p50"] = round(float(np.percentile(latencies, 50)), 2)
+    report["latency_ms_p99"] = round(float(np.percentile(latencies, 99)), 2)
+    return report
+
+
+def _podcast_hit(labeled: Dict, result: Dict) -> bool:
+    metadata = result["metadata"]
+    start = metadata.get("start_index")
+    end = metadata.get("end_index", start)
+    return (
+        os.path.basename(metadata.get("source_file", "")) == os.path.basename(labeled["source_file"])
+        and start is not None and start <= labeled["entry_index"] <= end
+    )
+
+
+def _tweet_hit(labeled: Dict, result: Dict) -> bool:
+    source_ids = result["metadata"].get("source_tweet_ids") or result.get("id", "")
+    return labeled["tweet_id"] in source_ids.split(",")
+
+
+def _rss_mb() -> float:
+    return embedding_registry.stats()["process_rss_mb"]
+
+
+def benchmark_podcast(directory: str, queries: List[Dict], model: str, backend: str, chunk_tokens: int,
+                      modes: List[str], rerank: bool, index_settings: IndexSettings) -> Dict:
+    """Ingest directory into a fresh podcast KB and evaluate every retrieval mode."""
+    from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase
+
+    persist_path = tempfile.mkdtemp(prefix="kb_bench_")
+    try:
+        rss_before = _rss_mb()
+        kb = PodcastKnowledgeBase(
+            embedding_model_name=model, embedding_backend=backend, chunk_tokens=chunk_tokens,
+            persist_path=persist_path, index_settings=index_settings
+        )
+        ingestion = kb.process_all_json_files(directory) or {}
+        retrieval = {}
+        for mode, use_rerank in itertools.product(modes, [False, True] if rerank else [False]):
+            name = f"{mode}+rerank" if use_rerank else mode
+            retrieval[name] = evaluate(
+                lambda query, k: kb.query_knowledge_base(query, n_results=k, mode=mode, rerank=use_rerank),
+                queries,
+                _podcast_hit
+            )
+        return {
+            "model": model,
+            "backend": backend,
+            "chunk_tokens": chunk_tokens,
+            "segments": kb.collection.count(),
+            "ingestion": ingestion,
+            "memory": {"rss_before_mb": rss_before, "rss_after_mb": _rss_mb()},
+            "retrieval": retrieval,
+        }
+    finally:
+        shutil.rmtree(persist_path, ignore_errors=True)
+
+
+def benchmark_twitter(tweets: List[Dict], queries: List[Dict], model: str, backend: str, rerank: bool,
+                      index_settings: IndexSettings, batch_size: int = 1000) -> Dict:
+    """Ingest the synthetic corpus into a fresh Twitter KB and evaluate it."""
+    from twitter_agent.twitter_knowledge_base import Tweet, TweetKnowledgeBase
+
+    persist_path = tempfile.mkdtemp(prefix="kb_bench_")
+    try:
+        rss_before = _rss_mb()
+        kb = TweetKnowledgeBase(
+            embedding_model_name=model, embedding_backend=backend, persist_path=persist_path,
+            index_settings=index_settings
+        )
+        start = time.perf_counter()
+        for offset in range(0, len(tweets), batch_size):
+            kb.upsert_tweets([Tweet(**tweet) for tweet in tweets[offset:offset + batch_size]])
+        elapsed = time.perf_counter() - start
+
+        retrieval = {}
+        for use_rerank in [False, True] if rerank else [False]:
+            retrieval["vector+rerank" if use_rerank else "vector"] = evaluate(
+                lambda query, k: kb.query_knowledge_base(query, n_results=k, rerank=use_rerank),
+                queries,
+                _tweet_hit
+            )
+        return {
+            "model": model,
+            "backend": backend,
+            "tweets": len(tweets),
+            "stored_vectors": kb.collection.count(),
+            "ingestion": {
+                "seconds": round(elapsed, 2),
+                "tweets_per_second": round(len(tweets) / elapsed, 1) if elapsed else 0.0,
+            },
+            "memory": {"rss_before_mb": rss_before, "rss_after_mb": _rss_mb()},
+            "retrieval": retrieval,
+        }
+    finally:
+        shutil.rmtree(persist_path, ignore_errors=True)
+
+
+def run_suite(args) -> Dict:
+    """Run every requested podcast and Twitter configuration."""
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seed": args.seed,
+        "k_values": list(K_VALUES),
+        "index_settings": None,
+        "podcast": [],
+        "twitter": [],
+    }
+    index_settings = IndexSettings(
+        space=args.hnsw_space,
+        construction_ef=args.hnsw_construction_ef,
+        search_ef=args.hnsw_search_ef,
+        m=args.hnsw_m,
+        exact_search_threshold=args.exact_search_threshold,
+    )
+    report["index_settings"] = index_settings.model_dump()
+    synthetic_dir: Optional[str] = None
+    directory = os.path.abspath(args.directory)
+    try:
+        if not args.skip_podcast:
+            if not os.path.isdir(directory) or not any(f.endswith(".json") for f in os.listdir(directory)):
+                print_system(f"No transcripts found in {directory}, generating synthetic ones")
+                synthetic_dir = tempfile.mkdtemp(prefix="kb_bench_transcripts_")
+                write_synthetic_transcripts(synthetic_dir, args.synthetic_files, args.synthetic_entries, args.seed)
+                directory = synthetic_dir
+            if args.queries:
+                with open(args.queries, "r", encoding="utf-8") as f:
+                    podcast_queries = json.load(f)
+            else:
+                podcast_queries = build_podcast_queries(directory, args.num_queries, args.seed)
+            report["podcast_queries"] = len(podcast_queries)
+
+            for model, backend, chunk_tokens in itertools.product(args.models, args.backends, args.chunk_tokens):
+                try:
+                    report["podcast"].append(benchmark_podcast(
+                        directory, podcast_queries, model, backend, chunk_tokens, args.modes, args.rerank, index_settings
+                    ))
+                except Exception as e:
+                    print_error(f"Podcast benchmark failed for {model}/{backend}/{chunk_tokens}: {e}")
+                    report["podcast"].append({
+                        "model": model, "backend": backend, "chunk_tokens": chunk_tokens, "error": str(e)
+                    })
+
+        if args.tweets > 0:
+            tweets = build_synthetic_tweets(args.tweets, args.seed)
+            tweet_queries = build_tweet_queries(tweets, args.num_queries, args.seed)
+            for model, backend in itertools.product(args.models, args.backends):
+                try:
+                    report["twitter"].append(
+                        benchmark_twitter(tweets, tweet_queries, model, backend, args.rerank, index_settings)
+                    )
+                except Exception as e:
+                    print_error(f"Twitter benchmark failed for {model}/{backend}: {e}")
+                    report["twitter"].append({"model": model, "backend": backend, "error": str(e)})
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    report["load_stats"] = embedding_registry.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_EMBEDDING_MODEL])
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--chunk-tokens", nargs="+", type=int, default=[256])
+    parser.add_argument("--modes", nargs="+", default=["vector", "hybrid"], choices=["vector", "lexical", "hybrid"])
+    parser.add_argument("--rerank", action="store_true", help="Also evaluate every mode with cross-encoder reranking")
+    parser.add_argument("--hnsw-space", choices=["l2", "cosine", "ip"])
+    parser.add_argument("--hnsw-construction-ef", type=int)
+    parser.add_argument("--hnsw-search-ef", type=int)
+    parser.add_argument("--hnsw-m", type=int)
+    parser.add_argument("--exact-search-threshold", type=int, default=2000,
+                        help="Collections up to this size are searched exactly (0 always uses HNSW)")
+    parser.add_argument("--directory", default="jsonoutputs")
+    parser.add_argument("--queries", help="JSON list of {query, source_file, entry_index} to use instead of sampling")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--synthetic-files", type=int, default=20)
+    parser.add_argument("--synthetic-entries", type=int, default=100)
+    parser.add_argument("--tweets", type=int, default=2000, help="Synthetic tweet corpus size (0 skips Twitter)")
+    parser.add_argument("--skip-podcast", action="store_true")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--keep-caches", action="store_true", help="Leave the query and embedding caches enabled")
+    parser.add_argument("--output", help="Optional path to write the JSON report to")
+    args = parser.parse_args()
+
+    if not args.keep_caches:
+        # Cached results and vectors would hide the latency and throughput being measured
+        os.environ["KB_QUERY_CACHE_SIZE"] = "0"
+        os.environ["KB_EMBEDDING_CACHE"] = "false"
+
+    report = run_suite(args)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from utils import print_system
+from kb_core.index import IndexSettings, open_collection
+
+
+def _names(client) -> List[str]:
+    """Collection names from list_collections (names in Chroma 0.6, Collection objects before)."""
+    return [item if isinstance(item, str) else item.name for item in client.list_collections()]
+
+
+def _time_bounds(where: Optional[Dict], key: str) -> Tuple[Optional[float], Optional[float]]:
+    """Lower and upper bounds on key implied by a where clause (top level or inside $and)."""
+    low = high = None
+    if not where:
+        return low, high
+    clauses = where["$and"] if "$and" in where else [where]
+    for clause in clauses:
+        condition = clause.get(key)
+        if not isinstance(condition, dict):
+            continue
+        for operator, value in condition.items():
+            if operator in ("$gt", "$gte"):
+                low = value if low is None else max(low, value)
+            elif operator in ("$lt", "$lte"):
+                high = value if high is None else min(high, value)
+    return low, high
+
+
+class BucketedCollection:
+    """A Chroma collection split into one collection per fixed time window.
+
+    Rows are routed by the numeric time_key in their metadata to a bucket named
+    "<name>_<YYYYMMDD>" after the window's first day; reads fan out to every
+    bucket a where clause's time range can touch and are merged. Retention is
+    then dropping whole buckets rather than deleting rows. Windows are whole
+    days, so no two buckets share a name.
+    """
+
+    def __init__(self, client, name: str, embedding_function, settings: IndexSettings, bucket_days: int,
+                 time_key: str = "created_at_ts"):
+        if bucket_days < 1 or bucket_days != int(bucket_days):
+            raise ValueError(f"bucket_days must be a positive whole number of days, got {bucket_days}")
+        self.client = client
+        self.name = name
+        self.embedding_function = embedding_function
+        self.settings = settings
+        self.metadata = settings.collection_metadata()
+        self.bucket_seconds = int(bucket_days) * 86400
+        self.time_key = time_key
+        self._buckets: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+        pattern = re.compile(rf"^{re.escape(name)}_(\d{{8}})$")
+        for collection_name in _names(client):
+            match = pattern.match(collection_name)
+            if match:
+                start = datetime.strptime(match.group(1), "%Y%m%d").replace(tzinfo=timezone.utc).timestamp()
+                self._buckets[int(start)] = open_collection(client, collection_name, embedding_function, settings)
+
+    def _bucket_start(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds) * self.bucket_seconds
+
+    def _bucket_name(self, start: int) -> str:
+        return f"{self.name}_{datetime.fromtimestamp(start, timezone.utc):%Y%m%d}"
+
+    def _bucket(self, ts: float):
+        """Return the bucket collection holding ts, creating it on first use."""
+        start = self._bucket_start(ts)
+        with self._lock:
+            if start not in self._buckets:
+                print_system(f"Creating knowledge base bucket '{self._bucket_name(start)}'")
+                self._buckets[start] = open_collection(
+                    self.client, self._bucket_name(start), self.embedding_function, self.settings
+                )
+            return self._buckets[start]
+
+    def buckets(self, where: Optional[Dict] = None) -> List[Tuple[int, object]]:
+        """(start, collection) pairs, oldest first, limited to buckets that can match where's time range."""
+        low, high = _time_bounds(where, self.time_key)
+        with self._lock:
+            return [
+                (start, collection) for start, collection in sorted(self._buckets.items())
+                if (low is None or start + self.bucket_seconds > low) and (high is None or start <= high)
+            ]
+
+    def _owners(self, ids: List[str]) -> Dict[str, object]:
+        """Map each stored ID to the bucket collection that holds it."""
+        owners = {}
+        remaining = list(ids)
+        for _, collection in self.buckets():
+            if not remaining:
+                break
+            found = collection.get(ids=remaining, include=[])["ids"]
+            for row_id in found:
+                owners[row_id] = collection
+            remaining = [row_id for row_id in remaining if row_id not in owners]
+        return owners
+
+    def count(self) -> int:
+        return sum(collection.count() for _, collection in self.buckets())
+
+    def _write(self, method: str, ids: List[str], metadatas: List[Dict], owners: Dict[str, object], **columns):
+        """Group rows by target bucket and call method on each bucket once."""
+        groups: Dict[int, Tuple[object, List[int]]] = {}
+        for position, (row_id, metadata) in enumerate(zip(ids, metadatas)):
+            collection = owners.get(row_id) or self._bucket(metadata[self.time_key])
+            groups.setdefault(id(collection), (collection, []))[1].append(position)
+        for collection, positions in groups.values():
+            getattr(collection, method)(
+                ids=[ids[p] for p in positions],
+                metadatas=[metadatas[p] for p in positions],
+                **{
+                    name: [values[p] for p in positions]
+                    for name, values in columns.items() if values is not None
+                }
+            )
+
+    def add(self, ids: List[str], metadatas: List[Dict], documents: Optional[List[str]] = None,
+            embeddings=None):
+        self._write("add", ids, metadatas, {}, documents=documents, embeddings=embeddings)
+
+    def upsert(self, ids: List[str], metadatas: List[Dict], documents: Optional[List[str]] = None,
+               embeddings=None):
+        # Existing rows are overwritten where they already live
+        self._write("upsert", ids, metadatas, self._owners(ids), documents=documents, embeddings=embeddings)
+
+    def update(self, ids: List[str], metadatas: List[Dict], documents: Optional[List[str]] = None):
+        """Update rows in place, moving a row whose new timestamp belongs to a later bucket."""
+        owners = self._owners(ids)
+        for position, (row_id, metadata) in enumerate(zip(ids, metadatas)):
+            current = owners.get(row_id)
+            if current is None:
+                continue
+            target = self._bucket(metadata[self.time_key])
+            document = [documents[position]] if documents is not None else None
+            if target is current:
+                current.update(ids=[row_id], metadatas=[metadata], documents=document)
+                continue
+            row = current.get(ids=[row_id], include=["embeddings", "documents"])
+            target.add(
+                ids=[row_id],
+                embeddings=row["embeddings"],
+                documents=document or row["documents"],
+                metadatas=[metadata]
+            )
+            current.delete(ids=[row_id])
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        if ids is None:
+            for _, collection in self.buckets(where):
+                collection.delete(where=where)
+            return
+        # Chroma warns for every ID missing from a collection, so each bucket only gets its own rows
+        by_bucket: Dict[int, Tuple[object, List[str]]] = {}
+        for row_id, collection in self._owners(ids).items():
+            by_bucket.setdefault(id(collection), (collection, []))[1].append(row_id)
+        for collection, bucket_ids in by_bucket.values():
+            collection.delete(ids=bucket_ids, where=where)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None, offset: Optional[int] = None) -> Dict:
+        """Chroma-shaped get across buckets, oldest bucket first; limit and offset apply to the union."""
+        include = ["documents", "metadatas"] if include is None else include
+        merged = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        skip = offset or 0
+        for _, collection in self.buckets(where):
+            if limit is not None and len(merged["ids"]) >= limit:
+                break
+            if skip and not ids and not where:
+                # Whole buckets before the offset are skipped by count alone
+                size = collection.count()
+                if skip >= size:
+                    skip -= size
+                    continue
+            rows = collection.get(ids=ids, where=where, include=include)
+            end = None if limit is None else skip + limit - len(merged["ids"])
+            for key in merged:
+                values = rows.get(key)
+                if values is not None:
+                    merged[key].extend(list(values)[skip:end])
+            skip = 0
+        result = {key: (merged[key] if key == "ids" or key in include else None) for key in merged}
+        result["included"] = include
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              include: Optional[List[str]] = None) -> Dict:
+        """Chroma-shaped nearest-neighbour query: each bucket is searched and the hits merged by distance."""
+        include = ["documents", "metadatas", "distances"] if include is None else include
+        # Distances are needed to merge buckets even if the caller did not ask for them
+        bucket_include = include if "distances" in include else [*include, "distances"]
+        keys = ["ids", "documents", "metadatas", "distances", "embeddings"]
+        hits: List[List[Tuple]] = [[] for _ in query_embeddings]
+        for _, collection in self.buckets(where):
+            size = collection.count()
+            if not size:
+                continue
+            rows = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=min(n_results, size),
+                where=where,
+                include=bucket_include
+            )
+            for q in range(len(query_embeddings)):
+                columns = [rows.get(key)[q] if rows.get(key) is not None else None for key in keys]
+                for j in range(len(rows["ids"][q])):
+                    hits[q].append(tuple(column[j] if column is not None else None for column in columns))
+
+        results = {key: [] for key in keys}
+        for q_hits in hits:
+            q_hits.sort(key=lambda hit: hit[3])
+            for k, key in enumerate(keys):
+                results[key].append([hit[k] for hit in q_hits[:n_results]])
+        for key in keys[1:]:
+            if key not in include:
+                results[key] = None
+        results["included"] = include
+        return results
+
+    def drop_buckets_before(self, cutoff_ts: float) -> int:
+        """Drop every bucket whose window ends at or before cutoff_ts. Returns the number of rows dropped."""
+        dropped = 0
+        for start, collection in self.buckets():
+            if start + self.bucket_seconds > cutoff_ts:
+                break
+            dropped += collection.count()
+            self.client.delete_collection(collection.name)
+            with self._lock:
+                del self._buckets[start]
+        return dropped
+
+    def rename(self, name: str):
+        """Rename every bucket (and so the bucketed collection) to name; existing handles stay valid."""
+        with self._lock:
+            for start, collection in sorted(self._buckets.items()):
+                collection.modify(name=f"{name}_{datetime.fromtimestamp(start, timezone.utc):%Y%m%d}")
+            self.name = name
+
+    def truncate(self):
+        """Drop every bucket."""
+        for start, collection in self.buckets():
+            self.client.delete_collection(collection.name)
+            with self._lock:
+                del self._buckets[start]
@@ -0,0 +1,12 @@
+"""Storage locations shared by the knowledge bases."""
+
+import os
+
+# CHROMA_PATH (str): Directory of the persistent Chroma client used by every knowledge base.
+CHROMA_PATH = os.getenv("KB_CHROMA_PATH", "./chroma_db")
+
+
+def sidecar_path(filename: str) -> str:
+    """Return the path of a sidecar file stored next to the Chroma data."""
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    return os.path.join(CHROMA_PATH, filename)
@@ -0,0 +1,141 @@
+import hashlib
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_URL = re.compile(r"https?://\S+")
+_MENTION = re.compile(r"@\w+")
+_RETWEET_PREFIX = re.compile(r"^rt\b")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+SIMHASH_BITS = 64
+SIMHASH_MASK = (1 << SIMHASH_BITS) - 1
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and drop URLs, mentions, an RT prefix and punctuation."""
+    text = _URL.sub(" ", text.lower())
+    text = _MENTION.sub(" ", text)
+    text = _NON_WORD.sub(" ", text).strip()
+    return " ".join(_RETWEET_PREFIX.sub("", text).split())
+
+
+def simhash(text: str) -> int:
+    """Return the 64-bit SimHash of text over word bigrams of its normalized form."""
+    words = normalize_text(text).split()
+    features = Counter(" ".join(pair) for pair in zip(words, words[1:])) or Counter(words)
+    if not features:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+         for feature in features],
+        dtype=np.uint64
+    )
+    weights = np.array(list(features.values()), dtype=np.int64)
+    # One row per feature, one column per bit: +weight where the bit is set, -weight otherwise
+    bits = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    totals = (weights[:, None] * (2 * bits - 1)).sum(axis=0)
+    # Python ints: shifting NumPy int64 indices would overflow into the sign bit at bit 63
+    return sum(1 << int(i) for i in np.flatnonzero(totals > 0))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two 64-bit fingerprints (negative legacy values are masked)."""
+    return bin((a ^ b) & SIMHASH_MASK).count("1")
+
+
+class SimHashIndex:
+    """Banded lookup table that finds stored SimHashes within max_distance bits.
+
+    The 64 bits are split into bands; two hashes that differ in at most
+    bands - 1 bits must agree exactly on at least one band, so only the
+    entries sharing a band are compared. Entries can be tagged with a group,
+    and a lookup scoped to a group only matches entries of that group.
+    """
+
+    def __init__(self, max_distance: int = 3, bands: int = 4):
+        if max_distance >= bands:
+            raise ValueError("max_distance must be smaller than the number of bands")
+        self.max_distance = max_distance
+        self.bands = bands
+        self._band_bits = SIMHASH_BITS // bands
+        self._buckets: List[Dict[int, set]] = [{} for _ in range(bands)]
+        self._hashes: Dict[str, int] = {}
+        self._groups: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self._band_bits) - 1
+        return [(fingerprint >> (band * self._band_bits)) & mask for band in range(self.bands)]
+
+    def add(self, key: str, fingerprint: int, group: Optional[str] = None):
+        """Store fingerprint under key, optionally tagged with group."""
+        fingerprint &= SIMHASH_MASK
+        with self._lock:
+            self._hashes[key] = fingerprint
+            self._groups[key] = group
+            for band, value in enumerate(self._band_values(fingerprint)):
+                self._buckets[band].setdefault(value, set()).add(key)
+
+    def remove(self, key: str):
+        """Forget key."""
+        with self._lock:
+            fingerprint = self._hashes.pop(key, None)
+            self._groups.pop(key, None)
+            if fingerprint is None:
+                return
+            for band, value in enumerate(self._band_values(fingerprint)):
+                bucket = self._buckets[band].get(value)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][value]
+
+    def find(self, fingerprint: int, group: Optional[str] = None) -> Optional[str]:
+        """Return the key of the closest stored hash within max_distance (within group when given), if any."""
+        fingerprint &= SIMHASH_MASK
+        with self._lock:
+            candidates = set()
+            for band, value in enumerate(self._band_values(fingerprint)):
+                candidates |= self._buckets[band].get(value, set())
+            best_key, best_distance = None, self.max_distance + 1
+            for key in candidates:
+                if group is not None and self._groups[key] != group:
+                    continue
+                distance = hamming_distance(fingerprint, self._hashes[key])
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            return best_key
+
+
+def maximal_marginal_relevance(relevance: Sequence[float], vectors: np.ndarray, k: int,
+                               lambda_mult: float = 0.7) -> List[int]:
+    """Pick k candidate indices trading relevance against similarity to those already picked.
+
+    lambda_mult of 1.0 is plain relevance order; lower values favour diversity.
+    """
+    if len(relevance) == 0:
+        return []
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to anything selected so far
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < min(k, len(relevance)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
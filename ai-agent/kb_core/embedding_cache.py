@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from kb_core.config import sidecar_path
+
+# Largest number of bound parameters we put into a single IN (...) lookup
+_LOOKUP_CHUNK = 500
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk embedding cache keyed by (model name, text hash)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("KB_EMBEDDING_CACHE_PATH") or sidecar_path("embedding_cache.db")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _init_db(self):
+        """Create the embeddings table if it does not exist."""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            ''')
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Return the content hash used as the cache key for text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up cached vectors for texts, returning None for every miss."""
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+
+        with self._connect() as conn:
+            for start in range(0, len(unique_hashes), _LOOKUP_CHUNK):
+                chunk = unique_hashes[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(
+                    f'SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})',
+                    (model_name, *chunk)
+                )
+                for text_hash, blob in cursor.fetchall():
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+        results = [found.get(h) for h in hashes]
+        hit_count = sum(1 for r in results if r is not None)
+        with self._lock:
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for texts under model_name."""
+        rows = []
+        for text, vector in zip(texts, vectors):
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((model_name, self.text_hash(text), int(array.shape[0]), array.tobytes()))
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+
+    def stats(self) -> Dict:
+        """Report hit/miss counters for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None if it is disabled."""
+    global _embedding_cache
+    if os.getenv("KB_EMBEDDING_CACHE", "true").lower() != "true":
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from kb_core.embedding_cache import EmbeddingCache, get_embedding_cache
+from utils import print_system
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("KB_EMBEDDING_MODEL", "all-mpnet-base-v2")
+
+# Inference backends; every one of them produces vectors with the fp32 model's dimension
+#   torch       - SentenceTransformer on PyTorch, fp32 (the original behaviour)
+#   torch-int8  - PyTorch dynamic int8 quantization of the Linear layers
+#   onnx        - ONNX Runtime export of the model
+#   onnx-int8   - ONNX Runtime with a dynamically quantized int8 graph (KB_ONNX_INT8_FILE)
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_EMBEDDING_BACKEND = os.getenv("KB_EMBEDDING_BACKEND", "torch")
+
+
+def _current_rss_bytes() -> int:
+    """Return the resident set size of this process in bytes (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a peak value in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except Exception:
+        return 0
+
+
+def _load_model(model_name: str, backend: str):
+    """Load model_name as a SentenceTransformer on the requested inference backend."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        # Swaps nn.Linear for int8 kernels in place; the pooling output size is unchanged
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+
+    # Pre-quantized graphs ship in the onnx/ folder of the sentence-transformers model repos
+    return SentenceTransformer(
+        model_name,
+        backend="onnx",
+        model_kwargs={"file_name": os.getenv("KB_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")}
+    )
+
+
+class EmbeddingModelRegistry:
+    """Process-wide registry that loads each SentenceTransformer model once, on first use."""
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._load_stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def registry_key(model_name: str, backend: str) -> str:
+        return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+    def get(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = DEFAULT_EMBEDDING_BACKEND):
+        """Return the shared model instance for model_name on backend, loading it if needed."""
+        key = self.registry_key(model_name, backend)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            print_system(f"Loading embedding model '{key}'...")
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            model = _load_model(model_name, backend)
+            load_seconds = time.perf_counter() - start
+            rss_delta = max(_current_rss_bytes() - rss_before, 0)
+
+            self._models[key] = model
+            self._load_stats[key] = {
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_mb": round(rss_delta / (1024 * 1024), 1),
+                "loaded_at": time.time(),
+            }
+            print_system(
+                f"Loaded embedding model '{key}' in {load_seconds:.2f}s "
+                f"(+{rss_delta / (1024 * 1024):.0f} MB RSS)"
+            )
+            return model
+
+    def is_loaded(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = DEFAULT_EMBEDDING_BACKEND) -> bool:
+        """Check whether a model has already been loaded in this process."""
+        return self.registry_key(model_name, backend) in self._models
+
+    def stats(self) -> Dict:
+        """Report loaded models with their load time and memory cost."""
+        return {
+            "models": {name: dict(stats) for name, stats in self._load_stats.items()},
+            "process_rss_mb": round(_current_rss_bytes() / (1024 * 1024), 1),
+        }
+
+
+class SharedEmbeddingFunction:
+    """Chroma embedding function backed by a registry model and the embedding cache.
+
+    The model is resolved on the first call, so building a collection does not
+    load any weights until something actually needs to be embedded. Texts that
+    were embedded before (by any collection) are served from the on-disk cache.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        registry: Optional[EmbeddingModelRegistry] = None,
+        cache: Optional[EmbeddingCache] = None,
+        backend: str = DEFAULT_EMBEDDING_BACKEND,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        # Cache entries are per backend, since quantized vectors differ slightly from fp32 ones
+        self.cache_key = EmbeddingModelRegistry.registry_key(model_name, backend)
+        self._registry = registry or embedding_registry
+        self.cache = cache
+
+    @property
+    def model(self):
+        return self._registry.get(self.model_name, self.backend)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a float32 matrix, encoding only cache misses."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+        cached = self.cache.get_many(self.cache_key, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            encoded = np.asarray(self.model.encode(missing), dtype=np.float32)
+            self.cache.put_many(self.cache_key, missing, encoded)
+            fresh = dict(zip(missing, encoded))
+            cached = [vector if vector is not None else fresh[text] for text, vector in zip(texts, cached)]
+        return np.vstack(cached)
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input)).tolist()
+
+    def cache_stats(self) -> Dict:
+        """Report embedding cache hit/miss counters (empty if caching is off)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+
+# Shared across every knowledge base in the process
+embedding_registry = EmbeddingModelRegistry()
+_embedding_functions: Dict[str, SharedEmbeddingFunction] = {}
+_embedding_functions_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: Optional[str] = None):
+    """Return the shared SentenceTransformer instance for model_name."""
+    return embedding_registry.get(model_name, backend or DEFAULT_EMBEDDING_BACKEND)
+
+
+def get_embedding_function(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: Optional[str] = None) -> SharedEmbeddingFunction:
+    """Return the shared embedding function for model_name on backend."""
+    backend = backend or DEFAULT_EMBEDDING_BACKEND
+    key = EmbeddingModelRegistry.registry_key(model_name, backend)
+    with _embedding_functions_lock:
+        func = _embedding_functions.get(key)
+        if func is None:
+            func = SharedEmbeddingFunction(model_name, cache=get_embedding_cache(), backend=backend)
+            _embedding_functions[key] = func
+        return func
+
+
+def get_embedding_registry_stats() -> Dict:
+    """Report load time, resident memory and cache counters for the shared embedding models."""
+    stats = embedding_registry.stats()
+    cache = get_embedding_cache()
+    if cache is not None:
+        stats["embedding_cache"] = cache.stats()
+    return stats
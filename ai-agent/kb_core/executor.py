@@ -0,0 +1,31 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_query_executor: Optional[ThreadPoolExecutor] = None
+_query_executor_lock = threading.Lock()
+
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """Return the bounded thread pool that runs knowledge base queries off the event loop.
+
+    The pool is shared by every knowledge base and sized by KB_QUERY_WORKERS, so a
+    burst of tool calls queues here instead of piling threads onto the model.
+    """
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("KB_QUERY_WORKERS", "4")),
+                thread_name_prefix="kb-query"
+            )
+        return _query_executor
+
+
+async def run_in_query_executor(func: Callable, *args, **kwargs) -> Any:
+    """Await func(*args, **kwargs) on the query executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_query_executor(), functools.partial(func, *args, **kwargs))
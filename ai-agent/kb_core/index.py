@@ -0,0 +1,231 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from chromadb.errors import NotFoundError
+from pydantic import BaseModel
+
+from utils import print_system
+
+
+class IndexSettings(BaseModel):
+    """Per-collection vector index settings.
+
+    The hnsw fields map onto Chroma's collection metadata and are fixed when the
+    collection is created; None keeps Chroma's default. Collections with at most
+    exact_search_threshold rows are searched exactly in NumPy instead of through HNSW.
+    """
+    space: Optional[str] = None  # "l2", "cosine" or "ip"
+    construction_ef: Optional[int] = None
+    search_ef: Optional[int] = None
+    m: Optional[int] = None
+    exact_search_threshold: int = 2000
+
+    @classmethod
+    def from_env(cls) -> "IndexSettings":
+        """Build settings from the KB_HNSW_* and KB_EXACT_SEARCH_THRESHOLD environment variables."""
+        def optional_int(name: str) -> Optional[int]:
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            space=os.getenv("KB_HNSW_SPACE") or None,
+            construction_ef=optional_int("KB_HNSW_CONSTRUCTION_EF"),
+            search_ef=optional_int("KB_HNSW_SEARCH_EF"),
+            m=optional_int("KB_HNSW_M"),
+            exact_search_threshold=int(os.getenv("KB_EXACT_SEARCH_THRESHOLD", "2000")),
+        )
+
+    def collection_metadata(self) -> Optional[Dict]:
+        """Return the Chroma collection metadata for the explicitly set HNSW parameters."""
+        metadata = {
+            "hnsw:space": self.space,
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef,
+            "hnsw:M": self.m,
+        }
+        metadata = {key: value for key, value in metadata.items() if value is not None}
+        return metadata or None
+
+
+def open_collection(client, name: str, embedding_function, settings: IndexSettings):
+    """Get or create a collection with settings, warning when an existing one was built differently."""
+    requested = settings.collection_metadata()
+    collection = client.get_or_create_collection(
+        name=name,
+        embedding_function=embedding_function,
+        metadata=requested
+    )
+    existing = collection.metadata or {}
+    mismatched = {key: value for key, value in (requested or {}).items() if existing.get(key) != value}
+    if mismatched:
+        print_system(
+            f"Collection '{name}' was created with different index settings; {mismatched} only apply "
+            f"to a new collection (clear and rebuild it to change them)"
+        )
+    return collection
+
+
+def drop_collection(client, name: str):
+    """Delete a collection, doing nothing if it does not exist."""
+    try:
+        client.delete_collection(name)
+    except NotFoundError:
+        # Nothing to drop
+        pass
+    except ValueError as e:
+        # Chroma 0.6 reports a missing collection as ValueError; anything else propagates
+        if "does not exist" not in str(e):
+            raise
+
+
+def recreate_collection(client, name: str, embedding_function, settings: IndexSettings):
+    """Drop a collection and create it again empty: a truncate that never lists or deletes rows."""
+    drop_collection(client, name)
+    return open_collection(client, name, embedding_function, settings)
+
+
+def distance_to_similarity(distance: float, space: str = "l2") -> float:
+    """Convert a Chroma distance into cosine similarity for unit-length embeddings.
+
+    Chroma's "l2" is the squared Euclidean distance, which for unit vectors is 2 - 2cos.
+    """
+    if space == "l2":
+        return 1 - distance / 2
+    return 1 - distance
+
+
+class _UnsupportedFilter(Exception):
+    pass
+
+
+_COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict]) -> bool:
+    """Evaluate a Chroma metadata where clause against one row's metadata."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise _UnsupportedFilter(key)
+        elif isinstance(condition, dict):
+            for operator, target in condition.items():
+                if operator not in _COMPARISONS:
+                    raise _UnsupportedFilter(operator)
+                if not _COMPARISONS[operator](metadata.get(key), target):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class ExactSearchIndex:
+    """In-memory brute-force search for collections too small to benefit from HNSW.
+
+    Holds every vector as one contiguous, L2-normalized float32 matrix (plus the
+    original norms, so "l2" distances come out exactly as Chroma reports them).
+    The matrix is rebuilt whenever the caller's write generation changes; callers
+    pass one that also moves on writes made by other processes.
+    """
+
+    def __init__(self, collection, threshold: int):
+        self.collection = collection
+        self.threshold = threshold
+        self.space = (collection.metadata or {}).get("hnsw:space", "l2")
+        self._generation = None
+        self._too_large = False
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _refresh(self, generation) -> bool:
+        """Reload the matrix if the collection changed; returns False when it is above the threshold."""
+        if self._generation == generation:
+            return not self._too_large
+        self._generation = generation
+        self._too_large = self.collection.count() > self.threshold
+        if self._too_large:
+            # Drop the old matrix; nothing is reloaded until the next write
+            self._ids, self._documents, self._metadatas = [], [], []
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._norms = np.zeros(0, dtype=np.float32)
+            return False
+
+        rows = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.asarray(rows["embeddings"], dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(rows["ids"]), -1)
+        norms = np.linalg.norm(vectors, axis=1)
+        self._matrix = np.ascontiguousarray(vectors / np.maximum(norms, 1e-12)[:, None], dtype=np.float32)
+        self._norms = norms.astype(np.float32)
+        self._ids, self._documents, self._metadatas = rows["ids"], rows["documents"], rows["metadatas"]
+        return True
+
+    def search(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict],
+               include: List[str], generation) -> Optional[Dict]:
+        """Return Chroma-shaped query results, or None if Chroma's HNSW index should answer instead."""
+        with self._lock:
+            if self.threshold <= 0 or not self._refresh(generation):
+                return None
+            try:
+                mask = np.array([matches_where(metadata, where) for metadata in self._metadatas], dtype=bool) \
+                    if where else np.ones(len(self._ids), dtype=bool)
+            except _UnsupportedFilter:
+                return None
+
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            query_norms = np.linalg.norm(queries, axis=1)
+            if not self._ids:
+                return {
+                    "ids": [[] for _ in queries], "documents": [[] for _ in queries],
+                    "metadatas": [[] for _ in queries], "distances": [[] for _ in queries],
+                    "embeddings": [[] for _ in queries] if "embeddings" in include else None,
+                    "included": include,
+                }
+            cosine = (queries / np.maximum(query_norms, 1e-12)[:, None]) @ self._matrix.T
+            if self.space == "cosine":
+                distances = 1 - cosine
+            elif self.space == "ip":
+                distances = 1 - cosine * query_norms[:, None] * self._norms[None, :]
+            else:
+                distances = (
+                    query_norms[:, None] ** 2 + self._norms[None, :] ** 2
+                    - 2 * cosine * query_norms[:, None] * self._norms[None, :]
+                )
+            distances = np.where(mask[None, :], distances, np.inf)
+
+            k = min(n_results, int(mask.sum()))
+            results = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+            for row in distances:
+                top = np.argpartition(row, k - 1)[:k] if k else np.zeros(0, dtype=int)
+                top = top[np.argsort(row[top], kind="stable")]
+                results["ids"].append([self._ids[j] for j in top])
+                results["documents"].append([self._documents[j] for j in top])
+                # Copies, so callers cannot mutate the cached rows
+                results["metadatas"].append([dict(self._metadatas[j]) for j in top])
+                results["distances"].append([float(row[j]) for j in top])
+                results["embeddings"].append([self._matrix[j] for j in top])
+            if "embeddings" not in include:
+                results["embeddings"] = None
+            results["included"] = include
+            return results
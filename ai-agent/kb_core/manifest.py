@@ -0,0 +1,271 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Set
+
+from kb_core.config import sidecar_path
+
+
+class CollectionManifest:
+    """Sidecar metadata store for a Chroma collection.
+
+    Keeps the row count, the latest document timestamp and the per-source-file
+    ingestion state in sqlite, so stats and "already processed?" checks are
+    primary-key lookups instead of a full collection.get().
+    """
+
+    def __init__(self, collection_name: str, path: Optional[str] = None):
+        self.collection_name = collection_name
+        self.path = path or sidecar_path("kb_manifest.db")
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _init_db(self):
+        """Create the manifest tables if they do not exist."""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS collection_stats (
+                    collection TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    latest_ts REAL,
+                    updated_at REAL,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(collection_stats)')}
+            if 'generation' not in columns:
+                # Manifest created before write generations were tracked
+                conn.execute('ALTER TABLE collection_stats ADD COLUMN generation INTEGER NOT NULL DEFAULT 0')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_files (
+                    collection TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    file_hash TEXT,
+                    mtime REAL,
+                    segment_count INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'complete',
+                    ingested_at REAL,
+                    PRIMARY KEY (collection, file_name)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS speakers (
+                    collection TEXT NOT NULL,
+                    speaker TEXT NOT NULL,
+                    segment_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (collection, speaker)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS migrations (
+                    collection TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    applied_at REAL,
+                    PRIMARY KEY (collection, name)
+                )
+            ''')
+
+    def is_initialized(self) -> bool:
+        """Check whether this collection has a stats row yet."""
+        with self._connect() as conn:
+            cursor = conn.execute('SELECT 1 FROM collection_stats WHERE collection = ?', (self.collection_name,))
+            return cursor.fetchone() is not None
+
+    def has_migration(self, name: str) -> bool:
+        """Check whether the one-time data migration name already ran on this collection."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT 1 FROM migrations WHERE collection = ? AND name = ?', (self.collection_name, name)
+            )
+            return cursor.fetchone() is not None
+
+    def record_migration(self, name: str):
+        """Mark the one-time data migration name as done for this collection."""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO migrations (collection, name, applied_at) VALUES (?, ?, ?)',
+                (self.collection_name, name, time.time())
+            )
+            conn.commit()
+
+    def set_stats(self, count: int, latest_ts: Optional[float]):
+        """Overwrite the stored stats (used when bootstrapping from an existing collection)."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO collection_stats (collection, count, latest_ts, updated_at, generation)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(collection) DO UPDATE SET
+                    count = excluded.count,
+                    latest_ts = excluded.latest_ts,
+                    updated_at = excluded.updated_at,
+                    generation = collection_stats.generation + 1
+            ''', (self.collection_name, count, latest_ts, time.time()))
+            conn.commit()
+
+    def record_add(self, count: int, latest_ts: Optional[float] = None):
+        """Record an add: store the new row count and advance the latest timestamp."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO collection_stats (collection, count, latest_ts, updated_at, generation)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(collection) DO UPDATE SET
+                    count = excluded.count,
+                    generation = collection_stats.generation + 1,
+                    latest_ts = CASE
+                        WHEN collection_stats.latest_ts IS NULL THEN excluded.latest_ts
+                        WHEN excluded.latest_ts IS NULL THEN collection_stats.latest_ts
+                        ELSE MAX(collection_stats.latest_ts, excluded.latest_ts)
+                    END,
+                    updated_at = excluded.updated_at
+            ''', (self.collection_name, count, latest_ts, time.time()))
+            conn.commit()
+
+    def record_delete(self, count: int):
+        """Record a delete by storing the new row count."""
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE collection_stats
+                SET count = ?, latest_ts = CASE WHEN ? = 0 THEN NULL ELSE latest_ts END, updated_at = ?,
+                    generation = generation + 1
+                WHERE collection = ?
+            ''', (count, count, time.time(), self.collection_name))
+            conn.commit()
+
+    def reset(self):
+        """Forget everything recorded for this collection (after clearing it)."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM source_files WHERE collection = ?', (self.collection_name,))
+            conn.execute('DELETE FROM speakers WHERE collection = ?', (self.collection_name,))
+            conn.execute('''
+                INSERT INTO collection_stats (collection, count, latest_ts, updated_at, generation)
+                VALUES (?, 0, NULL, ?, 1)
+                ON CONFLICT(collection) DO UPDATE SET
+                    count = 0, latest_ts = NULL, updated_at = excluded.updated_at,
+                    generation = collection_stats.generation + 1
+            ''', (self.collection_name, time.time()))
+            conn.commit()
+
+    def generation(self) -> int:
+        """Write counter of this collection, bumped by every recorded write from any process."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT generation FROM collection_stats WHERE collection = ?', (self.collection_name,)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_stats(self) -> Dict:
+        """Return the stored count and latest timestamp."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT count, latest_ts FROM collection_stats WHERE collection = ?',
+                (self.collection_name,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return {"count": 0, "latest_ts": None}
+        return {"count": row[0], "latest_ts": row[1]}
+
+    def record_file(self, file_name: str, file_hash: Optional[str], mtime: Optional[float],
+                    segment_count: int, status: str = "complete"):
+        """Record the ingestion state of a source file."""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO source_files
+                    (collection, file_name, file_hash, mtime, segment_count, status, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (self.collection_name, file_name, file_hash, mtime, segment_count, status, time.time()))
+            conn.commit()
+
+    def get_file(self, file_name: str) -> Optional[Dict]:
+        """Return the recorded ingestion state of a source file, if any."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT file_hash, mtime, segment_count, status, ingested_at
+                FROM source_files WHERE collection = ? AND file_name = ?
+            ''', (self.collection_name, file_name))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "file_hash": row[0],
+            "mtime": row[1],
+            "segment_count": row[2],
+            "status": row[3],
+            "ingested_at": row[4],
+        }
+
+    def remove_file(self, file_name: str):
+        """Forget a source file."""
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM source_files WHERE collection = ? AND file_name = ?',
+                (self.collection_name, file_name)
+            )
+            conn.commit()
+
+    def processed_files(self) -> Set[str]:
+        """Return the names of source files whose ingestion completed."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT file_name FROM source_files WHERE collection = ? AND status = 'complete'",
+                (self.collection_name,)
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+
+    def list_files(self) -> List[Dict]:
+        """Return every recorded source file with its ingestion state."""
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                SELECT file_name, file_hash, mtime, segment_count, status
+                FROM source_files WHERE collection = ?
+            ''', (self.collection_name,))
+            return [
+                {"file_name": row[0], "file_hash": row[1], "mtime": row[2], "segment_count": row[3], "status": row[4]}
+                for row in cursor.fetchall()
+            ]
+
+    def set_speakers(self, counts: Dict[str, int]):
+        """Replace every speaker's segment count (after a bulk load whose overlap with stored rows is unknown)."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM speakers WHERE collection = ?', (self.collection_name,))
+            conn.executemany(
+                'INSERT INTO speakers (collection, speaker, segment_count) VALUES (?, ?, ?)',
+                [(self.collection_name, speaker, count) for speaker, count in counts.items() if count > 0]
+            )
+            conn.commit()
+
+    def record_speakers(self, counts: Dict[str, int]):
+        """Add (or, with negative counts, subtract) segment counts per speaker; speakers at zero are dropped."""
+        with self._connect() as conn:
+            conn.executemany('''
+                INSERT INTO speakers (collection, speaker, segment_count) VALUES (?, ?, ?)
+                ON CONFLICT(collection, speaker) DO UPDATE SET
+                    segment_count = speakers.segment_count + excluded.segment_count
+            ''', [(self.collection_name, speaker, count) for speaker, count in counts.items()])
+            conn.execute(
+                'DELETE FROM speakers WHERE collection = ? AND segment_count <= 0',
+                (self.collection_name,)
+            )
+            conn.commit()
+
+    def speakers(self) -> Dict[str, int]:
+        """Return the segment count of every speaker in the collection."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT speaker, segment_count FROM speakers WHERE collection = ?',
+                (self.collection_name,)
+            )
+            return dict(cursor.fetchall())
+
+def file_fingerprint(file_path: str) -> Dict:
+    """Return the sha256 hash and mtime of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return {"file_hash": digest.hexdigest(), "mtime": os.path.getmtime(file_path)}
@@ -0,0 +1,105 @@
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from kb_core.config import CHROMA_PATH
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+class QueryResultCache:
+    """LRU + TTL cache for knowledge base query results.
+
+    Keys embed the collection generation, so invalidate() (called on every
+    write) makes all earlier entries unreachable at once.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: float = 300):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize case, punctuation and whitespace so trivial variants share an entry."""
+        return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+    def make_key(self, query: str, **params) -> Tuple:
+        """Build the cache key for query and its parameters under the current generation."""
+        return (self.generation, self.normalize_query(query), json.dumps(params, sort_keys=True, default=str))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value for key, or None on a miss or expiry."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Bump the generation and drop every cached entry."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Report hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._entries),
+                "generation": self.generation,
+            }
+
+
+_query_caches: Dict[Tuple[str, str], QueryResultCache] = {}
+_query_caches_lock = threading.Lock()
+
+
+def get_query_cache(collection_name: str, persist_path: Optional[str] = None) -> QueryResultCache:
+    """Return the process-wide query cache for a collection stored under persist_path.
+
+    Every knowledge base instance over the same collection shares one cache, so a
+    write through any of them invalidates the results all of them serve. Collections
+    with the same name in different Chroma directories get separate caches.
+    """
+    key = (os.path.realpath(persist_path or CHROMA_PATH), collection_name)
+    with _query_caches_lock:
+        cache = _query_caches.get(key)
+        if cache is None:
+            cache = QueryResultCache(
+                maxsize=int(os.getenv("KB_QUERY_CACHE_SIZE", "256")),
+                ttl_seconds=float(os.getenv("KB_QUERY_CACHE_TTL", "300")),
+            )
+            _query_caches[key] = cache
+        return cache
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import print_system, print_error
+
+
+def refresh_error(report: Any) -> Optional[str]:
+    """Return why a refresh report describes a failed refresh, or None if it succeeded.
+
+    A refresh callable that returns None, or a report dict whose status is "failed",
+    did not bring its knowledge base up to date.
+    """
+    if report is None:
+        return "refresh returned no report"
+    if isinstance(report, dict) and report.get("status") == "failed":
+        return report.get("error") or "refresh reported a failure"
+    return None
+
+
+class RefreshJob:
+    """One knowledge base top-up scheduled by the refresher, with its bookkeeping."""
+
+    def __init__(self, name: str, refresh: Callable[[], Any], interval: float, max_staleness: float,
+                 data_timestamp: Optional[Callable[[], Optional[float]]] = None,
+                 last_success: Optional[float] = None):
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.data_timestamp = data_timestamp
+        self.last_attempt: Optional[float] = None
+        self.last_success = last_success
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_report: Any = None
+        self.runs = 0
+        self.failures = 0
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+
+    def metrics(self, now: float) -> Dict:
+        """Last refresh times and lag, in epoch seconds and seconds."""
+        lag = round(now - self.last_success, 1) if self.last_success is not None else None
+        data_ts = None
+        if self.data_timestamp is not None:
+            try:
+                data_ts = self.data_timestamp()
+            except Exception as e:
+                print_error(f"Error reading latest data timestamp for '{self.name}': {e}")
+        return {
+            "interval_seconds": self.interval,
+            "last_attempt": self.last_attempt,
+            "last_success": self.last_success,
+            "last_duration_seconds": self.last_duration,
+            # Time since the KB was last brought up to date
+            "lag_seconds": lag,
+            # Age of the newest document in the KB
+            "data_lag_seconds": round(now - data_ts, 1) if data_ts is not None else None,
+            "stale": lag is None or lag > self.max_staleness,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_report": self.last_report,
+            "running": self.running,
+        }
+
+
+class KnowledgeBaseRefresher:
+    """Periodically tops up knowledge bases from a task on the agent's event loop.
+
+    Each job's refresh callable runs in a worker thread (a coroutine function gets
+    its own event loop there), so ingestion and embedding never block agent turns.
+    A refresh fails when it raises or when refresh_error() flags its report; a
+    failed refresh is retried after retry_seconds instead of a full interval.
+    """
+
+    def __init__(self, interval: Optional[float] = None, max_staleness: Optional[float] = None,
+                 retry_seconds: Optional[float] = None):
+        self.interval = interval if interval is not None else float(os.getenv("KB_REFRESH_INTERVAL_SECONDS", "3600"))
+        self.max_staleness = max_staleness if max_staleness is not None else float(
+            os.getenv("KB_REFRESH_MAX_STALENESS_SECONDS", str(self.interval * 3))
+        )
+        self.retry_seconds = retry_seconds if retry_seconds is not None else float(
+            os.getenv("KB_REFRESH_RETRY_SECONDS", "300")
+        )
+        self._jobs: Dict[str, RefreshJob] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def add_job(self, name: str, refresh: Callable[[], Any], interval: Optional[float] = None,
+                data_timestamp: Optional[Callable[[], Optional[float]]] = None,
+                refreshed_now: bool = False) -> RefreshJob:
+        """Register a refresh callable; refreshed_now skips the immediate first run."""
+        job = RefreshJob(
+            name,
+            refresh,
+            interval if interval is not None else self.interval,
+            self.max_staleness,
+            data_timestamp,
+            last_success=time.time() if refreshed_now else None
+        )
+        with self._lock:
+            self._jobs[name] = job
+        return job
+
+    def start(self):
+        """Schedule every registered job on the running event loop."""
+        if not self.enabled:
+            print_system("Background knowledge base refresh is disabled (KB_REFRESH_INTERVAL_SECONDS=0)")
+            return
+        for job in self._jobs.values():
+            if job.task is None or job.task.done():
+                job.task = asyncio.get_running_loop().create_task(self._loop(job), name=f"kb-refresh-{job.name}")
+                print_system(f"Refreshing '{job.name}' in the background every {job.interval:.0f}s")
+
+    async def stop(self):
+        """Cancel the scheduled jobs and wait for them to finish."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.task = None
+
+    async def _loop(self, job: RefreshJob):
+        if job.last_success is not None:
+            await asyncio.sleep(max(job.last_success + job.interval - time.time(), 0))
+        while True:
+            await self.refresh_now(job.name)
+            await asyncio.sleep(job.interval if job.last_error is None else min(job.interval, self.retry_seconds))
+
+    @staticmethod
+    def _run(refresh: Callable[[], Any]) -> Any:
+        result = refresh()
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(result)
+        return result
+
+    async def refresh_now(self, name: str) -> Any:
+        """Run one refresh of job name in a worker thread and record its outcome."""
+        job = self._jobs[name]
+        if job.running:
+            return None
+        job.running = True
+        job.last_attempt = time.time()
+        try:
+            job.last_report = await asyncio.to_thread(self._run, job.refresh)
+            error = refresh_error(job.last_report)
+            if error is not None:
+                raise RuntimeError(error)
+            job.last_success = time.time()
+            job.last_error = None
+            print_system(f"Background refresh of '{name}' finished: {job.last_report}")
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print_error(f"Background refresh of '{name}' failed: {e}")
+        finally:
+            job.runs += 1
+            job.last_duration = time.time() - job.last_attempt
+            job.running = False
+        return job.last_report
+
+    def jobs(self) -> List[str]:
+        return list(self._jobs)
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-job refresh metrics keyed by job name."""
+        now = time.time()
+        return {name: job.metrics(now) for name, job in list(self._jobs.items())}
+
+
+_refresher: Optional[KnowledgeBaseRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher() -> KnowledgeBaseRefresher:
+    """Return the process-wide refresher."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = KnowledgeBaseRefresher()
+        return _refresher
@@ -0,0 +1,155 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from kb_core.query_cache import QueryResultCache
+from utils import print_system
+
+DEFAULT_RERANK_MODEL = os.getenv("KB_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+def rerank_enabled(rerank: Optional[bool] = None) -> bool:
+    """Resolve an explicit rerank flag, falling back to KB_RERANK."""
+    if rerank is not None:
+        return rerank
+    return os.getenv("KB_RERANK", "false").lower() == "true"
+
+
+class CrossEncoderReranker:
+    """Second-stage reranker that rescores bi-encoder candidates with a CPU cross-encoder.
+
+    Scores are cached per (query, document) pair. Candidates are scored best-first in
+    small batches until latency_budget_ms runs out; anything left unscored keeps its
+    retrieval order below the scored ones. Reranking is skipped outright when the top
+    retrieval cosine similarity already clears skip_threshold.
+
+    Scored results get a rerank_score: the cross-encoder logit squashed into (0, 1)
+    by a sigmoid. relevance_score is left as the retrieval score.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, candidates: Optional[int] = None,
+                 latency_budget_ms: Optional[float] = None, skip_threshold: Optional[float] = None,
+                 cache_size: Optional[int] = None, batch_size: int = 16):
+        self.model_name = model_name
+        self.candidates = candidates or int(os.getenv("KB_RERANK_CANDIDATES", "50"))
+        self.latency_budget_ms = latency_budget_ms if latency_budget_ms is not None else \
+            float(os.getenv("KB_RERANK_BUDGET_MS", "250"))
+        self.skip_threshold = skip_threshold if skip_threshold is not None else \
+            float(os.getenv("KB_RERANK_SKIP_THRESHOLD", "0.85"))
+        self.cache_size = cache_size or int(os.getenv("KB_RERANK_CACHE_SIZE", "4096"))
+        self.batch_size = batch_size
+        self._model = None
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"reranked": 0, "skipped": 0, "budget_exhausted": 0, "cache_hits": 0, "scored": 0}
+
+    @property
+    def model(self):
+        """Lazily load the cross-encoder the first time a query is reranked."""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                print_system(f"Loading reranking model '{self.model_name}'...")
+                start = time.perf_counter()
+                self._model = CrossEncoder(self.model_name, device="cpu")
+                print_system(f"Loaded reranking model in {time.perf_counter() - start:.2f}s")
+            return self._model
+
+    @staticmethod
+    def _pair_key(query: str, document: str) -> Tuple[str, str]:
+        return (
+            QueryResultCache.normalize_query(query),
+            hashlib.sha256(document.encode("utf-8")).hexdigest()
+        )
+
+    def _cached_score(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+                self._stats["cache_hits"] += 1
+            return score
+
+    def _store_scores(self, keys: List[Tuple[str, str]], scores: List[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+            self._stats["scored"] += len(keys)
+
+    def rerank(self, query: str, results: List[Dict], n_results: int,
+               top_similarity: Optional[float] = None, text_key: str = "content") -> List[Dict]:
+        """Reorder retrieval results for query by cross-encoder score and keep the top n_results.
+
+        top_similarity is the best bi-encoder cosine similarity for the query; when it
+        is at least skip_threshold the retrieval order is trusted as-is. text_key names the
+        result field holding the document text.
+        """
+        if not results:
+            return results
+        if top_similarity is not None and top_similarity >= self.skip_threshold:
+            with self._lock:
+                self._stats["skipped"] += 1
+            return results[:n_results]
+
+        model = self.model
+        deadline = time.perf_counter() + self.latency_budget_ms / 1000
+        keys = [self._pair_key(query, result[text_key]) for result in results]
+        scores: List[Optional[float]] = [self._cached_score(key) for key in keys]
+        misses = [i for i, score in enumerate(scores) if score is None]
+
+        # Score best-first so an exhausted budget still leaves the most likely hits reranked
+        exhausted = False
+        for start in range(0, len(misses), self.batch_size):
+            if time.perf_counter() >= deadline:
+                exhausted = True
+                break
+            batch = misses[start:start + self.batch_size]
+            predicted = [
+                float(score)
+                for score in model.predict([(query, results[i][text_key]) for i in batch], batch_size=self.batch_size)
+            ]
+            for i, score in zip(batch, predicted):
+                scores[i] = score
+            self._store_scores([keys[i] for i in batch], predicted)
+
+        scored = []
+        unscored = []
+        for result, score in zip(results, scores):
+            if score is None:
+                unscored.append(result)
+                continue
+            result["rerank_score"] = 1 / (1 + math.exp(-score))
+            scored.append(result)
+        scored.sort(key=lambda x: x["rerank_score"], reverse=True)
+
+        with self._lock:
+            self._stats["reranked"] += 1
+            if exhausted:
+                self._stats["budget_exhausted"] += 1
+        return (scored + unscored)[:n_results]
+
+    def stats(self) -> Dict:
+        """Report rerank, skip and cache counters."""
+        with self._lock:
+            return dict(self._stats, cache_size=len(self._scores), loaded=self._model is not None)
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Return the process-wide reranker; its model loads on the first rerank."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
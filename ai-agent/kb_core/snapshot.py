@@ -0,0 +1,138 @@
+"""Single-file snapshots of a knowledge base collection.
+
+Layout:
+    8 bytes   magic b"KBSNAP01"
+    8 bytes   little-endian uint64 length of the JSON header
+    N bytes   UTF-8 JSON header: model, dimension, count, ids, documents,
+              metadatas and source files
+    padding   zero bytes up to the next multiple of VECTOR_ALIGNMENT
+    count x dimension float16 vectors, row-major
+
+The vector block is read back with np.memmap, so importing never loads the
+whole matrix at once and never calls the embedding model.
+"""
+
+import json
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils import print_system
+
+SNAPSHOT_MAGIC = b"KBSNAP01"
+SNAPSHOT_VERSION = 1
+VECTOR_ALIGNMENT = 64
+
+# Rows per collection.get()/upsert() round trip
+_BATCH_SIZE = 5000
+
+
+def export_snapshot(collection, path: str, model_name: str, source_files: Optional[List[Dict]] = None) -> Dict:
+    """Write every row of collection, with float16 embeddings, to a snapshot file at path."""
+    start = time.perf_counter()
+    count = collection.count()
+    ids, documents, metadatas, blocks = [], [], [], []
+    for offset in range(0, count, _BATCH_SIZE):
+        rows = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=_BATCH_SIZE,
+            offset=offset
+        )
+        ids.extend(rows["ids"])
+        documents.extend(rows["documents"])
+        metadatas.extend(rows["metadatas"])
+        blocks.append(np.asarray(rows["embeddings"], dtype=np.float16))
+    vectors = np.vstack(blocks) if blocks else np.zeros((0, 0), dtype=np.float16)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "collection": collection.name,
+        "model": model_name,
+        "dimension": int(vectors.shape[1]) if len(vectors) else 0,
+        "count": len(ids),
+        "dtype": "float16",
+        "created_at": time.time(),
+        "ids": ids,
+        "documents": documents,
+        "metadatas": metadatas,
+        "source_files": source_files or [],
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix_length = len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)
+    vector_offset = -(-prefix_length // VECTOR_ALIGNMENT) * VECTOR_ALIGNMENT
+
+    # Write next to the target and rename, so a reader never sees a half-written snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (vector_offset - prefix_length))
+        f.write(np.ascontiguousarray(vectors).tobytes())
+    os.replace(tmp_path, path)
+
+    report = {
+        "path": path,
+        "count": len(ids),
+        "dimension": header["dimension"],
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    print_system(f"Exported snapshot of '{collection.name}': {report}")
+    return report
+
+
+def read_snapshot(path: str) -> Tuple[Dict, np.ndarray]:
+    """Return the header of the snapshot at path and a read-only memmap of its vectors."""
+    with open(path, "rb") as f:
+        magic = f.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a knowledge base snapshot")
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+
+    prefix_length = len(SNAPSHOT_MAGIC) + 8 + header_length
+    vector_offset = -(-prefix_length // VECTOR_ALIGNMENT) * VECTOR_ALIGNMENT
+    if header["count"] == 0:
+        return header, np.zeros((0, header["dimension"]), dtype=np.float16)
+    vectors = np.memmap(
+        path, dtype=np.float16, mode="r", offset=vector_offset, shape=(header["count"], header["dimension"])
+    )
+    return header, vectors
+
+
+def import_snapshot(collection, path: str, model_name: str, max_batch_size: Optional[int] = None) -> Dict:
+    """Bulk-upsert a snapshot into collection using its stored embeddings.
+
+    Raises ValueError if the snapshot was embedded with a different model, since
+    its vectors would not be comparable with the ones this collection queries with.
+    max_batch_size is the client's upsert limit (client.get_max_batch_size()).
+    """
+    start = time.perf_counter()
+    header, vectors = read_snapshot(path)
+    if header["model"] != model_name:
+        raise ValueError(
+            f"Snapshot was embedded with '{header['model']}' but this knowledge base uses '{model_name}'"
+        )
+
+    ids, documents, metadatas = header["ids"], header["documents"], header["metadatas"]
+    batch_size = min(_BATCH_SIZE, max_batch_size or _BATCH_SIZE)
+    for offset in range(0, len(ids), batch_size):
+        end = offset + batch_size
+        collection.upsert(
+            ids=ids[offset:end],
+            embeddings=np.asarray(vectors[offset:end], dtype=np.float32),
+            documents=documents[offset:end],
+            metadatas=metadatas[offset:end]
+        )
+
+    print_system(
+        f"Imported {len(ids)} rows into '{collection.name}' from {path} "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return header
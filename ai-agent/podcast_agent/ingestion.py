@@ -0,0 +1,141 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from kb_core.manifest import file_fingerprint
+from podcast_agent.transcript_chunker import build_segment_records
+from utils import print_error, print_system
+
+
+def parse_transcript_file(file_path: str, chunk_tokens: int, chunk_overlap: int) -> Dict:
+    """Fingerprint, parse and chunk one transcript file (runs in a worker)."""
+    fingerprint = file_fingerprint(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        transcript_data = json.load(f)
+    return {
+        "file_path": file_path,
+        "fingerprint": fingerprint,
+        "records": build_segment_records(file_path, transcript_data, chunk_tokens, chunk_overlap),
+    }
+
+
+class TranscriptIngestionPipeline:
+    """Streaming, resumable bulk ingestion of transcript files into a PodcastKnowledgeBase.
+
+    Files are parsed and chunked in a worker pool, their segments are pooled across
+    files into fixed-size batches, each batch is embedded in one call and written to
+    Chroma as one bulk upsert on a writer thread while the next batch embeds. A file
+    is checkpointed as complete in the manifest once its last segment is written, so
+    an interrupted run resumes from the files that were still in progress.
+    """
+
+    def __init__(self, knowledge_base, workers: Optional[int] = None, batch_size: Optional[int] = None,
+                 executor: Optional[str] = None):
+        self.knowledge_base = knowledge_base
+        self.workers = workers or int(os.getenv("PODCAST_INGEST_WORKERS", str(os.cpu_count() or 1)))
+        self.batch_size = batch_size or int(os.getenv("PODCAST_INGEST_BATCH_SIZE", "512"))
+        # Threads are enough when embedding dominates; processes help with very large JSON files
+        self.executor = (executor or os.getenv("PODCAST_INGEST_EXECUTOR", "thread")).lower()
+        self._remaining: Dict[str, int] = {}
+        self._fingerprints: Dict[str, Dict] = {}
+        self._segments_written = 0
+        self._files_completed = 0
+
+    def _make_parse_executor(self) -> Executor:
+        if self.executor == "process":
+            # spawn avoids forking a process that already runs torch and Chroma threads
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def run(self, file_paths: List[str]) -> Dict:
+        """Ingest file_paths and return a throughput report."""
+        from podcast_agent.podcast_knowledge_base import PodcastSegment
+
+        kb = self.knowledge_base
+        start = time.perf_counter()
+        failed = []
+        buffer = []
+        in_flight: Optional[Future] = None
+
+        with self._make_parse_executor() as parse_pool, ThreadPoolExecutor(max_workers=1) as writer:
+            futures = {
+                parse_pool.submit(parse_transcript_file, file_path, kb.chunk_tokens, kb.chunk_overlap): file_path
+                for file_path in file_paths
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    print_error(f"Error parsing {file_path}: {e}")
+                    failed.append(file_path)
+                    continue
+
+                file_name = os.path.basename(file_path)
+                records = parsed["records"]
+                fingerprint = parsed["fingerprint"]
+
+                # Clear out an older version or a partial write from an interrupted run
+                if kb.manifest.get_file(file_name) is not None:
+                    kb.remove_source_file(file_path)
+                kb.manifest.record_file(
+                    file_name, fingerprint["file_hash"], fingerprint["mtime"], len(records), status="in_progress"
+                )
+                if not records:
+                    kb.manifest.record_file(file_name, fingerprint["file_hash"], fingerprint["mtime"], 0)
+                    self._files_completed += 1
+                    continue
+
+                self._remaining[file_name] = len(records)
+                self._fingerprints[file_name] = dict(fingerprint, segment_count=len(records))
+                buffer.extend(PodcastSegment(**record) for record in records)
+
+                while len(buffer) >= self.batch_size:
+                    batch, buffer = buffer[:self.batch_size], buffer[self.batch_size:]
+                    in_flight = self._flush(batch, writer, in_flight)
+
+            if buffer:
+                in_flight = self._flush(buffer, writer, in_flight)
+            if in_flight is not None:
+                in_flight.result()
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "status": "failed" if failed else "ok",
+            "files": self._files_completed,
+            "failed": len(failed),
+            "segments": self._segments_written,
+            "seconds": round(elapsed, 2),
+            "segments_per_second": round(self._segments_written / elapsed, 1) if elapsed else 0.0,
+        }
+        if failed:
+            report["error"] = f"Could not parse {len(failed)} file(s): {', '.join(os.path.basename(f) for f in failed)}"
+        return report
+
+    def _flush(self, batch: List, writer: ThreadPoolExecutor, in_flight: Optional[Future]) -> Future:
+        """Embed batch on this thread, then hand the write to the writer thread."""
+        embeddings = self.knowledge_base.embedding_function.embed([segment.content for segment in batch])
+        # Keep writes (and therefore checkpoints) strictly in order
+        if in_flight is not None:
+            in_flight.result()
+        return writer.submit(self._write, batch, embeddings.tolist())
+
+    def _write(self, batch: List, embeddings: List[List[float]]):
+        """Bulk-write one batch and checkpoint every file it completes."""
+        kb = self.knowledge_base
+        kb.upsert_embedded_segments(batch, embeddings)
+        self._segments_written += len(batch)
+
+        for segment in batch:
+            file_name = os.path.basename(segment.source_file)
+            self._remaining[file_name] -= 1
+            if self._remaining[file_name] == 0:
+                fingerprint = self._fingerprints.pop(file_name)
+                kb.manifest.record_file(
+                    file_name, fingerprint["file_hash"], fingerprint["mtime"], fingerprint["segment_count"]
+                )
+                self._files_completed += 1
+                print_system(f"Ingested {segment.source_file}")
@@ -1,18 +1,34 @@
 import os
 import sys
+import threading
+from collections import Counter
 
 # Add the parent directory to PYTHONPATH
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import chromadb
+import numpy as np
 from datetime import datetime
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 import json
 from utils import print_system, print_error
+from kb_core import snapshot
+from kb_core.config import CHROMA_PATH
+from kb_core.embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_function
+from kb_core.executor import run_in_query_executor
+from kb_core.index import ExactSearchIndex, IndexSettings, distance_to_similarity, open_collection, recreate_collection
+from kb_core.lexical import RRF_K, BM25Index, reciprocal_rank_fusion
+from kb_core.manifest import CollectionManifest, file_fingerprint
+from kb_core.query_cache import get_query_cache
+from kb_core.rerank import get_reranker, rerank_enabled
+from podcast_agent.ingestion import TranscriptIngestionPipeline
+from podcast_agent.speakers import SpeakerMatcher
+from podcast_agent.transcript_chunker import build_segment_records
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
 
 class PodcastSegment(BaseModel):
     id: str  # We'll generate this
@@ -20,48 +36,108 @@ class PodcastSegment(BaseModel):
     content: str
     source_file: str
     timestamp: str = None  # Optional, if available in future
+    start_index: Optional[int] = None  # First transcript entry covered by this chunk
+    end_index: Optional[int] = None  # Last transcript entry covered by this chunk
 
 class PodcastKnowledgeBase:
-    def __init__(self, collection_name: str = "podcast_knowledge"):
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(path="./chroma_db")
-        
-        # Use the same advanced embedding model as Twitter KB
-        self.embedding_model = SentenceTransformer('all-mpnet-base-v2')
+    def __init__(self, collection_name: str = "podcast_knowledge", embedding_model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 embedding_backend: Optional[str] = None,
+                 chunk_tokens: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                 persist_path: Optional[str] = None,
+                 index_settings: Optional[IndexSettings] = None):
+        # Initialize ChromaDB client with persistence (persist_path overrides it, e.g. for benchmarks)
+        self.client = chromadb.PersistentClient(path=persist_path or CHROMA_PATH)
         
-        # Create embedding function
-        class EmbeddingFunction:
-            def __init__(self, model):
-                self.model = model
-            
-            def __call__(self, input: List[str]) -> List[List[float]]:
-                embeddings = self.model.encode(input)
-                return embeddings.tolist()
+        # Token window for transcript chunking; 0 stores one vector per speaker turn
+        self.chunk_tokens = chunk_tokens if chunk_tokens is not None else int(os.getenv("PODCAST_CHUNK_TOKENS", "256"))
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else int(os.getenv("PODCAST_CHUNK_OVERLAP", "32"))
         
-        embedding_func = EmbeddingFunction(self.embedding_model)
+        # Use the same shared embedding model instance as the Twitter KB
+        embedding_func = get_embedding_function(embedding_model_name, embedding_backend)
+        self.embedding_function = embedding_func
         
-        # Create or get collection
+        # Create or get collection with its HNSW settings; small collections are searched exactly
+        self.index_settings = index_settings or IndexSettings.from_env()
         try:
-            self.collection = self.client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=embedding_func
-            )
+            self.collection = open_collection(self.client, collection_name, embedding_func, self.index_settings)
         except Exception as e:
             print_error(f"Error initializing collection: {e}")
             raise
+        self.exact_index = ExactSearchIndex(self.collection, self.index_settings.exact_search_threshold)
+        
+        # Sidecar store for stats and per-file ingestion state
+        self.manifest = CollectionManifest(
+            collection_name, path=os.path.join(persist_path, "kb_manifest.db") if persist_path else None
+        )
+        self._bootstrap_manifest()
+        
+        # LRU+TTL cache of query results, invalidated on every write
+        self.query_cache = get_query_cache(collection_name, persist_path)
+        
+        # BM25 index over segment text, built on first lexical/hybrid query and kept in sync on writes
+        self._lexical_index: Optional[BM25Index] = None
+        self._lexical_generation = None
+        self._lexical_lock = threading.Lock()  # Concurrent async queries share one build
+        
+        # Speaker names seen at ingestion, matched against queries to push down a speaker filter
+        self._speaker_matcher: Optional[SpeakerMatcher] = None
+
+    @staticmethod
+    def _timestamp_to_epoch(timestamp: str) -> float:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+    def _bootstrap_manifest(self):
+        """Seed the manifest from an existing collection the first time it is opened."""
+        if self.manifest.is_initialized():
+            if not self.manifest.speakers() and self.manifest.get_stats()["count"]:
+                # Manifest predates the speaker dictionary
+                metadatas = self.collection.get(include=["metadatas"])["metadatas"]
+                self.manifest.record_speakers(Counter(m["speaker"] for m in metadatas))
+            return
+        count = self.collection.count()
+        latest_ts = None
+        if count:
+            print_system("Building podcast knowledge base manifest from existing segments (one-time scan)...")
+            metadatas = self.collection.get(include=["metadatas"])["metadatas"]
+            latest_ts = max(self._timestamp_to_epoch(m["timestamp"]) for m in metadatas)
+            segments_per_file = {}
+            for m in metadatas:
+                file_name = os.path.basename(m["source_file"])
+                segments_per_file[file_name] = segments_per_file.get(file_name, 0) + 1
+            for file_name, segment_count in segments_per_file.items():
+                # Hash and mtime are unknown for files ingested before the manifest existed
+                self.manifest.record_file(file_name, None, None, segment_count)
+            self.manifest.record_speakers(Counter(m["speaker"] for m in metadatas))
+        self.manifest.set_stats(count, latest_ts)
+
+    @property
+    def embedding_model(self):
+        """The shared SentenceTransformer instance (loaded on first access)."""
+        return self.embedding_function.model
+
+    def _segment_metadata(self, segment: PodcastSegment) -> Dict:
+        """Build the Chroma metadata stored alongside a segment."""
+        metadata = {
+            "speaker": segment.speaker,
+            # Keyed by file name, like the manifest, so a file is found whatever path it was ingested from
+            "source_file": os.path.basename(segment.source_file),
+            "timestamp": segment.timestamp or datetime.now().isoformat(),
+        }
+        # Chroma rejects None metadata values, so the ordinal range is only set when known
+        if segment.start_index is not None:
+            metadata["start_index"] = segment.start_index
+            metadata["end_index"] = segment.end_index
+        return metadata
 
     def add_segments(self, segments: List[PodcastSegment]):
-        """Add podcast segments to the knowledge base."""
+        """Add podcast segments to the knowledge base; segments whose ID is already stored are skipped."""
+        existing = set(self.collection.get(ids=[segment.id for segment in segments], include=[])["ids"])
+        segments = [segment for segment in segments if segment.id not in existing]
+        if not segments:
+            return
         documents = [segment.content for segment in segments]
         ids = [segment.id for segment in segments]
-        metadata = [
-            {
-                "speaker": segment.speaker,
-                "source_file": segment.source_file,
-                "timestamp": segment.timestamp or datetime.now().isoformat(),
-            }
-            for segment in segments
-        ]
+        metadata = [self._segment_metadata(segment) for segment in segments]
         
         try:
             self.collection.add(
@@ -69,27 +145,103 @@ class PodcastKnowledgeBase:
                 ids=ids,
                 metadatas=metadata
             )
+            self._after_write(ids, documents, metadata, Counter(m["speaker"] for m in metadata))
             print_system(f"Added {len(segments)} segments to knowledge base")
         except Exception as e:
             print_error(f"Error adding segments: {e}")
 
+    def upsert_embedded_segments(self, segments: List[PodcastSegment], embeddings: List[List[float]]):
+        """Write segments whose embeddings were computed by the caller, replacing same-ID rows."""
+        documents = [segment.content for segment in segments]
+        ids = [segment.id for segment in segments]
+        metadata = [self._segment_metadata(segment) for segment in segments]
+        
+        # Replaced rows give back their speaker counts before the new rows add theirs
+        speaker_counts = Counter(m["speaker"] for m in metadata)
+        speaker_counts.subtract(m["speaker"] for m in self.collection.get(ids=ids, include=["metadatas"])["metadatas"])
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadata
+        )
+        self._after_write(ids, documents, metadata, speaker_counts)
+
+    def _after_write(self, ids: List[str], documents: List[str], metadata: List[Dict],
+                     speaker_counts: Optional[Dict[str, int]] = None):
+        """Bring the manifest, query cache and lexical index up to date after a write.
+
+        speaker_counts is the net change in segments per speaker; None leaves the speaker table alone.
+        """
+        self.manifest.record_add(
+            self.collection.count(),
+            max((self._timestamp_to_epoch(m["timestamp"]) for m in metadata), default=None)
+        )
+        if speaker_counts is not None:
+            self.manifest.record_speakers(dict(speaker_counts))
+        self._speaker_matcher = None
+        self.query_cache.invalidate()
+        if self._lexical_index is not None:
+            self._lexical_index.add(ids, documents)
+            self._lexical_generation = self.query_cache.generation
+
+    def remove_source_file(self, file_path: str) -> int:
+        """Delete every segment ingested from file_path. Returns the number removed."""
+        file_name = os.path.basename(file_path)
+        # Rows written before source_file was keyed by name hold the path they were ingested from
+        stale = self.collection.get(
+            where={"source_file": {"$in": sorted({file_name, file_path})}}, include=["metadatas"]
+        )
+        stale_ids = stale["ids"]
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+            self.manifest.record_speakers({
+                speaker: -count for speaker, count in Counter(m["speaker"] for m in stale["metadatas"]).items()
+            })
+            self._speaker_matcher = None
+        self.manifest.record_delete(self.collection.count())
+        self.query_cache.invalidate()
+        if self._lexical_index is not None:
+            self._lexical_index.remove(stale_ids)
+            self._lexical_generation = self.query_cache.generation
+        return len(stale_ids)
+
+    def export_snapshot(self, path: str) -> Dict:
+        """Write every segment, its float16 embedding and the ingested-file list to a single snapshot file."""
+        return snapshot.export_snapshot(
+            self.collection, path, self.embedding_function.model_name, source_files=self.manifest.list_files()
+        )
+
+    def import_snapshot(self, path: str) -> int:
+        """Bulk-load a snapshot from export_snapshot without running the embedding model. Returns the row count."""
+        header = snapshot.import_snapshot(
+            self.collection, path, self.embedding_function.model_name, self.client.get_max_batch_size()
+        )
+        self._after_write(header["ids"], header["documents"], header["metadatas"])
+        # Which imported rows replaced stored ones is unknown, so recount speakers from the collection
+        self.manifest.set_speakers(Counter(
+            m["speaker"] for m in self.collection.get(include=["metadatas"])["metadatas"]
+        ))
+        # Restored files count as processed, so the next ingestion run skips them
+        for entry in header["source_files"]:
+            self.manifest.record_file(**entry)
+        return header["count"]
+
     def process_json_file(self, file_path: str):
         """Process a podcast transcript JSON file and add it to the knowledge base."""
         try:
+            file_name = os.path.basename(file_path)
+            fingerprint = file_fingerprint(file_path)
             with open(file_path, 'r', encoding='utf-8') as f:
                 transcript_data = json.load(f)
             
-            segments = []
-            for idx, entry in enumerate(transcript_data):
-                segment = PodcastSegment(
-                    id=f"{os.path.basename(file_path)}_{idx}",
-                    speaker=entry['speaker'],
-                    content=entry['content'],
-                    source_file=file_path
-                )
-                segments.append(segment)
+            # Drop segments from an earlier version of this file before re-ingesting it
+            if self.manifest.get_file(file_name) is not None:
+                self.remove_source_file(file_path)
             
+            segments = self.build_segments(file_path, transcript_data)
             self.add_segments(segments)
+            self.manifest.record_file(file_name, fingerprint["file_hash"], fingerprint["mtime"], len(segments))
             print_system(f"Successfully processed {file_path}")
             return True
             
@@ -97,41 +249,224 @@ class PodcastKnowledgeBase:
             print_error(f"Error processing {file_path}: {e}")
             return False
 
-    def query_knowledge_base(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Query the knowledge base for relevant podcast segments."""
+    def build_segments(self, file_path: str, transcript_data: List[Dict]) -> List[PodcastSegment]:
+        """Turn a parsed transcript into the segments stored for it."""
+        return [
+            PodcastSegment(**record)
+            for record in build_segment_records(file_path, transcript_data, self.chunk_tokens, self.chunk_overlap)
+        ]
+
+    def is_file_processed(self, file_path: str) -> bool:
+        """Check whether file_path was already ingested and has not changed since."""
+        entry = self.manifest.get_file(os.path.basename(file_path))
+        if entry is None or entry["status"] != "complete":
+            return False
+        # Legacy entries have no fingerprint; matching by name is all we can do
+        if entry["file_hash"] is None or entry["mtime"] == os.path.getmtime(file_path):
+            return True
+        # mtime changed: only re-ingest if the content really differs
+        return file_fingerprint(file_path)["file_hash"] == entry["file_hash"]
+
+    def query_knowledge_base(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                             rerank: Optional[bool] = None, speaker_filter: Optional[bool] = None) -> List[Dict]:
+        """Query the knowledge base for relevant podcast segments.
+
+        mode selects "vector" (embedding similarity), "lexical" (BM25) or "hybrid"
+        (reciprocal rank fusion of both); it defaults to PODCAST_KB_RETRIEVAL_MODE.
+        rerank (default KB_RERANK) rescores an over-fetched candidate set with a cross-encoder.
+        speaker_filter (default PODCAST_KB_SPEAKER_FILTER, off) restricts the search to speakers named in the query.
+        """
+        print_system(f"Querying knowledge base with: {query}")
+        results = self.query_many([query], n_results=n_results, mode=mode, rerank=rerank,
+                                  speaker_filter=speaker_filter)
+        return results[0] if results else []
+
+    async def aquery_knowledge_base(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                                    rerank: Optional[bool] = None, speaker_filter: Optional[bool] = None) -> List[Dict]:
+        """Async query_knowledge_base: encoding and search run on the shared query executor."""
+        return await run_in_query_executor(self.query_knowledge_base, query, n_results, mode, rerank, speaker_filter)
+
+    def _get_speaker_matcher(self) -> SpeakerMatcher:
+        """Return the matcher over the speaker dictionary, rebuilding it after the speakers changed."""
+        matcher = self._speaker_matcher
+        if matcher is None:
+            matcher = self._speaker_matcher = SpeakerMatcher(self.manifest.speakers())
+        return matcher
+
+    def _query_where(self, query: str, where: Optional[Dict], speaker_filter: bool) -> Optional[Dict]:
+        """Combine the caller's where clause with a filter on the speakers named in query."""
+        speaker_where = self._get_speaker_matcher().where(query) if speaker_filter else None
+        if speaker_where is None:
+            return where
+        print_system(f"Restricting search to speaker filter {speaker_where}")
+        return {"$and": [where, speaker_where]} if where else speaker_where
+
+    def query_many(self, queries: List[str], n_results: int = 5, where: Optional[Dict] = None,
+                   mode: Optional[str] = None, rerank: Optional[bool] = None,
+                   speaker_filter: Optional[bool] = None) -> List[List[Dict]]:
+        """Query the knowledge base for several queries in one batched round trip.
+
+        All queries are encoded in a single forward pass and sent to Chroma as one
+        query per distinct where clause; results come back as one list of segments
+        per query, in input order. With speaker_filter on, queries naming a known
+        speaker only search that speaker's segments.
+        """
+        if not queries:
+            return []
+        mode = (mode or os.getenv("PODCAST_KB_RETRIEVAL_MODE", "vector")).lower()
+        if mode not in RETRIEVAL_MODES:
+            print_error(f"Unknown retrieval mode '{mode}', falling back to vector search")
+            mode = "vector"
+        rerank = rerank_enabled(rerank)
+        if speaker_filter is None:
+            speaker_filter = os.getenv("PODCAST_KB_SPEAKER_FILTER", "false").lower() == "true"
+        
+        wheres = [self._query_where(query, where, speaker_filter) for query in queries]
+        keys = [
+            self.query_cache.make_key(query, n_results=n_results, where=query_where, mode=mode, rerank=rerank)
+            for query, query_where in zip(queries, wheres)
+        ]
+        per_query = [self.query_cache.get(key) for key in keys]
+        pending = [i for i, cached in enumerate(per_query) if cached is None]
+        if not pending:
+            print_system(f"Served {len(queries)} queries from the query cache")
+            return per_query
+        
         try:
-            print_system(f"Querying knowledge base with: {query}")
+            # The reranker gets a wider candidate pool and cuts it back to n_results itself
+            fetch_count = max(n_results, get_reranker().candidates) if rerank else n_results
             
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            # (results, row) holding each pending query's vector hits
+            located = {i: (None, 0) for i in pending}
+            if mode != "lexical":
+                query_embeddings = self.embedding_function.embed([queries[i] for i in pending])
+                groups: Dict[str, List[int]] = {}
+                for position, i in enumerate(pending):
+                    groups.setdefault(json.dumps(wheres[i], sort_keys=True), []).append(position)
+                for positions in groups.values():
+                    results = self._vector_search(
+                        query_embeddings[positions],
+                        # Over-fetch so fusion has candidates beyond the final top-n
+                        fetch_count if mode == "vector" else self._candidate_count(fetch_count),
+                        wheres[pending[positions[0]]],
+                        ["documents", "metadatas", "distances"]
+                    )
+                    for row, position in enumerate(positions):
+                        located[pending[position]] = (results, row)
             
-            if not results['documents'][0]:
-                print_system("No results found in knowledge base")
-                return []
-                
-            formatted_results = []
-            for doc, metadata, distance in zip(
-                results['documents'][0], 
-                results['metadatas'][0],
-                results['distances'][0]
-            ):
-                formatted_results.append({
-                    "content": doc,
-                    "metadata": metadata,
-                    "relevance_score": 1 - distance
-                })
-            
-            # Sort by relevance score
-            formatted_results.sort(key=lambda x: x['relevance_score'], reverse=True)
-            
-            print_system(f"Found {len(formatted_results)} relevant segments")
-            return formatted_results
+            for i in pending:
+                results, row = located[i]
+                if mode == "vector":
+                    per_query[i] = self._format_results(results, row)
+                else:
+                    vector_ids = results['ids'][row] if results else []
+                    per_query[i] = self._ranked_results(queries[i], vector_ids, fetch_count, wheres[i], mode)
+                if rerank:
+                    # Fused and BM25 scores are rank-normalized, so only a real cosine can skip reranking
+                    distances = results['distances'][row] if results else []
+                    top_similarity = distance_to_similarity(distances[0], self.exact_index.space) if distances else None
+                    per_query[i] = get_reranker().rerank(queries[i], per_query[i], n_results, top_similarity)
+                self.query_cache.put(keys[i], per_query[i])
+            print_system(f"Found {sum(len(r) for r in per_query)} relevant segments for {len(queries)} queries")
+            return per_query
             
         except Exception as e:
             print_error(f"Error querying knowledge base: {e}")
+            return [cached or [] for cached in per_query]
+
+    def _vector_search(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict],
+                       include: List[str]) -> Dict:
+        """Nearest-neighbour search: an exact NumPy scan for small collections, Chroma's HNSW index otherwise."""
+        # The manifest generation also moves on writes from other processes
+        generation = (self.query_cache.generation, self.manifest.generation())
+        results = self.exact_index.search(query_embeddings, n_results, where, include, generation)
+        if results is None:
+            results = self.collection.query(
+                query_embeddings=query_embeddings.tolist(),
+                n_results=n_results,
+                where=where,
+                include=include
+            )
+        return results
+
+    @staticmethod
+    def _candidate_count(n_results: int) -> int:
+        return max(n_results * 4, 20)
+
+    def _get_lexical_index(self) -> BM25Index:
+        """Return the BM25 index, (re)building it if it is missing or another writer changed the collection."""
+        with self._lexical_lock:
+            if self._lexical_index is None or self._lexical_generation != self.query_cache.generation:
+                print_system("Building lexical index for podcast knowledge base...")
+                index = BM25Index()
+                rows = self.collection.get(include=["documents"])
+                index.add(rows["ids"], rows["documents"])
+                self._lexical_index = index
+                self._lexical_generation = self.query_cache.generation
+            return self._lexical_index
+
+    def _ranked_results(self, query: str, vector_ids: List[str], n_results: int,
+                        where: Optional[Dict], mode: str) -> List[Dict]:
+        """Rank segments by BM25 alone or fused with the vector ranking."""
+        # Restrict BM25 to segments matching the where clause before it truncates its candidates
+        allowed_ids = set(self.collection.get(where=where, include=[])["ids"]) if where else None
+        lexical_hits = self._get_lexical_index().search(query, self._candidate_count(n_results), allowed_ids)
+        if mode == "lexical":
+            top_score = lexical_hits[0][1] if lexical_hits else 1.0
+            ranking = [(doc_id, score / top_score) for doc_id, score in lexical_hits]
+        else:
+            fused = reciprocal_rank_fusion([vector_ids, [doc_id for doc_id, _ in lexical_hits]])
+            # Scale so a document ranked first by both retrievers scores 1.0
+            best_possible = 2.0 / (RRF_K + 1)
+            ranking = [(doc_id, score / best_possible) for doc_id, score in fused]
+        if not ranking:
             return []
+        
+        # Vector hits were already filtered by Chroma; the where clause is applied again while hydrating
+        rows = self.collection.get(
+            ids=[doc_id for doc_id, _ in ranking],
+            where=where,
+            include=["documents", "metadatas"]
+        )
+        hydrated = {
+            doc_id: (doc, metadata)
+            for doc_id, doc, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"])
+        }
+        
+        formatted_results = []
+        for doc_id, score in ranking:
+            if doc_id not in hydrated:
+                continue
+            doc, metadata = hydrated[doc_id]
+            formatted_results.append({
+                "content": doc,
+                "metadata": metadata,
+                "relevance_score": score
+            })
+            if len(formatted_results) == n_results:
+                break
+        return formatted_results
+
+    def _format_results(self, results: Dict, index: int) -> List[Dict]:
+        """Format the Chroma results for the query at index, most relevant first."""
+        if not results['documents'][index]:
+            return []
+            
+        formatted_results = []
+        for doc, metadata, distance in zip(
+            results['documents'][index], 
+            results['metadatas'][index],
+            results['distances'][index]
+        ):
+            formatted_results.append({
+                "content": doc,
+                "metadata": metadata,
+                "relevance_score": distance_to_similarity(distance, self.exact_index.space)
+            })
+        
+        # Sort by relevance score
+        formatted_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return formatted_results
 
     def format_query_results(self, results: List[Dict]) -> str:
         """Format query results into a readable string."""
@@ -153,75 +488,82 @@ class PodcastKnowledgeBase:
         """Clear all segments from the knowledge base."""
         try:
             print_system("Clearing knowledge base collection...")
-            ids = self.collection.get()["ids"]
-            if ids:
-                self.collection.delete(ids=ids)
-                print_system("Knowledge base cleared successfully")
-            else:
-                print_system("Knowledge base is already empty")
+            # Dropping the collection is O(1) in rows, unlike fetching and deleting every ID
+            self.collection = recreate_collection(
+                self.client, self.collection.name, self.embedding_function, self.index_settings
+            )
+            self.exact_index = ExactSearchIndex(self.collection, self.index_settings.exact_search_threshold)
+            print_system("Knowledge base cleared successfully")
+            self.manifest.reset()
+            self.query_cache.invalidate()
+            self._lexical_index = None
+            self._speaker_matcher = None
             return True
         except Exception as e:
             print_error(f"Error clearing knowledge base: {str(e)}")
             return False
 
     def get_processed_files(self) -> set:
-        """Get a set of already processed file names from the metadata."""
+        """Get a set of already processed file names from the manifest."""
         try:
-            metadata = self.collection.get()
-            if not metadata.get("metadatas"):
-                return set()
-            return {os.path.basename(m["source_file"]) for m in metadata["metadatas"]}
+            return self.manifest.processed_files()
         except Exception as e:
             print_error(f"Error getting processed files: {e}")
             return set()
 
     def process_all_json_files(self, directory: str = "jsonoutputs"):
-        """Process all JSON files in the specified directory, skipping already processed ones."""
+        """Process all JSON files in the specified directory, skipping already processed ones.
+
+        Files are ingested through TranscriptIngestionPipeline; an interrupted run picks
+        up again from the first file that was not checkpointed as complete. Returns the
+        ingestion report, whose status is "failed" (with the error) if anything went wrong.
+        """
         try:
             # Convert to absolute path relative to the project root
             abs_directory = os.path.join(parent_dir, directory)
             
             if not os.path.exists(abs_directory):
                 print_error(f"Directory not found: {abs_directory}")
-                return
+                return {"status": "failed", "error": f"Directory not found: {abs_directory}"}
             
-            # Get list of all JSON files and already processed files
+            # Get list of all JSON files
             json_files = [f for f in os.listdir(abs_directory) if f.endswith('.json')]
-            processed_files = self.get_processed_files()
             
-            # Filter out already processed files
-            new_files = [f for f in json_files if f not in processed_files]
+            # Filter out already processed, unchanged files
+            new_files = [f for f in json_files if not self.is_file_processed(os.path.join(abs_directory, f))]
             
             if not new_files:
                 print_system("No new JSON files to process")
-                return
+                return {"status": "ok", "files": 0, "failed": 0, "segments": 0}
             
             print_system(f"Found {len(new_files)} new JSON files to process")
             
-            for json_file in new_files:
-                file_path = os.path.join(abs_directory, json_file)
-                self.process_json_file(file_path)
+            # Parse in parallel, embed in fixed-size batches and checkpoint per file
+            pipeline = TranscriptIngestionPipeline(self)
+            report = pipeline.run([os.path.join(abs_directory, json_file) for json_file in new_files])
                 
-            print_system("Finished processing all new JSON files")
+            print_system(f"Finished processing all new JSON files: {report}")
+            return report
             
         except Exception as e:
             print_error(f"Error processing JSON files: {e}")
+            return {"status": "failed", "error": str(e)}
 
     def get_collection_stats(self) -> Dict:
         """Get statistics about the knowledge base collection."""
         try:
-            count = self.collection.count()
-            metadata = self.collection.get()
+            stats = self.manifest.get_stats()
+            count = stats["count"]
             last_update = None
-            if metadata.get("metadatas"):
-                # Get most recent timestamp
-                last_update = max(m["timestamp"] for m in metadata["metadatas"])
-                last_update = datetime.fromisoformat(last_update.replace('Z', '+00:00'))
+            if stats["latest_ts"] is not None:
+                # Most recent timestamp, tracked on every add
+                last_update = datetime.fromtimestamp(stats["latest_ts"])
             
             print_system(f"Podcast knowledge base contains {count} segments")
             return {
                 "count": count,
-                "last_update": last_update or datetime.now()
+                "last_update": last_update or datetime.now(),
+                "query_cache": self.query_cache.stats()
             }
         except Exception as e:
             print_error(f"Error getting collection stats: {str(e)}")
@@ -241,13 +583,12 @@ def main():
         "How many daily active users does Ronin have?",
     ]
 
-    # Run each test query
-    for query in test_queries:
+    # Run all test queries in one batched round trip
+    for query, results in zip(test_queries, kb.query_many(test_queries)):
         print("\n" + "="*50)
         print(f"Query: {query}")
         print("="*50)
         
-        results = kb.query_knowledge_base(query)
         print(kb.format_query_results(results))
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from kb_core.lexical import STOPWORDS
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Labels for unnamed speakers that also occur as ordinary words in questions
+_GENERIC_LABELS = frozenset("host guest speaker interviewer interviewee unknown narrator".split())
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class SpeakerMatcher:
+    """Finds known podcast speakers mentioned in a free-text query.
+
+    Each speaker is matched by their full name and by any single name part, so
+    "what did Jeff say" finds "Jeff Zirlin" (and every other Jeff). Stopwords,
+    short tokens and generic labels such as "Host" never match on their own.
+    """
+
+    def __init__(self, speakers: Iterable[str]):
+        aliases: Dict[tuple, set] = {}
+        for speaker in speakers:
+            words = _words(speaker)
+            if not words:
+                continue
+            aliases.setdefault(tuple(words), set()).add(speaker)
+            if len(words) > 1:
+                for word in words:
+                    aliases.setdefault((word,), set()).add(speaker)
+
+        self._aliases: Dict[tuple, List[str]] = {}
+        for alias, names in aliases.items():
+            if len(alias) == 1 and (alias[0] in STOPWORDS or alias[0] in _GENERIC_LABELS or len(alias[0]) < 3):
+                continue
+            # Someone's full name beats a name part of another speaker; a shared part matches all of them
+            full_names = [name for name in names if tuple(_words(name)) == alias]
+            self._aliases[alias] = sorted(full_names or names)
+        self._max_length = max((len(alias) for alias in self._aliases), default=0)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def detect(self, query: str) -> List[str]:
+        """Return the speakers named in query, in order of first mention."""
+        words = _words(query)
+        found: List[str] = []
+        i = 0
+        while i < len(words):
+            # Longest alias first, so "jeff zirlin" wins over "jeff"
+            for length in range(min(self._max_length, len(words) - i), 0, -1):
+                names = self._aliases.get(tuple(words[i:i + length]))
+                if names:
+                    found.extend(name for name in names if name not in found)
+                    i += length
+                    break
+            else:
+                i += 1
+        return found
+
+    def where(self, query: str) -> Optional[Dict]:
+        """Chroma where clause restricting a search to the speakers named in query, if any."""
+        speakers = self.detect(query)
+        if not speakers:
+            return None
+        return {"speaker": speakers[0]} if len(speakers) == 1 else {"speaker": {"$in": speakers}}
@@ -0,0 +1,101 @@
+import math
+import os
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+# Average WordPiece tokens per whitespace word for English podcast speech
+TOKENS_PER_WORD = 1.3
+
+
+class TranscriptChunk(BaseModel):
+    speaker: str
+    content: str
+    start_index: int  # First transcript entry covered (inclusive)
+    end_index: int  # Last transcript entry covered (inclusive)
+    part: int = 0  # Window number when one turn was split
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the embedding-model token count of text without loading a tokenizer."""
+    return math.ceil(len(text.split()) * TOKENS_PER_WORD)
+
+
+def chunk_transcript(entries: List[Dict], max_tokens: int = 256, overlap_tokens: int = 32) -> List[TranscriptChunk]:
+    """Turn speaker entries into embedding-sized chunks.
+
+    Consecutive turns by the same speaker are merged while they fit in max_tokens,
+    and any turn longer than max_tokens is split into sliding windows that overlap
+    by overlap_tokens, so nothing is lost to the model's truncation.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    # Merge runs of short turns by the same speaker
+    groups = []
+    for idx, entry in enumerate(entries):
+        content = entry['content'].strip()
+        if not content:
+            continue
+        speaker = entry['speaker']
+        if groups and groups[-1]["speaker"] == speaker and \
+                estimate_tokens(groups[-1]["content"]) + estimate_tokens(content) <= max_tokens:
+            groups[-1]["content"] += " " + content
+            groups[-1]["end_index"] = idx
+        else:
+            groups.append({"speaker": speaker, "content": content, "start_index": idx, "end_index": idx})
+
+    # Split anything that is still too long into overlapping windows
+    window_words = max(int(max_tokens / TOKENS_PER_WORD), 1)
+    step_words = max(window_words - int(overlap_tokens / TOKENS_PER_WORD), 1)
+    chunks = []
+    for group in groups:
+        if estimate_tokens(group["content"]) <= max_tokens:
+            chunks.append(TranscriptChunk(**group))
+            continue
+        words = group["content"].split()
+        for part, start in enumerate(range(0, len(words), step_words)):
+            chunks.append(TranscriptChunk(
+                speaker=group["speaker"],
+                content=" ".join(words[start:start + window_words]),
+                start_index=group["start_index"],
+                end_index=group["end_index"],
+                part=part
+            ))
+            if start + window_words >= len(words):
+                break
+    return chunks
+
+
+def build_segment_records(file_path: str, transcript_data: List[Dict],
+                          chunk_tokens: int = 256, chunk_overlap: int = 32) -> List[Dict]:
+    """Build the segment fields (ID, speaker, content, source, ordinal range) for a transcript.
+
+    A chunk_tokens of 0 or less keeps one record per speaker turn. Only plain data
+    is returned so this can run in a worker process.
+    """
+    file_name = os.path.basename(file_path)
+    if chunk_tokens <= 0:
+        return [
+            {
+                "id": f"{file_name}_{idx}",
+                "speaker": entry['speaker'],
+                "content": entry['content'],
+                "source_file": file_path,
+                "start_index": idx,
+                "end_index": idx,
+            }
+            for idx, entry in enumerate(transcript_data)
+        ]
+
+    return [
+        {
+            "id": f"{file_name}_{chunk.start_index}_{chunk.end_index}_{chunk.part}",
+            "speaker": chunk.speaker,
+            "content": chunk.content,
+            "source_file": file_path,
+            "start_index": chunk.start_index,
+            "end_index": chunk.end_index,
+        }
+        for chunk in chunk_transcript(transcript_data, chunk_tokens, chunk_overlap)
+    ]
@@ -112,6 +112,12 @@ def add(a: int, b: int):
     """Add two numbers. Please let the user know that you're adding the numbers BEFORE you call the tool"""
     return a + b
 
+def formatted_async_query(kb):
+    """Build a coroutine tool body that queries kb off the event loop and formats the hits."""
+    async def aquery(query: str) -> str:
+        return kb.format_query_results(await kb.aquery_knowledge_base(query))
+    return aquery
+
 def create_tools(knowledge_base=None, podcast_knowledge_base=None, agentkit=agent_kit):
     """Create and return a list of tools."""
     tools = []
@@ -187,6 +193,7 @@ def create_tools(knowledge_base=None, podcast_knowledge_base=None, agentkit=agen
             func=lambda query: knowledge_base.format_query_results(
                 knowledge_base.query_knowledge_base(query)
             ),
+            coroutine=formatted_async_query(knowledge_base),
             description="""Query the Twitter knowledge base for relevant tweets about crypto/AI/tech trends.
             Input should be a search query string.
             Example: query_twitter_knowledge_base("latest developments in AI")"""
@@ -199,6 +206,7 @@ def create_tools(knowledge_base=None, podcast_knowledge_base=None, agentkit=agen
             func=lambda query: podcast_knowledge_base.format_query_results(
                 podcast_knowledge_base.query_knowledge_base(query)
             ),
+            coroutine=formatted_async_query(podcast_knowledge_base),
             description="Query the podcast knowledge base for relevant podcast segments about crypto/Web3/gaming. Input should be a search query string."
         ))
 
@@ -229,7 +237,8 @@ def create_tools(knowledge_base=None, podcast_knowledge_base=None, agentkit=agen
         podcast_query_tool = Tool(
             name="query_podcast_knowledge",
             description="Query the podcast knowledge base for relevant information about crypto, gaming, and Web3 topics",
-            func=lambda query: podcast_kb.format_query_results(podcast_kb.query_knowledge_base(query))
+            func=lambda query: podcast_kb.format_query_results(podcast_kb.query_knowledge_base(query)),
+            coroutine=formatted_async_query(podcast_kb)
         )
         tools.append(podcast_query_tool)
 
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep sidecar stores (embedding cache, manifests, Twitter state) out of the working tree
+_state_dir = tempfile.mkdtemp(prefix="ai-agent-tests-")
+os.environ.setdefault("KB_CHROMA_PATH", os.path.join(_state_dir, "chroma_db"))
+os.environ.setdefault("TWITTER_STATE_DIR", _state_dir)
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
@@ -0,0 +1,23 @@
+import chromadb
+import pytest
+
+from kb_core.buckets import BucketedCollection
+from kb_core.index import IndexSettings
+
+
+@pytest.mark.parametrize("bucket_days", [0, 0.5, 1.5, -1])
+def test_bucket_days_must_be_positive_whole_days(tmp_path, bucket_days):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    with pytest.raises(ValueError):
+        BucketedCollection(client, "bucket_test", None, IndexSettings.from_env(), bucket_days)
+
+
+def test_buckets_get_distinct_names(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = BucketedCollection(client, "bucket_test", None, IndexSettings.from_env(), 2)
+    day = 86400
+    collection.add(ids=["a", "b", "c"], documents=["a", "b", "c"],
+                   embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+                   metadatas=[{"created_at_ts": 0.0}, {"created_at_ts": 1.5 * day}, {"created_at_ts": 2.5 * day}])
+    assert len(collection.buckets()) == 2
+    assert collection.count() == 3
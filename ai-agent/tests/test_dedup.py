@@ -0,0 +1,40 @@
+from kb_core.dedup import SIMHASH_MASK, SimHashIndex, hamming_distance, simhash
+
+
+def _text_with_top_bit():
+    for i in range(1000):
+        text = f"sample tweet number {i} about rollups and restaking"
+        if simhash(text) >> 63:
+            return text
+    raise AssertionError("no sample text sets bit 63")
+
+
+def test_simhash_with_bit_63_set_is_unsigned():
+    fingerprint = simhash(_text_with_top_bit())
+    assert 0 <= fingerprint <= SIMHASH_MASK
+    assert fingerprint >> 63 == 1
+    assert not format(fingerprint, "016x").startswith("-")
+
+
+def test_hamming_distance_across_signs():
+    assert hamming_distance(0, -1) == 64
+    assert hamming_distance(0, SIMHASH_MASK) == 64
+    # A legacy negative fingerprint equals its unsigned two's complement form
+    assert hamming_distance(-1, SIMHASH_MASK) == 0
+    assert hamming_distance(-2, SIMHASH_MASK) == 1
+
+
+def test_index_matches_legacy_negative_fingerprint():
+    fingerprint = simhash(_text_with_top_bit())
+    legacy = fingerprint - (1 << 64)
+    index = SimHashIndex(max_distance=3)
+    index.add("legacy", legacy)
+    assert index.find(fingerprint ^ 1) == "legacy"
+
+
+def test_index_find_scoped_to_group():
+    index = SimHashIndex(max_distance=3)
+    index.add("a", 0b1010, group="alice")
+    assert index.find(0b1011, group="bob") is None
+    assert index.find(0b1011, group="alice") == "a"
+    assert index.find(0b1011) == "a"
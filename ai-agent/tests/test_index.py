@@ -0,0 +1,42 @@
+import chromadb
+import numpy as np
+import pytest
+
+from kb_core.index import ExactSearchIndex, IndexSettings, open_collection, recreate_collection
+
+
+def _collection(path, name="exact_index_test", rows=50, seed=0):
+    client = chromadb.PersistentClient(path=str(path))
+    collection = open_collection(client, name, None, IndexSettings())
+    vectors = np.random.default_rng(seed).normal(size=(rows, 8)).astype(np.float32)
+    collection.add(
+        ids=[str(i) for i in range(rows)],
+        embeddings=vectors.tolist(),
+        documents=[f"doc {i}" for i in range(rows)],
+        metadatas=[{"group": i % 3} for i in range(rows)],
+    )
+    return client, collection
+
+
+def test_exact_search_matches_hnsw(tmp_path):
+    _, collection = _collection(tmp_path)
+    queries = np.random.default_rng(1).normal(size=(4, 8)).astype(np.float32)
+    include = ["documents", "metadatas", "distances"]
+
+    exact = ExactSearchIndex(collection, threshold=100).search(queries, 5, {"group": 1}, include, generation=0)
+    hnsw = collection.query(query_embeddings=queries.tolist(), n_results=5, where={"group": 1}, include=include)
+
+    assert exact["ids"] == hnsw["ids"]
+    np.testing.assert_allclose(exact["distances"], hnsw["distances"], rtol=1e-4, atol=1e-4)
+
+
+def test_recreate_collection_only_ignores_missing_collection(tmp_path, monkeypatch):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    assert recreate_collection(client, "missing_collection", None, IndexSettings()).count() == 0
+
+    def locked(name):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(client, "delete_collection", locked)
+    with pytest.raises(RuntimeError):
+        recreate_collection(client, "missing_collection", None, IndexSettings())
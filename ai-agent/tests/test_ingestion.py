@@ -0,0 +1,87 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from podcast_agent.ingestion import TranscriptIngestionPipeline
+from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase
+
+
+def _write_transcript(directory, name, turns, speaker="Alice Smith"):
+    path = directory / name
+    path.write_text(json.dumps([{"speaker": speaker, "content": f"{name} turn {i}"} for i in range(turns)]))
+    return str(path)
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    kb = PodcastKnowledgeBase(collection_name="ingestion_test", persist_path=str(tmp_path / "chroma"),
+                              chunk_tokens=0)
+    monkeypatch.setattr(kb.embedding_function, "embed", lambda texts: np.ones((len(texts), 3), dtype=np.float32))
+    return kb
+
+
+def test_files_are_checkpointed_as_complete(tmp_path, kb):
+    files = [_write_transcript(tmp_path, "a.json", 3), _write_transcript(tmp_path, "b.json", 4)]
+    report = TranscriptIngestionPipeline(kb, workers=1, batch_size=2).run(files)
+
+    assert (report["status"], report["files"], report["segments"]) == ("ok", 2, 7)
+    assert kb.manifest.processed_files() == {"a.json", "b.json"}
+    assert kb.manifest.get_file("b.json")["segment_count"] == 4
+    assert all(kb.is_file_processed(path) for path in files)
+    assert kb.collection.count() == 7
+
+
+def test_interrupted_run_resumes_without_duplicates(tmp_path, kb, monkeypatch):
+    files = [_write_transcript(tmp_path, "a.json", 3), _write_transcript(tmp_path, "b.json", 3)]
+    upsert = kb.upsert_embedded_segments
+    writes = []
+
+    def crash_on_second_batch(segments, embeddings):
+        writes.append(len(segments))
+        if len(writes) == 2:
+            raise RuntimeError("killed mid-run")
+        upsert(segments, embeddings)
+
+    monkeypatch.setattr(kb, "upsert_embedded_segments", crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        TranscriptIngestionPipeline(kb, workers=1, batch_size=2).run(files)
+
+    # The first batch landed, but no file had all of its segments written
+    assert kb.collection.count() == 2
+    assert {entry["status"] for entry in kb.manifest.list_files()} == {"in_progress"}
+    assert not any(kb.is_file_processed(path) for path in files)
+
+    monkeypatch.setattr(kb, "upsert_embedded_segments", upsert)
+    pending = [path for path in files if not kb.is_file_processed(path)]
+    report = TranscriptIngestionPipeline(kb, workers=1, batch_size=2).run(pending)
+
+    assert report["files"] == 2
+    assert kb.manifest.processed_files() == {"a.json", "b.json"}
+    assert kb.collection.count() == 6
+    assert kb.manifest.speakers() == {"Alice Smith": 6}
+
+
+def test_changed_file_replaces_its_segments(tmp_path, kb):
+    path = _write_transcript(tmp_path, "a.json", 4)
+    TranscriptIngestionPipeline(kb, workers=1).run([path])
+
+    _write_transcript(tmp_path, "a.json", 2)
+    os.utime(path, (0, 0))
+    assert not kb.is_file_processed(path)
+    TranscriptIngestionPipeline(kb, workers=1).run([path])
+
+    assert kb.collection.count() == 2
+    assert kb.manifest.get_file("a.json")["segment_count"] == 2
+
+
+def test_unparseable_file_is_reported_as_failed(tmp_path, kb):
+    good = _write_transcript(tmp_path, "good.json", 2)
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    report = TranscriptIngestionPipeline(kb, workers=1).run([good, str(bad)])
+
+    assert report["status"] == "failed"
+    assert report["failed"] == 1
+    assert kb.manifest.processed_files() == {"good.json"}
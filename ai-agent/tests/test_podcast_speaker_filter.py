@@ -0,0 +1,63 @@
+from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase, PodcastSegment
+
+
+def test_lexical_speaker_filter_reaches_segments_below_unfiltered_top(tmp_path):
+    kb = PodcastKnowledgeBase(collection_name="speaker_filter_test", persist_path=str(tmp_path))
+    # Alice's segments outscore all of Bob's, filling the unfiltered top max(4n, 20)
+    segments = [
+        PodcastSegment(id=f"alice-{i}", speaker="Alice Smith", content="restaking restaking restaking",
+                       source_file="episode.json")
+        for i in range(40)
+    ] + [
+        PodcastSegment(id=f"bob-{i}", speaker="Bob Jones", content="restaking and a few other words here",
+                       source_file="episode.json")
+        for i in range(5)
+    ]
+    kb.upsert_embedded_segments(segments, [[float(i), 1.0, 0.0] for i in range(len(segments))])
+
+    results = kb.query_knowledge_base("what does Bob say about restaking", n_results=3,
+                                      mode="lexical", rerank=False, speaker_filter=True)
+
+    assert len(results) == 3
+    assert {result["metadata"]["speaker"] for result in results} == {"Bob Jones"}
+
+
+def _segments(speaker, count, source_file="/data/transcripts/episode.json", prefix="s"):
+    return [
+        PodcastSegment(id=f"{prefix}-{i}", speaker=speaker, content=f"segment {i}", source_file=source_file)
+        for i in range(count)
+    ]
+
+
+def test_speaker_counts_do_not_inflate_on_upsert(tmp_path):
+    kb = PodcastKnowledgeBase(collection_name="speaker_count_test", persist_path=str(tmp_path))
+    kb.upsert_embedded_segments(_segments("Alice Smith", 3), [[1.0, 0.0]] * 3)
+    kb.upsert_embedded_segments(_segments("Alice Smith", 3), [[1.0, 0.0]] * 3)
+    assert kb.manifest.speakers() == {"Alice Smith": 3}
+
+    # Re-attributing a segment moves its count
+    kb.upsert_embedded_segments(_segments("Bob Jones", 1), [[1.0, 0.0]])
+    assert kb.manifest.speakers() == {"Alice Smith": 2, "Bob Jones": 1}
+
+
+def test_remove_source_file_matches_by_file_name(tmp_path):
+    kb = PodcastKnowledgeBase(collection_name="speaker_remove_test", persist_path=str(tmp_path))
+    kb.upsert_embedded_segments(_segments("Alice Smith", 3), [[1.0, 0.0]] * 3)
+
+    # Same file, reached through a different path
+    assert kb.remove_source_file("episode.json") == 3
+    assert kb.manifest.speakers() == {}
+    assert kb.collection.count() == 0
+
+
+def test_speaker_filter_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("PODCAST_KB_SPEAKER_FILTER", raising=False)
+    kb = PodcastKnowledgeBase(collection_name="speaker_default_test", persist_path=str(tmp_path))
+    kb.upsert_embedded_segments(
+        _segments("Alice Smith", 1, prefix="alice") + [
+            PodcastSegment(id="other", speaker="Carol", content="smith protocol restaking", source_file="e.json")
+        ],
+        [[1.0, 0.0], [0.0, 1.0]]
+    )
+    results = kb.query_knowledge_base("smith protocol restaking", n_results=2, mode="lexical", rerank=False)
+    assert [result["metadata"]["speaker"] for result in results][0] == "Carol"
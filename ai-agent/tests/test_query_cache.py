@@ -0,0 +1,76 @@
+from kb_core.query_cache import QueryResultCache, get_query_cache
+from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase, PodcastSegment
+
+
+def test_trivial_query_variants_share_a_key():
+    cache = QueryResultCache()
+    assert cache.make_key("What is Restaking?", n_results=5) == cache.make_key("  what is restaking ", n_results=5)
+    assert cache.make_key("what is restaking", n_results=5) != cache.make_key("what is restaking", n_results=6)
+
+
+def test_invalidate_makes_earlier_entries_unreachable():
+    cache = QueryResultCache()
+    key = cache.make_key("restaking")
+    cache.put(key, [{"id": "1"}])
+    assert cache.get(key) == [{"id": "1"}]
+
+    cache.invalidate()
+    assert cache.get(key) is None
+    assert cache.make_key("restaking") != key
+    assert cache.stats()["size"] == 0
+
+
+def test_cached_values_are_copies():
+    cache = QueryResultCache()
+    key = cache.make_key("restaking")
+    cache.put(key, [{"id": "1"}])
+    cache.get(key)[0]["id"] = "mutated"
+    assert cache.get(key) == [{"id": "1"}]
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = QueryResultCache(maxsize=2)
+    for query in ("a", "b"):
+        cache.put(cache.make_key(query), query)
+    cache.get(cache.make_key("a"))
+    cache.put(cache.make_key("c"), "c")
+    assert cache.get(cache.make_key("b")) is None
+    assert cache.get(cache.make_key("a")) == "a"
+
+    expired = QueryResultCache(ttl_seconds=-1)
+    expired.put(expired.make_key("a"), "a")
+    assert expired.get(expired.make_key("a")) is None
+
+
+def test_knowledge_base_write_invalidates_cached_results(tmp_path):
+    kb = PodcastKnowledgeBase(collection_name="query_cache_kb_test", persist_path=str(tmp_path))
+    kb.upsert_embedded_segments(
+        [PodcastSegment(id="1", speaker="Alice Smith", content="restaking yields", source_file="episode.json")],
+        [[1.0, 0.0]]
+    )
+    first = kb.query_knowledge_base("restaking", n_results=5, mode="lexical", rerank=False)
+    assert kb.query_knowledge_base("Restaking?", n_results=5, mode="lexical", rerank=False) == first
+    assert kb.query_cache.stats()["hits"] == 1
+
+    kb.upsert_embedded_segments(
+        [PodcastSegment(id="2", speaker="Bob Jones", content="restaking risks", source_file="episode.json")],
+        [[0.0, 1.0]]
+    )
+    results = kb.query_knowledge_base("restaking", n_results=5, mode="lexical", rerank=False)
+    assert len(results) == 2
+    assert kb.query_cache.stats()["hits"] == 1
+
+
+def test_caches_are_separate_per_persist_path(tmp_path):
+    first = get_query_cache("shared_name_test", str(tmp_path / "a"))
+    second = get_query_cache("shared_name_test", str(tmp_path / "b"))
+    assert first is not second
+
+    first.invalidate()
+    assert second.generation == 0
+
+
+def test_same_collection_and_path_share_one_cache(tmp_path):
+    cache = get_query_cache("shared_path_test", str(tmp_path))
+    assert get_query_cache("shared_path_test", str(tmp_path / ".")) is cache
+    assert get_query_cache("other_collection_test", str(tmp_path)) is not cache
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from tweepy.asynchronous import AsyncClient
+from tweepy.errors import TooManyRequests
+
+from twitter_agent.custom_twitter_actions import RateLimitedAsyncClient
+from twitter_agent.rate_limiter import RateLimiter
+
+
+def _too_many_requests(headers):
+    response = SimpleNamespace(status=429, reason="Too Many Requests", headers=headers,
+                               json=lambda: {})
+    error = TooManyRequests.__new__(TooManyRequests)
+    error.response = response
+    return error
+
+
+def test_reset_time_read_from_headers_without_attribute():
+    reset = time.time() + 120
+    error = _too_many_requests({"x-rate-limit-reset": str(int(reset))})
+    assert not hasattr(error, "reset_time")
+    assert RateLimitedAsyncClient._reset_time(error) == float(int(reset))
+
+
+def test_reset_time_missing_header_falls_back():
+    assert RateLimitedAsyncClient._reset_time(_too_many_requests({})) is None
+
+
+def test_username_lookups_share_one_bucket(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "state.db"))
+    first = limiter.endpoint_key("GET", "/2/users/by/username/alice")
+    second = limiter.endpoint_key("GET", "/2/users/by/username/bob_123?user.fields=id")
+    assert first == second == "GET /2/users/by/username/:username"
+
+    limiter.update(first, {"x-rate-limit-limit": "1", "x-rate-limit-remaining": "0",
+                           "x-rate-limit-reset": str(time.time() + 60)})
+    assert limiter.wait_time(second) > 0
+
+
+def test_numeric_ids_collapse_but_version_is_kept(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "state.db"))
+    assert limiter.endpoint_key("get", "/2/users/123456/tweets") == "GET /2/users/:id/tweets"
+
+
+def test_429_retries_are_bounded(tmp_path, monkeypatch):
+    calls = []
+
+    async def always_429(self, method, route, params=None, json=None, user_auth=False):
+        calls.append(route)
+        raise _too_many_requests({})
+
+    async def no_wait(endpoint, max_wait=None):
+        # Stands in for waiting out each window reset
+        return None
+
+    limiter = RateLimiter(str(tmp_path / "state.db"))
+    monkeypatch.setattr(limiter, "acquire", no_wait)
+    monkeypatch.setattr(AsyncClient, "request", always_429)
+    client = RateLimitedAsyncClient(bearer_token="token", rate_limiter=limiter, max_wait=None, max_retries=2)
+
+    with pytest.raises(TooManyRequests):
+        asyncio.run(client.request("GET", "/2/users/123456/tweets"))
+    assert len(calls) == 3
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from kb_core.refresher import KnowledgeBaseRefresher
+
+
+def _refresh(refresher, name):
+    return asyncio.run(refresher.refresh_now(name))
+
+
+def _metrics(refresher, name):
+    return refresher.metrics()[name]
+
+
+def test_successful_report_counts_as_success():
+    refresher = KnowledgeBaseRefresher(interval=60)
+    refresher.add_job("kb", lambda: {"status": "ok", "inserted": 3})
+    assert _refresh(refresher, "kb") == {"status": "ok", "inserted": 3}
+    metrics = _metrics(refresher, "kb")
+    assert metrics["last_success"] is not None
+    assert metrics["last_error"] is None
+    assert (metrics["runs"], metrics["failures"]) == (1, 0)
+
+
+@pytest.mark.parametrize("report", [None, {"status": "failed", "error": "disk full"}])
+def test_none_or_failed_report_counts_as_failure(report):
+    refresher = KnowledgeBaseRefresher(interval=60)
+    refresher.add_job("kb", lambda: report)
+    _refresh(refresher, "kb")
+    metrics = _metrics(refresher, "kb")
+    assert metrics["last_success"] is None
+    assert metrics["last_error"]
+    assert (metrics["runs"], metrics["failures"]) == (1, 1)
+    assert metrics["stale"]
+
+
+def test_failure_keeps_previous_success_and_recovery_clears_error():
+    refresher = KnowledgeBaseRefresher(interval=60)
+    reports = iter([{"status": "ok"}, {"status": "failed", "error": "boom"}, {"status": "ok"}])
+    refresher.add_job("kb", lambda: next(reports))
+
+    _refresh(refresher, "kb")
+    first_success = _metrics(refresher, "kb")["last_success"]
+    _refresh(refresher, "kb")
+    metrics = _metrics(refresher, "kb")
+    assert metrics["last_success"] == first_success
+    assert metrics["last_error"] == "boom"
+
+    _refresh(refresher, "kb")
+    metrics = _metrics(refresher, "kb")
+    assert metrics["last_success"] > first_success
+    assert metrics["last_error"] is None
+    assert (metrics["runs"], metrics["failures"]) == (3, 1)
+
+
+def test_raising_coroutine_counts_as_failure():
+    async def refresh():
+        raise RuntimeError("timeline unavailable")
+
+    refresher = KnowledgeBaseRefresher(interval=60)
+    refresher.add_job("kb", refresh)
+    _refresh(refresher, "kb")
+    metrics = _metrics(refresher, "kb")
+    assert metrics["last_error"] == "timeline unavailable"
+    assert metrics["failures"] == 1
+
+
+def test_missing_transcript_directory_is_reported_as_failure(tmp_path):
+    from podcast_agent.podcast_knowledge_base import PodcastKnowledgeBase
+
+    kb = PodcastKnowledgeBase(persist_path=str(tmp_path))
+    report = kb.process_all_json_files(str(tmp_path / "missing"))
+    assert report["status"] == "failed"
+
+    refresher = KnowledgeBaseRefresher(interval=60)
+    refresher.add_job("podcast", lambda: kb.process_all_json_files(str(tmp_path / "missing")))
+    _refresh(refresher, "podcast")
+    assert _metrics(refresher, "podcast")["failures"] == 1
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from kb_core.index import distance_to_similarity
+from kb_core.rerank import CrossEncoderReranker
+
+
+class _FakeCrossEncoder:
+    def __init__(self, logits):
+        self.logits = logits
+
+    def predict(self, pairs, batch_size=None):
+        return [self.logits[document] for _, document in pairs]
+
+
+def test_squared_l2_distance_converts_to_cosine():
+    # Unit vectors at cosine 0.9 are 2 - 2 * 0.9 apart in Chroma's squared L2
+    assert distance_to_similarity(2 - 2 * 0.9, "l2") == pytest.approx(0.9)
+    assert distance_to_similarity(0.1, "cosine") == pytest.approx(0.9)
+
+
+def test_rerank_keeps_retrieval_score_and_adds_normalized_rerank_score():
+    reranker = CrossEncoderReranker(candidates=10, latency_budget_ms=10_000, skip_threshold=0.99, cache_size=10)
+    reranker._model = _FakeCrossEncoder({"a": -2.0, "b": 3.0})
+    results = [{"content": "a", "relevance_score": 0.8}, {"content": "b", "relevance_score": 0.4}]
+
+    ranked = reranker.rerank("query", results, 2, top_similarity=0.5)
+
+    assert [result["content"] for result in ranked] == ["b", "a"]
+    assert ranked[0]["relevance_score"] == 0.4
+    assert ranked[0]["rerank_score"] == pytest.approx(1 / (1 + math.exp(-3.0)))
+    assert 0 < ranked[1]["rerank_score"] < 0.5
+
+
+def test_rerank_skipped_when_top_cosine_clears_threshold():
+    reranker = CrossEncoderReranker(candidates=10, skip_threshold=0.85, cache_size=10)
+    results = [{"content": "a", "relevance_score": 0.9}]
+    assert reranker.rerank("query", results, 1, top_similarity=0.9) == results
+    assert "rerank_score" not in results[0]
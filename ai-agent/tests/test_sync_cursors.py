@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from twitter_agent import twitter_state
+from twitter_agent.custom_twitter_actions import TwitterClient
+from twitter_agent.sync_cursors import SyncCursors
+
+
+def test_cursors_survive_a_restart(tmp_path, monkeypatch):
+    db_name = str(tmp_path / "state.db")
+    cursors = SyncCursors(db_name)
+    cursors.advance({"alice": "200", "bob": "50"})
+
+    # A new process opens its own connection to the same database
+    monkeypatch.setattr(twitter_state, "_state_connections", {})
+    reopened = SyncCursors(db_name)
+    assert reopened.db is not cursors.db
+    assert (reopened.get("alice"), reopened.get("bob"), reopened.get("carol")) == ("200", "50", None)
+
+
+def test_cursors_never_move_backwards(tmp_path):
+    cursors = SyncCursors(str(tmp_path / "state.db"))
+    cursors.advance({"alice": "1000"})
+    # Compared as snowflake integers, not strings
+    cursors.advance({"alice": "999"})
+    assert cursors.get("alice") == "1000"
+    cursors.advance({"alice": "10000"})
+    assert cursors.get("alice") == "10000"
+
+    cursors.reset("alice")
+    assert cursors.get("alice") is None
+
+
+class _Timeline:
+    """Fake AsyncClient that serves one page of tweets and records each request."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.requests = []
+
+    async def get_users_tweets(self, **params):
+        self.requests.append(params)
+        since_id = int(params.get("since_id", 0))
+        created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        data = [SimpleNamespace(id=i, text=f"tweet {i}", author_id="alice", created_at=created_at)
+                for i in self.ids if i > since_id]
+        return SimpleNamespace(data=data, meta={})
+
+
+def test_sync_sends_since_id_only_after_commit(tmp_path, monkeypatch):
+    timeline = _Timeline([105, 101, 103])
+    monkeypatch.setattr(TwitterClient, "client", property(lambda self: timeline))
+    client = TwitterClient(sync_cursors=SyncCursors(str(tmp_path / "state.db")))
+
+    tweets = asyncio.run(client.sync_user_tweets("alice", advance_cursor=False))
+    assert [tweet.id for tweet in tweets] == ["101", "103", "105"]
+    assert "since_id" not in timeline.requests[0]
+    assert client.sync_cursors.get("alice") is None
+
+    client.commit_cursors({"alice": tweets})
+    assert client.sync_cursors.get("alice") == "105"
+
+    timeline.ids.append(107)
+    tweets = asyncio.run(client.sync_user_tweets("alice"))
+    assert timeline.requests[1]["since_id"] == "105"
+    assert [tweet.id for tweet in tweets] == ["107"]
+    assert client.sync_cursors.get("alice") == "107"
@@ -0,0 +1,57 @@
+import pytest
+
+from podcast_agent.transcript_chunker import build_segment_records, chunk_transcript, estimate_tokens
+
+
+def _words(start, count):
+    return " ".join(f"w{i}" for i in range(start, start + count))
+
+
+def test_short_turns_by_one_speaker_are_merged():
+    entries = [
+        {"speaker": "Alice", "content": "first point"},
+        {"speaker": "Alice", "content": "second point"},
+        {"speaker": "Bob", "content": "a reply"},
+        {"speaker": "Bob", "content": "   "},
+    ]
+    chunks = chunk_transcript(entries, max_tokens=64, overlap_tokens=8)
+    assert [(c.speaker, c.content, c.start_index, c.end_index) for c in chunks] == [
+        ("Alice", "first point second point", 0, 1),
+        ("Bob", "a reply", 2, 2),
+    ]
+
+
+def test_long_turn_is_split_into_overlapping_windows():
+    entries = [{"speaker": "Alice", "content": _words(0, 300)}]
+    chunks = chunk_transcript(entries, max_tokens=64, overlap_tokens=13)
+
+    # 64 tokens is 49 words per window; 13 overlap tokens is 10 shared words
+    windows = [chunk.content.split() for chunk in chunks]
+    assert all(len(window) <= 49 for window in windows)
+    assert all(estimate_tokens(chunk.content) <= 64 for chunk in chunks)
+    for previous, current in zip(windows, windows[1:]):
+        assert previous[-10:] == current[:10]
+    # Every word is covered and the last window ends the turn
+    assert windows[0][0] == "w0" and windows[-1][-1] == "w299"
+    assert {word for window in windows for word in window} == set(_words(0, 300).split())
+    assert [chunk.part for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_overlap_must_be_smaller_than_window():
+    with pytest.raises(ValueError):
+        chunk_transcript([{"speaker": "Alice", "content": "hi"}], max_tokens=32, overlap_tokens=32)
+
+
+def test_segment_ids_are_unique_and_name_their_window():
+    transcript = [{"speaker": "Alice", "content": _words(0, 200)}, {"speaker": "Bob", "content": "short"}]
+    records = build_segment_records("/data/episode.json", transcript, chunk_tokens=64, chunk_overlap=13)
+    ids = [record["id"] for record in records]
+    assert len(ids) == len(set(ids))
+    assert ids[0] == "episode.json_0_0_0"
+    assert ids[-1] == "episode.json_1_1_0"
+
+
+def test_chunking_disabled_keeps_one_record_per_turn():
+    transcript = [{"speaker": "Alice", "content": _words(0, 500)}, {"speaker": "Bob", "content": "short"}]
+    records = build_segment_records("episode.json", transcript, chunk_tokens=0)
+    assert [record["id"] for record in records] == ["episode.json_0", "episode.json_1"]
@@ -0,0 +1,203 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import chromadb
+import numpy as np
+import pytest
+
+from kb_core.dedup import simhash
+from kb_core.manifest import CollectionManifest
+from twitter_agent import twitter_knowledge_base
+from twitter_agent.twitter_knowledge_base import Tweet, TweetKnowledgeBase
+
+
+def _iso(days_ago: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _ts(days_ago: float) -> float:
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).timestamp()
+
+
+def _open(path, name):
+    return TweetKnowledgeBase(collection_name=name, persist_path=str(path), bucket_days=0)
+
+
+def test_legacy_rows_get_created_at_ts_on_open(tmp_path):
+    # A collection written before created_at_ts existed, and before any manifest migration ran
+    legacy = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection("legacy_backfill_test")
+    legacy.add(
+        ids=["old", "recent"],
+        documents=["an old tweet", "a recent tweet"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+        metadatas=[{"author_id": "1", "created_at": _iso(30)}, {"author_id": "1", "created_at": _iso(1)}],
+    )
+
+    kb = _open(tmp_path, "legacy_backfill_test")
+    recent = kb.collection.get(where=kb.build_where(since=datetime.now(timezone.utc) - timedelta(days=7)))
+    assert recent["ids"] == ["recent"]
+    assert kb.manifest.has_migration("created_at_ts")
+
+    assert kb.evict_tweets(max_age_days=7) == 1
+    assert kb.collection.get()["ids"] == ["recent"]
+
+
+def test_backfill_runs_once(tmp_path, monkeypatch):
+    kb = _open(tmp_path, "backfill_once_test")
+    kb.collection.add(ids=["1"], documents=["a tweet"], embeddings=[[1.0, 0.0, 0.0]],
+                      metadatas=[{"author_id": "1", "created_at": _iso(1), "created_at_ts": _ts(1)}])
+
+    def fail_scan(self, *args, **kwargs):
+        raise AssertionError("backfill scanned the collection again")
+
+    monkeypatch.setattr(chromadb.api.models.Collection.Collection, "get", fail_scan)
+    _open(tmp_path, "backfill_once_test")
+
+
+def test_import_snapshot_updates_dedup_index(tmp_path):
+    text = "restaking yields are compressing across every major protocol this week"
+    source = _open(tmp_path / "source", "snapshot_source_test")
+    tweet = Tweet(id="42", text=text, created_at=_iso(1), author_id="1")
+    source.collection.add(ids=[tweet.id], documents=[text], embeddings=[[1.0, 0.0, 0.0]],
+                          metadatas=[source._tweet_metadata(tweet)])
+    source.export_snapshot(str(tmp_path / "tweets.snapshot"))
+
+    target = _open(tmp_path / "target", "snapshot_target_test")
+    assert len(target._get_dedup_index()) == 0
+    target.import_snapshot(str(tmp_path / "tweets.snapshot"))
+
+    assert target._get_dedup_index().find(simhash(text)) == "42"
+
+
+def test_reposts_only_collapse_within_one_author(tmp_path):
+    kb = _open(tmp_path, "author_collapse_test")
+    text = "restaking yields are compressing across every major protocol this week"
+    tweets = [
+        Tweet(id="1", text=text, created_at=_iso(2), author_id="alice"),
+        Tweet(id="2", text=f"RT @alice: {text}", created_at=_iso(1), author_id="bob"),
+        Tweet(id="3", text=f"{text} https://t.co/abc", created_at=_iso(1), author_id="alice"),
+    ]
+
+    new_tweets, new_metadata, _, collapsed, _ = kb._collapse_near_duplicates(tweets)
+
+    assert [tweet.id for tweet in new_tweets] == ["1", "2"]
+    assert new_metadata["2"]["author_id"] == "bob"
+    assert new_metadata["1"]["source_tweet_ids"] == "1,3"
+    assert collapsed == 1
+
+
+class _EqualReranker:
+    candidates = 10
+
+    def rerank(self, query, results, n_results, top_similarity=None, text_key="content"):
+        for result in results:
+            result["rerank_score"] = 0.5
+        return results[:n_results]
+
+
+def test_recency_still_applies_when_reranking(tmp_path, monkeypatch):
+    kb = _open(tmp_path, "rerank_recency_test")
+    kb.collection.add(
+        ids=["old", "new"],
+        documents=["old take on restaking", "new take on restaking"],
+        embeddings=[[1.0, 0.0, 0.0], [0.8, 0.6, 0.0]],
+        metadatas=[{"author_id": "1", "created_at": _iso(30), "created_at_ts": _ts(30)},
+                   {"author_id": "1", "created_at": _iso(0), "created_at_ts": _ts(0)}],
+    )
+    monkeypatch.setattr(kb.embedding_function, "embed", lambda texts: np.array([[1.0, 0.0, 0.0]] * len(texts)))
+    monkeypatch.setattr(twitter_knowledge_base, "get_reranker", lambda: _EqualReranker())
+
+    results = kb.query_knowledge_base("restaking", n_results=2, recency_half_life_hours=24,
+                                      rerank=True, diversity=1.0)
+
+    assert [result["id"] for result in results] == ["new", "old"]
+    assert results[1]["similarity"] == pytest.approx(1.0)
+    assert results[0]["rerank_score"] == 0.5
+
+
+class _BudgetedReranker:
+    """Scores only the first candidate, as if the latency budget ran out."""
+    candidates = 10
+
+    def rerank(self, query, results, n_results, top_similarity=None, text_key="content"):
+        results[0]["rerank_score"] = 0.1
+        return results[:n_results]
+
+
+def test_mmr_does_not_mix_rerank_and_similarity_scales(tmp_path, monkeypatch):
+    kb = _open(tmp_path, "rerank_mmr_test")
+    kb.collection.add(
+        ids=["a", "b", "c"],
+        documents=["first restaking take", "second restaking take", "third restaking take"],
+        embeddings=[[1.0, 0.0, 0.0], [0.99, 0.141, 0.0], [0.0, 1.0, 0.0]],
+        metadatas=[{"author_id": "1", "created_at": _iso(1), "created_at_ts": _ts(1)}] * 3,
+    )
+    monkeypatch.setattr(kb.embedding_function, "embed", lambda texts: np.array([[1.0, 0.0, 0.0]] * len(texts)))
+    monkeypatch.setattr(twitter_knowledge_base, "get_reranker", lambda: _BudgetedReranker())
+
+    results = kb.query_knowledge_base("restaking", n_results=2, rerank=True, diversity=0.5)
+
+    # The reranked hit stays first even though its rerank score is below the unscored cosines
+    assert results[0]["id"] == "a"
+    assert "rerank_score" not in results[1]
+
+
+def test_exact_search_sees_writes_from_another_process(tmp_path):
+    kb = _open(tmp_path, "cross_process_test")
+    kb.collection.add(ids=["1"], documents=["first"], embeddings=[[0.0, 1.0, 0.0]],
+                      metadatas=[{"author_id": "1", "created_at": _iso(1), "created_at_ts": _ts(1)}])
+    kb.manifest.record_add(kb.collection.count())
+    query = np.array([[1.0, 0.0, 0.0]])
+    assert kb._vector_search(query, 5, None, ["distances"])["ids"][0] == ["1"]
+
+    # Another process writes through its own client and manifest; this process's query cache never hears of it
+    other = chromadb.PersistentClient(path=str(tmp_path)).get_collection("cross_process_test")
+    other.add(ids=["2"], documents=["second"], embeddings=[[1.0, 0.0, 0.0]],
+              metadatas=[{"author_id": "1", "created_at": _iso(0), "created_at_ts": _ts(0)}])
+    CollectionManifest("cross_process_test", path=str(tmp_path / "kb_manifest.db")).record_add(other.count())
+
+    assert kb._vector_search(query, 5, None, ["distances"])["ids"][0] == ["2", "1"]
+
+
+def _fake_embed(texts):
+    return np.array([[1.0, 0.0, 0.0] if "restaking" in text else [0.0, 1.0, 0.0] for text in texts])
+
+
+@pytest.mark.parametrize("bucket_days", [0, 1])
+def test_rebuild_never_exposes_an_empty_knowledge_base(tmp_path, monkeypatch, bucket_days):
+    kb = TweetKnowledgeBase(collection_name="rebuild_test", persist_path=str(tmp_path), bucket_days=bucket_days)
+    monkeypatch.setattr(kb.embedding_function, "embed", _fake_embed)
+    kb.upsert_tweets([Tweet(id="old", text="an old restaking take", created_at=_iso(3), author_id="1")])
+    old_handle = kb.collection
+
+    live_counts = []
+    upsert = TweetKnowledgeBase.upsert_tweets
+
+    def observing_upsert(self, tweets):
+        # Runs against the staging collection; readers of the live one still see the old tweet
+        live_counts.append(kb.collection.count())
+        return upsert(self, tweets)
+
+    monkeypatch.setattr(TweetKnowledgeBase, "upsert_tweets", observing_upsert)
+    counts = kb.rebuild([Tweet(id="new", text="a fresh restaking take", created_at=_iso(1), author_id="1"),
+                         Tweet(id="other", text="something else", created_at=_iso(2), author_id="2")])
+
+    assert live_counts == [1]
+    assert counts["inserted"] == 2
+    assert sorted(kb.collection.get(include=[])["ids"]) == ["new", "other"]
+    assert kb.manifest.get_stats()["count"] == 2
+    assert [result["id"] for result in kb.query_knowledge_base("restaking", n_results=1)] == ["new"]
+    # A query that grabbed the old handle before the swap still completes
+    assert old_handle.get(include=[])["ids"] == ["old"]
+
+    # The next rebuild drops the retired collection and reuses the staging name
+    kb.rebuild([Tweet(id="newest", text="newest restaking take", created_at=_iso(0), author_id="1")])
+    assert kb.collection.get(include=[])["ids"] == ["newest"]
+    assert TweetKnowledgeBase(collection_name="rebuild_test", persist_path=str(tmp_path),
+                              bucket_days=bucket_days).collection.count() == 1
+
+
+def test_unknown_refresh_mode_is_rejected(tmp_path):
+    kb = _open(tmp_path, "refresh_mode_test")
+    with pytest.raises(ValueError):
+        asyncio.run(twitter_knowledge_base.update_knowledge_base(None, kb, [], mode="rebuidl"))
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from twitter_agent import rate_limiter, twitter_state
+from twitter_agent.twitter_state import MAX_MENTIONS_PER_INTERVAL, TwitterState
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHARACTER_FILE", "tester.json")
+    monkeypatch.setenv("TWITTER_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", None)
+    return TwitterState()
+
+
+def test_mentions_budget_without_headers(state):
+    allowed = [state.update_rate_limit() for _ in range(MAX_MENTIONS_PER_INTERVAL + 1)]
+    assert all(allowed[:-1])
+    assert not allowed[-1]
+
+
+def test_batch_replied_checks(state):
+    assert state.mark_replied_many(["1", "2", "2"]) == 2
+    assert state.filter_unreplied(["3", "1", "4", "2"]) == ["3", "4"]
+    assert state.has_replied_to("1")
+    assert not state.has_replied_to("3")
+
+
+def test_unreplied_ids_are_answered_from_memory(state):
+    state.mark_replied_many(["1"])
+    statements = []
+    state.db.conn.set_trace_callback(statements.append)
+    try:
+        assert state.filter_unreplied([str(i) for i in range(1, 2000)]) == [str(i) for i in range(2, 2000)]
+    finally:
+        state.db.conn.set_trace_callback(None)
+    assert statements == ["PRAGMA data_version"]
+
+
+def test_replies_from_another_process_are_picked_up(state):
+    assert state.filter_unreplied(["5", "6"]) == ["5", "6"]
+    other = sqlite3.connect(state.db_name)
+    with other:
+        other.execute("INSERT INTO replied_tweets (tweet_id) VALUES ('6')")
+    other.close()
+    assert state.filter_unreplied(["5", "6"]) == ["5"]
+    assert state.has_replied_to("6")
+
+
+def test_state_db_path_from_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("TWITTER_STATE_DIR", str(tmp_path))
+    monkeypatch.delenv("CHARACTER_FILE", raising=False)
+    assert twitter_state.state_db_name() == str(tmp_path / "twitter_state.db")
+
+
+def test_importing_the_client_opens_no_state_database(tmp_path):
+    script = (
+        "import sys; sys.path.insert(0, %r)\n"
+        "import twitter_agent.custom_twitter_actions\n"
+    ) % os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, check=True,
+                   env={**os.environ, "TWITTER_STATE_DIR": "."})
+    assert not list(tmp_path.glob("twitter_state*"))
@@ -18,6 +18,12 @@ Rules:
 2. Must verify with has_replied_to first
 3. Stores tweet ID permanently to prevent duplicate replies"""
 
+TWITTER_FILTER_UNREPLIED_DESCRIPTION = """Check a batch of tweets at once and return the IDs we have NOT replied to yet.
+Input: tweet ID strings separated by commas.
+Rules:
+1. Use this instead of calling has_replied_to for each mention in a batch
+2. Only reply to the IDs it returns"""
+
 TWITTER_REPOST_CHECK_DESCRIPTION = "Check if we have already reposted a tweet. Input should be a tweet ID string."
 
 TWITTER_ADD_REPOSTED_DESCRIPTION = "Add a tweet ID to the database of reposted tweets."
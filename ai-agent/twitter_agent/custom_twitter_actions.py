@@ -3,12 +3,19 @@ from json import dumps
 from pydantic import BaseModel, Field
 from langchain.tools import Tool
 from typing import Optional, List, Dict, Union
-import tweepy
+import aiohttp
+from tweepy.asynchronous import AsyncClient
+from tweepy.errors import HTTPException, TooManyRequests
 import os
 from dotenv import load_dotenv
 import asyncio
+import weakref
 from functools import partial
 
+from twitter_agent.rate_limiter import RateLimiter, get_rate_limiter
+from twitter_agent.response_cache import ResponseCache, get_response_cache
+from twitter_agent.sync_cursors import SyncCursors, get_sync_cursors
+
 # Load environment variables
 load_dotenv()
 
@@ -18,23 +25,146 @@ class Tweet(BaseModel):
     author_id: str
     created_at: str
 
+class RateLimitedAsyncClient(AsyncClient):
+    """AsyncClient that takes a token from a shared RateLimiter before every request.
+
+    Each response's x-rate-limit-* headers feed the limiter back. A 429 marks the
+    endpoint spent until its reset and the request is retried once the window
+    reopens, unless that is further away than max_wait. After max_retries 429s
+    in a row the TooManyRequests error is raised.
+    """
+
+    def __init__(self, *args, rate_limiter: RateLimiter, max_wait: Optional[float] = None,
+                 max_retries: int = 3, **kwargs):
+        super().__init__(*args, wait_on_rate_limit=False, **kwargs)
+        self.rate_limiter = rate_limiter
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+
+    async def request(self, method, route, params=None, json=None, user_auth=False):
+        endpoint = self.rate_limiter.endpoint_key(method, route)
+        retries = 0
+        while True:
+            await self.rate_limiter.acquire(endpoint, self.max_wait)
+            try:
+                response = await super().request(method, route, params=params, json=json, user_auth=user_auth)
+            except TooManyRequests as e:
+                self.rate_limiter.exhaust(endpoint, self._reset_time(e))
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                continue
+            except HTTPException as e:
+                self.rate_limiter.update(endpoint, e.response.headers)
+                raise
+            self.rate_limiter.update(endpoint, response.headers)
+            return response
+
+    @staticmethod
+    def _reset_time(error: TooManyRequests) -> Optional[float]:
+        """Window reset of a 429, from its headers (TooManyRequests.reset_time only exists in newer tweepy)."""
+        try:
+            return float(error.response.headers["x-rate-limit-reset"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return getattr(error, "reset_time", None)
+
+
 class TwitterClient:
-    def __init__(self):
-        """Initialize Twitter API v2 client with credentials from environment variables."""
-        self.client = tweepy.Client(
+    """Async X API v2 client.
+
+    Requests go through tweepy's AsyncClient, so HTTP round trips and rate-limit
+    waits are awaited instead of blocking the event loop. aiohttp sessions are
+    bound to the loop that created them, so one AsyncClient (with its pooled
+    session) is kept per event loop. Every client shares one RateLimiter, so
+    the KB updater and the agent tools draw from the same per-endpoint budget.
+    User ID and timeline lookups are served from a persistent TTL cache first.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None,
+                 response_cache: Optional[ResponseCache] = None, sync_cursors: Optional[SyncCursors] = None):
+        """Read API credentials from environment variables; no connection is opened until the first request."""
+        self.credentials = dict(
             bearer_token=os.getenv("TWITTER_BEARER_TOKEN"),
             consumer_key=os.getenv("TWITTER_API_KEY"),
             consumer_secret=os.getenv("TWITTER_API_SECRET"),
             access_token=os.getenv("TWITTER_ACCESS_TOKEN"),
             access_token_secret=os.getenv("TWITTER_ACCESS_TOKEN_SECRET"),
-            wait_on_rate_limit=True
         )
+        # Upper bound on requests in flight from fetch_many_user_tweets
+        self.concurrency = concurrency or int(os.getenv("TWITTER_FETCH_CONCURRENCY", "5"))
+        # The state database behind these is opened on first use, not at construction
+        self._rate_limiter = rate_limiter
+        # Longest a request waits for a rate-limit window to reopen before failing
+        self.max_rate_limit_wait = float(os.getenv("TWITTER_MAX_RATE_LIMIT_WAIT", "900"))
+        # 429 responses in a row a request retries after before giving up
+        self.max_rate_limit_retries = int(os.getenv("TWITTER_MAX_RATE_LIMIT_RETRIES", "3"))
+        self._response_cache = response_cache
+        self._sync_cursors = sync_cursors
+        # Cap on timeline pages (of up to 100 tweets) fetched per user in one sync
+        self.max_sync_pages = int(os.getenv("TWITTER_SYNC_MAX_PAGES", "5"))
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        if self._rate_limiter is None:
+            self._rate_limiter = get_rate_limiter()
+        return self._rate_limiter
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            self._response_cache = get_response_cache()
+        return self._response_cache
+
+    @property
+    def sync_cursors(self) -> SyncCursors:
+        if self._sync_cursors is None:
+            self._sync_cursors = get_sync_cursors()
+        return self._sync_cursors
+
+    @property
+    def client(self) -> AsyncClient:
+        """The AsyncClient for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = RateLimitedAsyncClient(
+                **self.credentials, rate_limiter=self.rate_limiter, max_wait=self.max_rate_limit_wait,
+                max_retries=self.max_rate_limit_retries
+            )
+            client.session = aiohttp.ClientSession()
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the running loop's HTTP session; the next request opens a new one."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and client.session is not None:
+            await client.session.close()
+
+    def run_sync(self, method: Callable, *args, **kwargs):
+        """Run one of the async methods to completion from synchronous code."""
+        async def call():
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                await self.aclose()
+        return asyncio.run(call())
+
+    def next_available(self, method: str, route: str) -> float:
+        """Epoch seconds at which the endpoint can next be called without waiting."""
+        return self.rate_limiter.next_available(self.rate_limiter.endpoint_key(method, route))
 
     async def get_user_id(self, username: str) -> Optional[str]:
         """Get user ID from username."""
+        params = {"username": username.lstrip("@").lower()}
+        cached = self.response_cache.get("user_id", params)
+        if cached is not None:
+            return cached
         try:
-            user = self.client.get_user(username=username)
+            user = await self.client.get_user(username=username)
             if user and user.data:
+                self.response_cache.put("user_id", params, str(user.data.id))
                 return str(user.data.id)
             return None
         except Exception as e:
@@ -43,17 +173,22 @@ class TwitterClient:
 
     async def get_user_tweets(self, user_id: str, max_results: int = 10) -> List[Tweet]:
         """Get recent tweets from a user."""
+        params = {"user_id": str(user_id), "max_results": max_results}
+        cached = self.response_cache.get("user_tweets", params)
+        if cached is not None:
+            return [Tweet(**tweet) for tweet in cached]
         try:
-            tweets = self.client.get_users_tweets(
+            tweets = await self.client.get_users_tweets(
                 id=user_id,
                 max_results=max_results,
                 tweet_fields=['created_at', 'author_id']
             )
             
             if not tweets.data:
+                self.response_cache.put("user_tweets", params, [])
                 return []
                 
-            return [
+            result = [
                 Tweet(
                     id=str(tweet.id),
                     text=tweet.text,
@@ -62,14 +197,93 @@ class TwitterClient:
                 )
                 for tweet in tweets.data
             ]
+            self.response_cache.put("user_tweets", params, [tweet.model_dump() for tweet in result])
+            return result
         except Exception as e:
             print(f"Error getting tweets for user {user_id}: {str(e)}")
             return []
 
+    async def _gather_per_user(self, fetch: Callable, user_ids: List[str]) -> Dict[str, List[Tweet]]:
+        """Run fetch(user_id) for every user, at most self.concurrency at a time."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(user_id: str) -> List[Tweet]:
+            async with semaphore:
+                return await fetch(user_id)
+
+        results = await asyncio.gather(*(limited(user_id) for user_id in user_ids))
+        return dict(zip(user_ids, results))
+
+    async def fetch_many_user_tweets(self, user_ids: List[str], max_results: int = 10) -> Dict[str, List[Tweet]]:
+        """Get recent tweets for several users concurrently, at most self.concurrency requests at a time."""
+        return await self._gather_per_user(lambda user_id: self.get_user_tweets(user_id, max_results), user_ids)
+
+    async def sync_user_tweets(self, user_id: str, initial_results: int = 10, advance_cursor: bool = True,
+                               ignore_cursor: bool = False) -> List[Tweet]:
+        """Get the tweets a user posted since the last sync, oldest first.
+
+        With a cursor, every tweet newer than it is fetched with since_id, following
+        pagination_token 100 at a time (up to max_sync_pages). Without one, only
+        the latest initial_results tweets are fetched. advance_cursor=False leaves
+        the cursor alone so the caller can commit_cursors() once the delta is stored.
+        """
+        since_id = None if ignore_cursor else self.sync_cursors.get(user_id)
+        params = {"id": user_id, "tweet_fields": ['created_at', 'author_id']}
+        if since_id is None:
+            params["max_results"] = max(5, min(initial_results, 100))
+        else:
+            params["since_id"] = since_id
+            params["max_results"] = 100
+
+        tweets: List[Tweet] = []
+        try:
+            for page in range(self.max_sync_pages if since_id else 1):
+                response = await self.client.get_users_tweets(**params)
+                tweets.extend(
+                    Tweet(
+                        id=str(tweet.id),
+                        text=tweet.text,
+                        author_id=str(tweet.author_id),
+                        created_at=tweet.created_at.isoformat()
+                    )
+                    for tweet in response.data or []
+                )
+                next_token = (response.meta or {}).get("next_token")
+                if not next_token:
+                    break
+                params["pagination_token"] = next_token
+            else:
+                if since_id:
+                    print(f"Stopped syncing user {user_id} after {self.max_sync_pages} pages; older new tweets skipped")
+        except Exception as e:
+            print(f"Error syncing tweets for user {user_id}: {str(e)}")
+            # Pages arrive newest first, so a partial delta would leave a gap behind the cursor
+            return []
+
+        tweets.sort(key=lambda tweet: int(tweet.id))
+        if advance_cursor and tweets:
+            self.commit_cursors({user_id: tweets})
+        return tweets
+
+    async def sync_many_user_tweets(self, user_ids: List[str], initial_results: int = 10,
+                                    advance_cursor: bool = True, ignore_cursor: bool = False) -> Dict[str, List[Tweet]]:
+        """sync_user_tweets for several users concurrently, at most self.concurrency at a time."""
+        return await self._gather_per_user(
+            lambda user_id: self.sync_user_tweets(user_id, initial_results, advance_cursor, ignore_cursor),
+            user_ids
+        )
+
+    def commit_cursors(self, tweets_by_user: Dict[str, List[Tweet]]):
+        """Advance each user's cursor to the newest of their synced tweets."""
+        self.sync_cursors.advance({
+            user_id: max((tweet.id for tweet in tweets), key=int)
+            for user_id, tweets in tweets_by_user.items() if tweets
+        })
+
     async def delete_tweet(self, tweet_id: str) -> bool:
         """Delete a tweet."""
         try:
-            response = self.client.delete_tweet(id=tweet_id)
+            response = await self.client.delete_tweet(id=tweet_id)
             return response.data is not None
         except Exception as e:
             print(f"Error deleting tweet {tweet_id}: {str(e)}")
@@ -78,7 +292,7 @@ class TwitterClient:
     async def retweet(self, tweet_id: str) -> bool:
         """Retweet a tweet."""
         try:
-            response = self.client.retweet(tweet_id=tweet_id)
+            response = await self.client.retweet(tweet_id=tweet_id)
             return response.data is not None
         except Exception as e:
             print(f"Error retweeting {tweet_id}: {str(e)}")
@@ -94,7 +308,8 @@ def create_delete_tweet_tool() -> Tool:
         description="""Delete a tweet using its ID. You can only delete tweets from your own account.
         Input should be the tweet ID as a string.
         Example: delete_tweet("1234567890")""",
-        func=lambda tweet_id: asyncio.run(twitter_client.delete_tweet(tweet_id))
+        func=lambda tweet_id: twitter_client.run_sync(twitter_client.delete_tweet, tweet_id),
+        coroutine=twitter_client.delete_tweet
     )
 
 def create_get_user_id_tool() -> Tool:
@@ -104,7 +319,8 @@ def create_get_user_id_tool() -> Tool:
         description="""Get a Twitter user's ID from their username.
         Input should be the username as a string (without the @ symbol).
         Example: get_user_id("TwitterDev")""",
-        func=lambda username: asyncio.run(twitter_client.get_user_id(username))
+        func=lambda username: twitter_client.run_sync(twitter_client.get_user_id, username),
+        coroutine=twitter_client.get_user_id
     )
 
 def create_get_user_tweets_tool() -> Tool:
@@ -115,7 +331,8 @@ def create_get_user_tweets_tool() -> Tool:
         Input should be the user ID as a string.
         Example: get_user_tweets("783214")
         Optionally specify max_results (default 10) as: get_user_tweets("783214", max_results=5)""",
-        func=lambda user_id, max_results=10: asyncio.run(twitter_client.get_user_tweets(user_id, max_results))
+        func=lambda user_id, max_results=10: twitter_client.run_sync(twitter_client.get_user_tweets, user_id, max_results),
+        coroutine=twitter_client.get_user_tweets
     )
 
 def create_retweet_tool() -> Tool:
@@ -125,7 +342,8 @@ def create_retweet_tool() -> Tool:
         description="""Retweet a tweet using its ID. You can only retweet public tweets.
         Input should be the tweet ID as a string.
         Example: retweet("1234567890")""",
-        func=lambda tweet_id: asyncio.run(twitter_client.retweet(tweet_id))
+        func=lambda tweet_id: twitter_client.run_sync(twitter_client.retweet, tweet_id),
+        coroutine=twitter_client.retweet
     )
 
 def create_query_knowledge_base_tool(knowledge_base) -> Tool:
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from twitter_agent.twitter_state import get_state_connection
+from utils import print_system
+
+# Numeric IDs in a path (the API version segment "/2" is kept)
+_NUMERIC_SEGMENT = re.compile(r"/\d{3,}(?=/|$)")
+
+# Non-numeric path parameters, replaced by their route template placeholder
+_NAMED_SEGMENTS = [
+    (re.compile(r"/users/by/username/[^/]+"), "/users/by/username/:username"),
+]
+
+# Key prefix of limiter rows in the twitter_state table
+STATE_KEY_PREFIX = "rate_limit:"
+
+# Length of an X API rate-limit window, used until a response reports the next reset
+WINDOW_SECONDS = 15 * 60
+
+
+class RateLimited(Exception):
+    """Raised when a call would have to wait longer than the caller allows."""
+
+    def __init__(self, endpoint: str, available_at: float):
+        self.endpoint = endpoint
+        self.available_at = available_at
+        super().__init__(f"{endpoint} is rate limited for another {max(available_at - time.time(), 0):.0f}s")
+
+
+class EndpointBucket:
+    """Request budget of one endpoint for the current X API rate-limit window.
+
+    The bucket holds limit tokens and refills completely at reset (epoch seconds),
+    which is how X's fixed 15-minute windows behave.
+    """
+
+    def __init__(self, limit: int, remaining: int, reset: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+    def refill(self, now: float):
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset += ((now - self.reset) // WINDOW_SECONDS + 1) * WINDOW_SECONDS
+
+    def to_json(self) -> str:
+        return json.dumps({"limit": self.limit, "remaining": self.remaining, "reset": self.reset})
+
+
+class RateLimiter:
+    """Per-endpoint token buckets fed by x-rate-limit-* response headers.
+
+    A token is taken before each request, and the response headers overwrite the
+    local estimate. Buckets are persisted in the twitter_state table, so a restart
+    inside a window keeps its remaining budget. Endpoints that have not returned
+    headers yet are never limited.
+    """
+
+    def __init__(self, db_name: Optional[str] = None):
+        self.db = get_state_connection(db_name)
+        self.db_name = self.db.db_name
+        self._buckets: Dict[str, EndpointBucket] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def endpoint_key(method: str, route: str) -> str:
+        """Collapse IDs and usernames in a route, so every user's lookups share one bucket."""
+        path = _NUMERIC_SEGMENT.sub('/:id', route.split('?')[0])
+        for pattern, template in _NAMED_SEGMENTS:
+            path = pattern.sub(template, path)
+        return f"{method.upper()} {path}"
+
+    def _load(self):
+        """Restore the buckets whose windows have not reset yet."""
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS twitter_state (key TEXT PRIMARY KEY, value TEXT)')
+        rows = self.db.query(
+            'SELECT key, value FROM twitter_state WHERE key LIKE ?', (STATE_KEY_PREFIX + '%',)
+        )
+        for key, value in rows:
+            state = json.loads(value)
+            if state["reset"] > now:
+                self._buckets[key[len(STATE_KEY_PREFIX):]] = EndpointBucket(**state)
+
+    def _persist(self, endpoint: str, bucket: EndpointBucket):
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO twitter_state (key, value) VALUES (?, ?)',
+                (STATE_KEY_PREFIX + endpoint, bucket.to_json())
+            )
+
+    def next_available(self, endpoint: str) -> float:
+        """Epoch seconds at which endpoint can next be called (now if a token is left)."""
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                return now
+            bucket.refill(now)
+            return now if bucket.remaining > 0 else bucket.reset
+
+    def wait_time(self, endpoint: str) -> float:
+        """Seconds until endpoint can next be called."""
+        return max(self.next_available(endpoint) - time.time(), 0.0)
+
+    def try_acquire(self, endpoint: str) -> bool:
+        """Take a token for endpoint if one is available, without waiting."""
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                return True
+            bucket.refill(time.time())
+            if bucket.remaining <= 0:
+                return False
+            bucket.remaining -= 1
+            return True
+
+    async def acquire(self, endpoint: str, max_wait: Optional[float] = None):
+        """Take a token for endpoint, awaiting the window reset if the budget is spent.
+
+        Raises RateLimited instead of waiting when the wait would exceed max_wait.
+        """
+        while not self.try_acquire(endpoint):
+            available_at = self.next_available(endpoint)
+            wait = max(available_at - time.time(), 0.0)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimited(endpoint, available_at)
+            print_system(f"Rate limit reached for {endpoint}; waiting {wait:.0f}s for the window to reset")
+            # A second of slack for clock skew against the API's reset time
+            await asyncio.sleep(wait + 1)
+
+    def ensure_budget(self, endpoint: str, limit: int):
+        """Give endpoint a local budget of limit calls per window until response headers report the real one.
+
+        For endpoints called outside a RateLimitedAsyncClient, whose headers never reach the limiter.
+        """
+        with self._lock:
+            if endpoint not in self._buckets:
+                bucket = self._buckets[endpoint] = EndpointBucket(limit, limit, time.time() + WINDOW_SECONDS)
+                self._persist(endpoint, bucket)
+
+    def update(self, endpoint: str, headers: Mapping[str, str]):
+        """Record the budget reported by a response's x-rate-limit-* headers."""
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = float(headers["x-rate-limit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is not None and bucket.reset == reset:
+                # Responses of concurrent requests can arrive out of order; keep the lower count
+                bucket.remaining = min(bucket.remaining, remaining)
+                bucket.limit = limit
+            else:
+                bucket = self._buckets[endpoint] = EndpointBucket(limit, remaining, reset)
+            self._persist(endpoint, bucket)
+
+    def exhaust(self, endpoint: str, reset: Optional[float]):
+        """Mark endpoint as spent until reset, after a 429 response."""
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            reset = reset or time.time() + WINDOW_SECONDS
+            if bucket is None:
+                bucket = self._buckets[endpoint] = EndpointBucket(1, 0, reset)
+            bucket.remaining = 0
+            bucket.reset = max(bucket.reset, reset)
+            self._persist(endpoint, bucket)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current budget of every endpoint seen so far."""
+        now = time.time()
+        with self._lock:
+            result = {}
+            for endpoint, bucket in self._buckets.items():
+                bucket.refill(now)
+                result[endpoint] = {
+                    "limit": bucket.limit,
+                    "remaining": bucket.remaining,
+                    "reset": bucket.reset,
+                    "available_in_seconds": 0.0 if bucket.remaining > 0 else round(bucket.reset - now, 1),
+                }
+            return result
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter shared by every TwitterClient."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
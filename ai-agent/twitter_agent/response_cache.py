@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from twitter_agent.twitter_state import get_state_connection
+
+# Seconds a cached response stays fresh, per logical endpoint
+DEFAULT_TTLS = {
+    # Username -> ID mappings practically never change
+    "user_id": float(os.getenv("TWITTER_CACHE_USER_ID_TTL", str(7 * 24 * 3600))),
+    "user_tweets": float(os.getenv("TWITTER_CACHE_USER_TWEETS_TTL", "300")),
+}
+
+
+class ResponseCache:
+    """Persistent TTL cache of X API lookups, keyed by endpoint and parameters.
+
+    Lives in the per-character twitter_state database, so cached lookups survive
+    restarts and are shared by every TwitterClient in the process. A TTL of 0
+    disables caching for that endpoint.
+    """
+
+    def __init__(self, db_name: Optional[str] = None, ttls: Optional[Dict[str, float]] = None):
+        self.db = get_state_connection(db_name)
+        self.db_name = self.db.db_name
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    endpoint TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (endpoint, params)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_expires ON api_cache(expires_at)')
+
+    @staticmethod
+    def _params_key(params: Dict) -> str:
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, endpoint: str, params: Dict) -> Optional[Any]:
+        """Return the cached response for endpoint and params, or None if missing or expired."""
+        if self.ttls.get(endpoint, 0) <= 0:
+            return None
+        rows = self.db.query(
+            'SELECT value FROM api_cache WHERE endpoint = ? AND params = ? AND expires_at > ?',
+            (endpoint, self._params_key(params), time.time())
+        )
+        with self._lock:
+            if not rows:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(rows[0][0])
+
+    def put(self, endpoint: str, params: Dict, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable response for ttl seconds (default: the endpoint's TTL)."""
+        ttl = self.ttls.get(endpoint, 0) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO api_cache (endpoint, params, value, expires_at) VALUES (?, ?, ?, ?)',
+                (endpoint, self._params_key(params), json.dumps(value), time.time() + ttl)
+            )
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Drop every cached response, or only those of endpoint."""
+        with self.db.transaction() as conn:
+            if endpoint is None:
+                conn.execute('DELETE FROM api_cache')
+            else:
+                conn.execute('DELETE FROM api_cache WHERE endpoint = ?', (endpoint,))
+
+    def purge_expired(self) -> int:
+        """Delete expired rows. Returns the number removed."""
+        with self.db.transaction() as conn:
+            cursor = conn.execute('DELETE FROM api_cache WHERE expires_at <= ?', (time.time(),))
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, purging expired rows when it is first opened."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+            _response_cache.purge_expired()
+        return _response_cache
@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from twitter_agent.twitter_state import get_state_connection
+
+
+class SyncCursors:
+    """Per-user timeline cursors: the newest tweet ID already synced for each user.
+
+    Stored in the per-character twitter_state database, so incremental syncs pick
+    up where the previous run stopped, across restarts.
+    """
+
+    def __init__(self, db_name: Optional[str] = None):
+        self.db = get_state_connection(db_name)
+        self.db_name = self.db.db_name
+        self._init_db()
+
+    def _init_db(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sync_cursors (
+                    user_id TEXT PRIMARY KEY,
+                    since_id TEXT NOT NULL,
+                    synced_at REAL NOT NULL
+                )
+            ''')
+
+    def get(self, user_id: str) -> Optional[str]:
+        """Return the newest synced tweet ID for user_id, if any."""
+        rows = self.db.query('SELECT since_id FROM sync_cursors WHERE user_id = ?', (str(user_id),))
+        return rows[0][0] if rows else None
+
+    def advance(self, cursors: Dict[str, str]):
+        """Move each user's cursor forward to the given tweet ID (never backwards)."""
+        if not cursors:
+            return
+        now = time.time()
+        with self.db.transaction() as conn:
+            for user_id, since_id in cursors.items():
+                current = conn.execute(
+                    'SELECT since_id FROM sync_cursors WHERE user_id = ?', (str(user_id),)
+                ).fetchone()
+                # Tweet IDs are snowflakes: a larger ID is a newer tweet
+                if current is None or int(since_id) > int(current[0]):
+                    conn.execute(
+                        'INSERT OR REPLACE INTO sync_cursors (user_id, since_id, synced_at) VALUES (?, ?, ?)',
+                        (str(user_id), str(since_id), now)
+                    )
+
+    def reset(self, user_id: Optional[str] = None):
+        """Forget the cursor of user_id, or every cursor, so the next sync starts from the latest tweets."""
+        with self.db.transaction() as conn:
+            if user_id is None:
+                conn.execute('DELETE FROM sync_cursors')
+            else:
+                conn.execute('DELETE FROM sync_cursors WHERE user_id = ?', (str(user_id),))
+
+
+_sync_cursors: Optional[SyncCursors] = None
+_sync_cursors_lock = threading.Lock()
+
+
+def get_sync_cursors() -> SyncCursors:
+    """Return the process-wide cursor store."""
+    global _sync_cursors
+    with _sync_cursors_lock:
+        if _sync_cursors is None:
+            _sync_cursors = SyncCursors()
+        return _sync_cursors
@@ -1,14 +1,25 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 import chromadb
 from chromadb.utils import embedding_functions
-from datetime import datetime
+from datetime import datetime, timezone
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from utils import print_system, print_error
-import asyncio
+from kb_core import snapshot
+from kb_core.buckets import BucketedCollection
+from kb_core.config import CHROMA_PATH
+from kb_core.dedup import SimHashIndex, maximal_marginal_relevance, simhash
+from kb_core.embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_function
+from kb_core.executor import run_in_query_executor
+from kb_core.index import (
+    ExactSearchIndex, IndexSettings, distance_to_similarity, drop_collection, open_collection, recreate_collection
+)
+from kb_core.manifest import CollectionManifest
+from kb_core.query_cache import get_query_cache
+from kb_core.rerank import get_reranker, rerank_enabled
 import os
 import random
+import threading
 import json  # Add json import for pretty printing
 from twitter_agent.custom_twitter_actions import TwitterClient, Tweet
 
@@ -20,102 +31,483 @@ class Tweet(BaseModel):
     author_id: str
 
 class TweetKnowledgeBase:
-    def __init__(self, collection_name: str = "twitter_knowledge"):
+    def __init__(self, collection_name: str = "twitter_knowledge", embedding_model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 embedding_backend: Optional[str] = None, persist_path: Optional[str] = None,
+                 index_settings: Optional[IndexSettings] = None, bucket_days: Optional[int] = None):
         print_system("Initializing TweetKnowledgeBase...")
         # Create data directory if it doesn't exist
         data_dir = os.path.join(os.path.dirname(__file__), "..", "data", "chroma_db")
         os.makedirs(data_dir, exist_ok=True)
         
-        # Initialize ChromaDB client with persistence in data directory
-        self.client = chromadb.PersistentClient(path="./chroma_db")
+        # Initialize ChromaDB client with persistence in data directory (persist_path overrides it, e.g. for benchmarks)
+        self.persist_path = persist_path
+        self.collection_name = collection_name
+        self.client = chromadb.PersistentClient(path=persist_path or CHROMA_PATH)
         
-        # Use a more advanced embedding model
-        self.embedding_model = SentenceTransformer('all-mpnet-base-v2')
+        # Share one lazily-loaded model with every other knowledge base in the process
+        embedding_func = get_embedding_function(embedding_model_name, embedding_backend)
+        self.embedding_function = embedding_func
         
-        # Create embedding function that matches ChromaDB's expected interface
-        class EmbeddingFunction:
-            def __init__(self, model):
-                self.model = model
-            
-            def __call__(self, input: List[str]) -> List[List[float]]:
-                embeddings = self.model.encode(input)
-                return embeddings.tolist()
-        
-        embedding_func = EmbeddingFunction(self.embedding_model)
-        
-        # Create or get collection
+        # Create or get collection with its HNSW settings; small collections are searched exactly
+        self.index_settings = index_settings or IndexSettings.from_env()
+        # With bucket_days set, tweets live in one collection per time window and retention drops whole windows
+        if bucket_days is None:
+            bucket_days = int(os.getenv("TWITTER_KB_BUCKET_DAYS", "0"))
+        self.bucket_days = bucket_days
         try:
-            self.collection = self.client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=embedding_func
-            )
+            self.collection = self._open_collection(collection_name)
         except Exception as e:
             print(f"Error initializing collection: {e}")
             raise
-
-    def add_tweets(self, tweets: List[Tweet]):
-        """Add tweets to the knowledge base."""
-        documents = [tweet.text for tweet in tweets]
-        ids = [tweet.id for tweet in tweets]
-        metadata = [
-            {
-                "author_id": tweet.author_id,
-                "created_at": tweet.created_at,
-            }
-            for tweet in tweets
-        ]
+        self.exact_index = ExactSearchIndex(self.collection, self.index_settings.exact_search_threshold)
         
-        self.collection.add(
-            documents=documents,
-            ids=ids,
-            metadatas=metadata
+        # Sidecar store that keeps count and latest timestamp without scanning the collection
+        self.manifest = CollectionManifest(
+            collection_name, path=os.path.join(persist_path, "kb_manifest.db") if persist_path else None
         )
+        self._backfill_created_at_ts()
+        self._bootstrap_manifest()
+        
+        # LRU+TTL cache of query results, invalidated on every write
+        self.query_cache = get_query_cache(collection_name, persist_path)
+        
+        # Near-duplicate detection: an author's reposts of the same text fold into one stored vector
+        self.dedup_enabled = os.getenv("TWITTER_KB_DEDUP", "true").lower() == "true"
+        self._dedup_index: Optional[SimHashIndex] = None
+        self._dedup_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
 
-    def query_knowledge_base(self, query: str, n_results: int = 10) -> List[Dict]:
-        """Query the knowledge base for relevant tweets."""
-        try:
-            print_system(f"Querying knowledge base with: {query}")
+    def _open_collection(self, name: str):
+        """Open (creating if needed) the plain or bucketed collection called name."""
+        if self.bucket_days > 0:
+            return BucketedCollection(self.client, name, self.embedding_function, self.index_settings, self.bucket_days)
+        return open_collection(self.client, name, self.embedding_function, self.index_settings)
+
+    def _drop_collection(self, name: str):
+        """Drop the plain or bucketed collection called name, if it exists."""
+        if self.bucket_days > 0:
+            self._open_collection(name).truncate()
+        else:
+            drop_collection(self.client, name)
+
+    def _bootstrap_manifest(self):
+        """Seed the manifest from an existing collection the first time it is opened."""
+        if self.manifest.is_initialized():
+            return
+        count = self.collection.count()
+        latest_ts = None
+        if count:
+            print_system("Building knowledge base manifest from existing tweets (one-time scan)...")
+            metadatas = self.collection.get(include=["metadatas"])["metadatas"]
+            latest_ts = max(
+                m.get("created_at_ts") or self._parse_created_at(m["created_at"]).timestamp()
+                for m in metadatas
+            )
+        self.manifest.set_stats(count, latest_ts)
+
+    def _backfill_created_at_ts(self):
+        """Add created_at_ts to rows stored before it existed, so time filters and eviction see them.
+
+        A one-time migration: the manifest records it, so later opens skip the scan.
+        """
+        if self.manifest.has_migration("created_at_ts"):
+            return
+        if not self.collection.count():
+            self.manifest.record_migration("created_at_ts")
+            return
+        rows = self.collection.get(include=["metadatas"])
+        legacy = {
+            tweet_id: {**metadata, "created_at_ts": self._parse_created_at(metadata["created_at"]).timestamp()}
+            for tweet_id, metadata in zip(rows["ids"], rows["metadatas"])
+            if metadata.get("created_at_ts") is None and metadata.get("created_at")
+        }
+        if legacy:
+            print_system(f"Backfilling created_at_ts for {len(legacy)} tweets stored before time filtering...")
+            ids = list(legacy)
+            for start in range(0, len(ids), 1000):
+                batch = ids[start:start + 1000]
+                self.collection.update(ids=batch, metadatas=[legacy[tweet_id] for tweet_id in batch])
+        self.manifest.record_migration("created_at_ts")
+
+    @property
+    def embedding_model(self):
+        """The shared SentenceTransformer instance (loaded on first access)."""
+        return self.embedding_function.model
+
+    @staticmethod
+    def _parse_created_at(created_at: str) -> datetime:
+        """Parse an X API ISO timestamp into an aware datetime."""
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+
+    def _tweet_metadata(self, tweet: Tweet) -> Dict:
+        """Build the Chroma metadata stored alongside a tweet."""
+        return {
+            "author_id": tweet.author_id,
+            "created_at": tweet.created_at,
+            # Numeric copy so age-based eviction can run as a Chroma where clause
+            "created_at_ts": self._parse_created_at(tweet.created_at).timestamp(),
+            "simhash": format(simhash(tweet.text), "016x"),
+            # Comma-separated IDs of every tweet folded into this vector (Chroma metadata is scalar-only)
+            "source_tweet_ids": tweet.id,
+        }
+
+    def _get_dedup_index(self) -> SimHashIndex:
+        """Return the SimHash index over stored tweets, building it from the collection on first use."""
+        with self._dedup_lock:
+            if self._dedup_index is None:
+                index = SimHashIndex(max_distance=int(os.getenv("TWITTER_KB_DEDUP_DISTANCE", "3")))
+                rows = self.collection.get(include=["documents", "metadatas"])
+                for tweet_id, document, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"]):
+                    fingerprint = metadata.get("simhash")
+                    index.add(tweet_id, int(fingerprint, 16) if fingerprint else simhash(document),
+                              metadata.get("author_id"))
+                self._dedup_index = index
+            return self._dedup_index
+
+    def _collapse_near_duplicates(self, tweets: List[Tweet]):
+        """Split tweets into new vectors and near-duplicates of stored (or earlier) tweets.
+
+        Returns (new tweets, metadata of new tweets by ID, updated metadata of stored
+        tweets by ID, number of tweets collapsed, number already recorded as duplicates).
+        """
+        index = self._get_dedup_index()
+        new_tweets = []
+        new_metadata: Dict[str, Dict] = {}
+        updated_metadata: Dict[str, Dict] = {}
+        collapsed = known = 0
+        
+        for tweet in tweets:
+            metadata = self._tweet_metadata(tweet)
+            # Only one author's reposts fold together, so author_id filters still find every KOL's tweets
+            canonical_id = index.find(int(metadata["simhash"], 16), tweet.author_id)
+            if canonical_id is not None and canonical_id not in new_metadata and canonical_id not in updated_metadata:
+                rows = self.collection.get(ids=[canonical_id], include=["metadatas"])
+                if rows["ids"]:
+                    updated_metadata[canonical_id] = rows["metadatas"][0]
+                else:
+                    # Evicted since the index was built
+                    index.remove(canonical_id)
+                    canonical_id = None
             
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
+            if canonical_id is None:
+                index.add(tweet.id, int(metadata["simhash"], 16), tweet.author_id)
+                new_tweets.append(tweet)
+                new_metadata[tweet.id] = metadata
+                continue
+            
+            canonical = new_metadata.get(canonical_id) or updated_metadata[canonical_id]
+            source_ids = (canonical.get("source_tweet_ids") or canonical_id).split(",")
+            if tweet.id in source_ids:
+                known += 1
+                continue
+            canonical["source_tweet_ids"] = ",".join(source_ids + [tweet.id])
+            # A fresh repost keeps the shared vector inside recency windows
+            if metadata["created_at_ts"] > canonical.get("created_at_ts", 0):
+                canonical["created_at"] = metadata["created_at"]
+                canonical["created_at_ts"] = metadata["created_at_ts"]
+            collapsed += 1
+        
+        return new_tweets, new_metadata, updated_metadata, collapsed, known
+
+    def add_tweets(self, tweets: List[Tweet]) -> Dict[str, int]:
+        """Add tweets to the knowledge base, folding near-duplicates into the stored copy.
+
+        Returns counts of tweets stored as new vectors ("inserted"), folded into an
+        existing vector ("collapsed") and already folded before ("skipped").
+        """
+        if self.dedup_enabled:
+            new_tweets, new_metadata, updated_metadata, collapsed, known = self._collapse_near_duplicates(tweets)
+        else:
+            new_tweets, updated_metadata, collapsed, known = tweets, {}, 0, 0
+            new_metadata = {tweet.id: self._tweet_metadata(tweet) for tweet in tweets}
+        
+        if new_tweets:
+            self.collection.add(
+                documents=[tweet.text for tweet in new_tweets],
+                ids=[tweet.id for tweet in new_tweets],
+                metadatas=[new_metadata[tweet.id] for tweet in new_tweets]
+            )
+        if updated_metadata:
+            self.collection.update(ids=list(updated_metadata), metadatas=list(updated_metadata.values()))
+        
+        if new_tweets or updated_metadata:
+            self.manifest.record_add(
+                self.collection.count(),
+                max(
+                    (m["created_at_ts"] for m in [*new_metadata.values(), *updated_metadata.values()]
+                     if m.get("created_at_ts") is not None),
+                    default=None
+                )
             )
+            self.query_cache.invalidate()
+        if collapsed:
+            print_system(f"Collapsed {collapsed} near-duplicate tweets into existing vectors")
+        return {"inserted": len(new_tweets), "collapsed": collapsed, "skipped": known}
+
+    def upsert_tweets(self, tweets: List[Tweet]) -> Dict[str, int]:
+        """Insert tweets that are not stored yet, leaving existing vectors untouched."""
+        # Collapse duplicates within the batch (the same tweet can come back twice)
+        unique_tweets = list({tweet.id: tweet for tweet in tweets}.values())
+        if not unique_tweets:
+            return {"inserted": 0, "collapsed": 0, "skipped": 0}
+        
+        existing = self.collection.get(ids=[tweet.id for tweet in unique_tweets], include=[])
+        existing_ids = set(existing["ids"])
+        new_tweets = [tweet for tweet in unique_tweets if tweet.id not in existing_ids]
+        
+        counts = self.add_tweets(new_tweets) if new_tweets else {"inserted": 0, "collapsed": 0, "skipped": 0}
+        return {
+            "inserted": counts["inserted"],
+            "collapsed": counts["collapsed"],
+            "skipped": len(tweets) - len(new_tweets) + counts["skipped"],
+        }
+
+    def evict_tweets(self, max_age_days: Optional[float] = None, max_per_author: Optional[int] = None,
+                     author_ids: Optional[List[str]] = None) -> int:
+        """Delete tweets older than max_age_days and keep at most max_per_author tweets per author.
+
+        The per-author cap is applied to author_ids, or to every author in the collection
+        when author_ids is not given. Returns the number of evicted tweets.
+        """
+        evicted = 0
+        
+        if max_age_days is not None:
+            cutoff = datetime.now(timezone.utc).timestamp() - max_age_days * 86400
+            if isinstance(self.collection, BucketedCollection):
+                # Windows that ended before the cutoff go in one drop; only the boundary window is filtered row by row
+                evicted += self.collection.drop_buckets_before(cutoff)
+            stale = self.collection.get(where={"created_at_ts": {"$lt": cutoff}}, include=[])
+            if stale["ids"]:
+                self.collection.delete(ids=stale["ids"])
+                evicted += len(stale["ids"])
+        
+        if max_per_author is not None:
+            if author_ids is None:
+                all_metadata = self.collection.get(include=["metadatas"])["metadatas"]
+                author_ids = list({m["author_id"] for m in all_metadata})
             
-            # Debug logging
-            print_system(f"Raw query results: {json.dumps(results, indent=2)}")
+            for author_id in author_ids:
+                rows = self.collection.get(where={"author_id": author_id}, include=["metadatas"])
+                if len(rows["ids"]) <= max_per_author:
+                    continue
+                # Newest first; legacy rows without created_at_ts sort as oldest
+                ranked = sorted(
+                    zip(rows["ids"], rows["metadatas"]),
+                    key=lambda row: row[1].get("created_at_ts", 0),
+                    reverse=True
+                )
+                overflow = [tweet_id for tweet_id, _ in ranked[max_per_author:]]
+                self.collection.delete(ids=overflow)
+                evicted += len(overflow)
+        
+        if evicted:
+            self.manifest.record_delete(self.collection.count())
+            self.query_cache.invalidate()
+            print_system(f"Evicted {evicted} tweets from knowledge base")
+        return evicted
+
+    @staticmethod
+    def _to_epoch(value: Union[datetime, float, int, str]) -> float:
+        """Convert a datetime, ISO string or epoch number into epoch seconds."""
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            value = TweetKnowledgeBase._parse_created_at(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    @classmethod
+    def build_where(cls, author_ids: Optional[List[str]] = None,
+                    since: Optional[Union[datetime, float, str]] = None,
+                    until: Optional[Union[datetime, float, str]] = None) -> Optional[Dict]:
+        """Build a Chroma where clause filtering by KOL author and created_at window."""
+        conditions = []
+        if author_ids:
+            author_ids = [str(author_id) for author_id in author_ids]
+            conditions.append(
+                {"author_id": author_ids[0]} if len(author_ids) == 1 else {"author_id": {"$in": author_ids}}
+            )
+        if since is not None:
+            conditions.append({"created_at_ts": {"$gte": cls._to_epoch(since)}})
+        if until is not None:
+            conditions.append({"created_at_ts": {"$lte": cls._to_epoch(until)}})
+        
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def query_knowledge_base(self, query: str, n_results: int = 10, author_ids: Optional[List[str]] = None,
+                             since: Optional[Union[datetime, float, str]] = None,
+                             until: Optional[Union[datetime, float, str]] = None,
+                             recency_half_life_hours: Optional[float] = None,
+                             recency_weight: float = 0.3, rerank: Optional[bool] = None,
+                             diversity: Optional[float] = None) -> List[Dict]:
+        """Query the knowledge base for relevant tweets.
+
+        author_ids, since and until are pushed down to Chroma as a where clause. With
+        recency_half_life_hours set (default TWITTER_KB_RECENCY_HALF_LIFE_HOURS), the
+        similarity is blended with an exponential recency score using recency_weight.
+        rerank (default KB_RERANK) rescores an over-fetched candidate set with a cross-encoder.
+        diversity (default TWITTER_KB_MMR_LAMBDA) is the MMR relevance weight; 1.0 turns MMR off.
+        """
+        print_system(f"Querying knowledge base with: {query}")
+        results = self.query_many(
+            [query],
+            n_results=n_results,
+            where=self.build_where(author_ids, since, until),
+            recency_half_life_hours=recency_half_life_hours,
+            recency_weight=recency_weight,
+            rerank=rerank,
+            diversity=diversity
+        )
+        return results[0] if results else []
+
+    async def aquery_knowledge_base(self, query: str, n_results: int = 10, **kwargs) -> List[Dict]:
+        """Async query_knowledge_base: encoding and search run on the shared query executor."""
+        return await run_in_query_executor(self.query_knowledge_base, query, n_results, **kwargs)
+
+    def query_many(self, queries: List[str], n_results: int = 10, where: Optional[Dict] = None,
+                   recency_half_life_hours: Optional[float] = None, recency_weight: float = 0.3,
+                   rerank: Optional[bool] = None, diversity: Optional[float] = None) -> List[List[Dict]]:
+        """Query the knowledge base for several queries in one batched round trip.
+
+        All queries are encoded in a single forward pass and sent to Chroma as one
+        query; results come back as one list of tweets per query, in input order.
+        With diversity below 1.0 the final top-n is picked from an over-fetched pool
+        by maximal marginal relevance, so near-identical tweets do not crowd it out.
+        """
+        if not queries:
+            return []
+        if recency_half_life_hours is None and os.getenv("TWITTER_KB_RECENCY_HALF_LIFE_HOURS"):
+            recency_half_life_hours = float(os.getenv("TWITTER_KB_RECENCY_HALF_LIFE_HOURS"))
+        rerank = rerank_enabled(rerank)
+        if diversity is None:
+            diversity = float(os.getenv("TWITTER_KB_MMR_LAMBDA", "0.7"))
+        use_mmr = diversity < 1.0
+        
+        keys = [
+            self.query_cache.make_key(
+                query, n_results=n_results, where=where,
+                recency_half_life_hours=recency_half_life_hours, recency_weight=recency_weight, rerank=rerank,
+                diversity=diversity
+            )
+            for query in queries
+        ]
+        per_query = [self.query_cache.get(key) for key in keys]
+        pending = [i for i, cached in enumerate(per_query) if cached is None]
+        if not pending:
+            print_system(f"Served {len(queries)} queries from the query cache")
+            return per_query
+        
+        try:
+            # Over-fetch when re-ranking by recency or diversity so other tweets can move up
+            fetch_count = n_results * 3 if recency_half_life_hours or use_mmr else n_results
+            if rerank:
+                fetch_count = max(fetch_count, get_reranker().candidates)
             
-            if not results['documents'][0]:
-                print_system("No results found in knowledge base")
-                return []
-                
-            formatted_results = []
-            for doc, metadata, distance in zip(
-                results['documents'][0], 
-                results['metadatas'][0],
-                results['distances'][0]
-            ):
-                # Format timestamp for readability
-                created_at = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
-                formatted_date = created_at.strftime('%Y-%m-%d %H:%M:%S UTC')
-                
-                formatted_results.append({
-                    "text": doc,
-                    "metadata": {
-                        **metadata,
-                        "created_at": formatted_date
-                    },
-                    "relevance_score": 1 - distance  # Convert distance to similarity score
-                })
+            query_embeddings = self.embedding_function.embed([queries[i] for i in pending])
+            include = ["documents", "metadatas", "distances"]
+            if use_mmr:
+                include.append("embeddings")
+            results = self._vector_search(query_embeddings, fetch_count, where, include)
             
-            # Sort by relevance score
-            formatted_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+            # Debug logging
+            debug_results = {key: value for key, value in results.items() if key != "embeddings"}
+            print_system(f"Raw query results: {json.dumps(debug_results, indent=2)}")
             
-            print_system(f"Found {len(formatted_results)} relevant tweets")
-            return formatted_results
+            now_ts = datetime.now(timezone.utc).timestamp()
+            for position, i in enumerate(pending):
+                formatted = self._format_results(results, position)
+                if rerank:
+                    distances = results['distances'][position]
+                    top_similarity = distance_to_similarity(distances[0], self.exact_index.space) if distances else None
+                    # Keep every candidate: recency and diversity are applied to the reranked pool below
+                    formatted = get_reranker().rerank(
+                        queries[i], formatted, len(formatted), top_similarity, text_key="text"
+                    )
+                # Rank on one scale: rerank scores where the cross-encoder ran, retrieval similarity otherwise.
+                # Candidates left unscored by an exhausted rerank budget only fill the remaining slots.
+                scored = [result for result in formatted if "rerank_score" in result]
+                unscored = [result for result in formatted if "rerank_score" not in result]
+                pool, unscored = (scored, unscored) if scored else (formatted, [])
+                for result in pool:
+                    relevance = result.get("rerank_score", result["similarity"])
+                    if recency_half_life_hours:
+                        age_hours = max(now_ts - result["metadata"]["created_at_ts"], 0) / 3600
+                        result["recency_score"] = 0.5 ** (age_hours / recency_half_life_hours)
+                        relevance = (1 - recency_weight) * relevance + recency_weight * result["recency_score"]
+                    result["relevance_score"] = relevance
+                pool.sort(key=lambda x: x['relevance_score'], reverse=True)
+                if use_mmr and len(pool) > n_results:
+                    vectors_by_id = dict(zip(results['ids'][position], results['embeddings'][position]))
+                    picked = maximal_marginal_relevance(
+                        [result["relevance_score"] for result in pool],
+                        np.array([vectors_by_id[result["id"]] for result in pool]),
+                        n_results,
+                        diversity
+                    )
+                    pool = [pool[j] for j in picked]
+                per_query[i] = (pool + unscored)[:n_results]
+                self.query_cache.put(keys[i], per_query[i])
+            print_system(f"Found {sum(len(r) for r in per_query)} relevant tweets for {len(queries)} queries")
+            return per_query
             
         except Exception as e:
             print_error(f"Error querying knowledge base: {e}")
+            return [cached or [] for cached in per_query]
+
+    def _vector_search(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict],
+                       include: List[str]) -> Dict:
+        """Nearest-neighbour search: an exact NumPy scan for small collections, Chroma's HNSW index otherwise."""
+        # The manifest generation also moves on writes from other processes
+        generation = (self.query_cache.generation, self.manifest.generation())
+        results = self.exact_index.search(query_embeddings, n_results, where, include, generation)
+        if results is None:
+            results = self.collection.query(
+                query_embeddings=query_embeddings.tolist(),
+                n_results=n_results,
+                where=where,
+                include=include
+            )
+        return results
+
+    def _format_results(self, results: Dict, index: int) -> List[Dict]:
+        """Format the Chroma results for the query at index, most relevant first."""
+        if not results['documents'][index]:
             return []
+            
+        formatted_results = []
+        for tweet_id, doc, metadata, distance in zip(
+            results['ids'][index],
+            results['documents'][index], 
+            results['metadatas'][index],
+            results['distances'][index]
+        ):
+            # Rows written before created_at_ts existed still need a parse
+            created_at_ts = metadata.get("created_at_ts")
+            if created_at_ts is None:
+                created_at_ts = self._parse_created_at(metadata['created_at']).timestamp()
+            
+            # Format timestamp for readability
+            formatted_date = datetime.fromtimestamp(created_at_ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+            similarity = distance_to_similarity(distance, self.exact_index.space)
+            
+            formatted_results.append({
+                "id": tweet_id,
+                "text": doc,
+                "metadata": {
+                    **metadata,
+                    "created_at": formatted_date,
+                    "created_at_ts": created_at_ts
+                },
+                "similarity": similarity,
+                "relevance_score": similarity
+            })
+        
+        # Sort by relevance score
+        formatted_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return formatted_results
 
     def format_query_results(self, results: List[Dict]) -> str:
         """Format query results into a readable string."""
@@ -135,43 +527,134 @@ class TweetKnowledgeBase:
     def get_collection_stats(self) -> Dict:
         """Get statistics about the knowledge base collection."""
         try:
-            count = self.collection.count()
-            metadata = self.collection.get()
+            stats = self.manifest.get_stats()
+            count = stats["count"]
             last_update = None
-            if metadata.get("metadatas"):
-                # Get most recent tweet timestamp
-                last_update = max(m["created_at"] for m in metadata["metadatas"])
-                last_update = datetime.fromisoformat(last_update.replace('Z', '+00:00'))
+            if stats["latest_ts"] is not None:
+                # Most recent tweet timestamp, tracked on every add
+                last_update = datetime.fromtimestamp(stats["latest_ts"], timezone.utc)
             
             print_system(f"Knowledge base contains {count} tweets")
             return {
                 "count": count,
-                "last_update": last_update or datetime.now()
+                "last_update": last_update or datetime.now(),
+                "query_cache": self.query_cache.stats()
             }
         except Exception as e:
             print_error(f"Error getting collection stats: {str(e)}")
             return {"count": 0, "last_update": datetime.now()}
 
+    def export_snapshot(self, path: str) -> Dict:
+        """Write every tweet, with its float16 embedding, to a single snapshot file."""
+        return snapshot.export_snapshot(self.collection, path, self.embedding_function.model_name)
+
+    def import_snapshot(self, path: str) -> int:
+        """Bulk-load a snapshot from export_snapshot without running the embedding model. Returns the row count."""
+        header = snapshot.import_snapshot(
+            self.collection, path, self.embedding_function.model_name, self.client.get_max_batch_size()
+        )
+        self.manifest.record_add(
+            self.collection.count(),
+            max((m["created_at_ts"] for m in header["metadatas"] if m.get("created_at_ts") is not None), default=None)
+        )
+        self.query_cache.invalidate()
+        with self._dedup_lock:
+            if self._dedup_index is not None:
+                # Upserted rows replace their stored fingerprints
+                for tweet_id, document, metadata in zip(header["ids"], header["documents"], header["metadatas"]):
+                    fingerprint = metadata.get("simhash")
+                    self._dedup_index.remove(tweet_id)
+                    self._dedup_index.add(tweet_id, int(fingerprint, 16) if fingerprint else simhash(document),
+                                          metadata.get("author_id"))
+        return header["count"]
+
+    def rebuild(self, tweets: List[Tweet]) -> Dict[str, int]:
+        """Replace every stored tweet with tweets, without the knowledge base ever being empty.
+
+        The new contents are written to a staging collection that is then renamed over the
+        live one. The replaced collection is renamed aside instead of dropped, so queries
+        still holding its handle finish normally; the next rebuild drops it.
+        """
+        staging_name = f"{self.collection_name}_staging"
+        retired_name = f"{self.collection_name}_retired"
+        with self._rebuild_lock:
+            # Leftovers from the previous rebuild (or one that was interrupted)
+            self._drop_collection(retired_name)
+            self._drop_collection(staging_name)
+            staging = TweetKnowledgeBase(
+                staging_name, self.embedding_function.model_name, self.embedding_function.backend,
+                persist_path=self.persist_path, index_settings=self.index_settings, bucket_days=self.bucket_days
+            )
+            staging.manifest.reset()
+            staging.dedup_enabled = self.dedup_enabled
+            counts = staging.upsert_tweets(tweets)
+
+            print_system(f"Swapping rebuilt knowledge base into '{self.collection_name}'...")
+            retired = self.collection
+            if isinstance(retired, BucketedCollection):
+                retired.rename(retired_name)
+                staging.collection.rename(self.collection_name)
+                # Reopen so the live object sees exactly the renamed buckets
+                collection = self._open_collection(self.collection_name)
+            else:
+                retired.modify(name=retired_name)
+                staging.collection.modify(name=self.collection_name)
+                collection = staging.collection
+            self.exact_index = ExactSearchIndex(collection, self.index_settings.exact_search_threshold)
+            self.collection = collection
+
+            self.manifest.reset()
+            self.manifest.set_stats(collection.count(), staging.manifest.get_stats()["latest_ts"])
+            staging.manifest.reset()
+            self.query_cache.invalidate()
+            with self._dedup_lock:
+                self._dedup_index = None
+        return counts
+
     def clear_collection(self) -> bool:
         """Clear all tweets from the knowledge base."""
         try:
             print_system("Clearing knowledge base collection...")
-            ids = self.collection.get()["ids"]
-            if ids:  # Only attempt to delete if there are IDs
-                self.collection.delete(ids=ids)
-                print_system("Knowledge base cleared successfully")
+            # Dropping collections is O(1) in rows, unlike fetching and deleting every ID
+            if isinstance(self.collection, BucketedCollection):
+                self.collection.truncate()
             else:
-                print_system("Knowledge base is already empty")
+                self.collection = recreate_collection(
+                    self.client, self.collection.name, self.embedding_function, self.index_settings
+                )
+            self.exact_index = ExactSearchIndex(self.collection, self.index_settings.exact_search_threshold)
+            print_system("Knowledge base cleared successfully")
+            self.manifest.reset()
+            self.query_cache.invalidate()
+            self._dedup_index = None
             return True
         except Exception as e:
             print_error(f"Error clearing knowledge base: {str(e)}")
             return False
 
-async def update_knowledge_base(twitter_client: TwitterClient, knowledge_base, kol_list: List[Dict]):
-    """Update the knowledge base with recent tweets from top KOLs."""
+async def update_knowledge_base(twitter_client: TwitterClient, knowledge_base, kol_list: List[Dict],
+                                mode: Optional[str] = None, max_age_days: Optional[float] = None,
+                                max_tweets_per_kol: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """Update the knowledge base with recent tweets from top KOLs.
+
+    In "incremental" mode (the default) tweets are upserted by ID, existing vectors are
+    left alone and old tweets are evicted by age and per-KOL cap afterwards. "rebuild"
+    mode fetches everything first and then swaps in a freshly built collection; any
+    other mode raises ValueError. Returns the
+    inserted/skipped/evicted counts with a status of "ok", "deferred" or "failed" (plus
+    the error), or None if the KOL list was unusable.
+    """
     TOP_KOLS = 5
     TWEETS_PER_KOL = 15
-    REQUEST_DELAY = 5
+    
+    mode = (mode or os.getenv("TWITTER_KB_REFRESH_MODE", "incremental")).lower()
+    if mode not in ("incremental", "rebuild"):
+        raise ValueError(f"Unknown knowledge base refresh mode '{mode}' (expected 'incremental' or 'rebuild')")
+    if max_age_days is None and os.getenv("TWITTER_KB_MAX_AGE_DAYS"):
+        max_age_days = float(os.getenv("TWITTER_KB_MAX_AGE_DAYS"))
+    if max_tweets_per_kol is None:
+        max_tweets_per_kol = int(os.getenv("TWITTER_KB_MAX_TWEETS_PER_KOL", "100"))
+    report = {"status": "ok", "inserted": 0, "collapsed": 0, "skipped": 0, "evicted": 0}
     
     print_system("\n=== Starting Knowledge Base Update ===")
     print_system("Function parameter details:")
@@ -289,52 +772,88 @@ async def update_knowledge_base(twitter_client: TwitterClient, knowledge_base, k
         print_error(f"Error sampling KOLs: {str(e)}")
         return
     
-    # Clear existing knowledge base
+    # Ask the shared rate limiter first instead of queueing requests behind a long wait
+    available_at = twitter_client.next_available("GET", "/2/users/:id/tweets")
+    wait = available_at - datetime.now(timezone.utc).timestamp()
+    if wait > twitter_client.max_rate_limit_wait:
+        print_system(f"User timeline endpoint is rate limited for another {wait:.0f}s; deferring refresh")
+        report["status"] = "deferred"
+        report["deferred_until"] = available_at
+        return report
+    
+    # Fetch every selected KOL concurrently; rate-limit waits are awaited, not slept. Incremental
+    # refreshes only download tweets newer than each KOL's sync cursor; an empty KB or a rebuild
+    # starts again from the latest tweets
+    print_system(f"\n=== Syncing tweets for {len(selected_kols)} KOLs ({mode} refresh) ===")
     try:
-        print_system("\n=== Clearing existing knowledge base ===")
-        knowledge_base.clear_collection()
-        print_system("Knowledge base cleared successfully")
-    except Exception as e:
-        print_error(f"Error clearing knowledge base: {e}")
-        return
+        tweets_by_kol = await twitter_client.sync_many_user_tweets(
+            [kol['user_id'] for kol in selected_kols],
+            initial_results=TWEETS_PER_KOL,
+            advance_cursor=False,
+            ignore_cursor=mode != "incremental" or knowledge_base.manifest.get_stats()["count"] == 0
+        )
+    finally:
+        # Refreshes may run on a short-lived loop (see kb_core.refresher); release its HTTP session
+        await twitter_client.aclose()
+    
+    for kol in selected_kols:
+        tweets = tweets_by_kol.get(kol['user_id']) or []
+        if tweets:
+            print_system(f"Found {len(tweets)} new tweets for {kol['username']}")
+        else:
+            print_system(f"No new tweets for {kol['username']}")
+        all_tweets.extend(tweets)
     
-    # Process each selected KOL
-    print_system("\n=== Processing selected KOLs ===")
-    for i, kol in enumerate(selected_kols, 1):
+    if mode == "incremental" and all_tweets:
         try:
-            print_system(f"\nProcessing KOL {i}/{len(selected_kols)}: {kol['username']}")
-            kol_tweets = []
-            
-            print_system(f"Getting tweets for user {kol['username']} (ID: {kol['user_id']})")
-            tweets = await twitter_client.get_user_tweets(
-                user_id=kol['user_id'],
-                max_results=TWEETS_PER_KOL
+            # One batched upsert embeds every KOL's tweets in a single pass
+            counts = knowledge_base.upsert_tweets(all_tweets)
+            # Only move the cursors once the delta is stored, so a failed write is re-fetched next time
+            twitter_client.commit_cursors(tweets_by_kol)
+            report["inserted"] = counts["inserted"]
+            report["collapsed"] = counts["collapsed"]
+            report["skipped"] = counts["skipped"]
+            print_system(
+                f"Inserted {counts['inserted']} new tweets, collapsed {counts['collapsed']} near-duplicates, "
+                f"skipped {counts['skipped']} already stored"
             )
-            
-            if not tweets:
-                print_system(f"No tweets found for {kol['username']}")
-                continue
-                
-            print_system(f"Found {len(tweets)} tweets")
-            kol_tweets.extend(tweets)
-            
-            if kol_tweets:
-                print_system(f"Adding {len(kol_tweets)} tweets to knowledge base")
-                knowledge_base.add_tweets(kol_tweets)
-            
-            print_system(f"Waiting {REQUEST_DELAY} seconds before next API call...")
-            await asyncio.sleep(REQUEST_DELAY)
-            
         except Exception as e:
-            print_error(f"Error processing KOL {kol['username']}: {str(e)}")
-            continue
+            print_error(f"Error updating knowledge base: {e}")
+            report["status"] = "failed"
+            report["error"] = str(e)
     
-    if all_tweets:
-        print_system(f"\n=== Adding {len(all_tweets)} tweets to knowledge base ===")
+    if mode == "incremental":
+        try:
+            report["evicted"] = knowledge_base.evict_tweets(
+                max_age_days=max_age_days,
+                max_per_author=max_tweets_per_kol,
+                author_ids=[kol['user_id'] for kol in selected_kols]
+            )
+        except Exception as e:
+            print_error(f"Error evicting old tweets: {e}")
+            report["status"] = "failed"
+            report["error"] = str(e)
+    elif all_tweets:
+        # Only swap the collection contents once every KOL has been fetched
+        print_system(f"\n=== Replacing knowledge base with {len(all_tweets)} tweets ===")
         try:
-            knowledge_base.add_tweets(all_tweets)
-            print_system(f"Knowledge base updated successfully at {update_time.strftime('%Y-%m-%d %H:%M:%S UTC')}")
+            previous_count = knowledge_base.collection.count()
+            counts = knowledge_base.rebuild(all_tweets)
+            twitter_client.commit_cursors(tweets_by_kol)
+            report["inserted"] = counts["inserted"]
+            report["collapsed"] = counts["collapsed"]
+            report["skipped"] = counts["skipped"]
+            report["evicted"] = previous_count
         except Exception as e:
             print_error(f"Error updating knowledge base: {e}")
+            report["status"] = "failed"
+            report["error"] = str(e)
     else:
-        print_system("\n=== No tweets to add to knowledge base ===") 
\ No newline at end of file
+        print_system("\n=== No tweets fetched, leaving knowledge base unchanged ===")
+    
+    print_system(
+        f"Knowledge base refresh finished at {update_time.strftime('%Y-%m-%d %H:%M:%S')}: "
+        f"{report['inserted']} inserted, {report['collapsed']} collapsed, {report['skipped']} skipped, "
+        f"{report['evicted']} evicted"
+    )
+    return report
@@ -1,11 +1,91 @@
 import sqlite3
 import os
-from datetime import datetime, timedelta
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
 import json
 
 # Constants
 MENTION_CHECK_INTERVAL = 2 * 60  
 MAX_MENTIONS_PER_INTERVAL = 50  # Adjust based on your API tier limits
+MENTIONS_ENDPOINT = "GET /2/users/:id/mentions"
+
+def state_db_name():
+    """Generate database path based on character file, inside TWITTER_STATE_DIR (default: working directory)."""
+    state_dir = os.getenv('TWITTER_STATE_DIR', '.')
+    character_file = os.getenv('CHARACTER_FILE')
+    if not character_file:
+        return os.path.join(state_dir, 'twitter_state.db')  # fallback to default
+    
+    try:
+        # Extract filename without extension
+        char_name = os.path.splitext(os.path.basename(character_file))[0]
+        return os.path.join(state_dir, f'twitter_state_{char_name}.db')
+    except Exception:
+        return os.path.join(state_dir, 'twitter_state.db')  # fallback to default
+
+class StateConnection:
+    """One long-lived sqlite connection per state database, shared by everything in the process.
+
+    The database runs in WAL mode, so readers never wait for the writer. Reusing a
+    single connection also reuses sqlite3's compiled-statement cache. Access is
+    serialized by an RLock, so the connection can be used from worker threads.
+    """
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(db_name, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.lock = threading.RLock()
+        # Tweet IDs known to be in replied_tweets, shared by every TwitterState on this database
+        self.replied_ids: Optional[Set[str]] = None
+        self._replied_rowid = 0
+        self._data_version: Optional[int] = None
+
+    @contextmanager
+    def transaction(self):
+        """Hold the lock for one transaction, committed on success and rolled back on error."""
+        with self.lock:
+            with self.conn:
+                yield self.conn
+
+    def query(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        """Run a read and return every row."""
+        with self.lock:
+            return self.conn.execute(sql, tuple(params)).fetchall()
+
+    def sync_replied_ids(self) -> Set[str]:
+        """Return the set of replied tweet IDs, first loading rows other connections committed since the last sync.
+
+        PRAGMA data_version only changes when another connection (usually another
+        process) commits, so while nobody else writes this is one cheap pragma.
+        """
+        with self.lock:
+            version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            if self.replied_ids is None or version != self._data_version:
+                rows = self.conn.execute(
+                    'SELECT rowid, tweet_id FROM replied_tweets WHERE rowid > ?', (self._replied_rowid,)
+                ).fetchall()
+                if self.replied_ids is None:
+                    self.replied_ids = set()
+                self.replied_ids.update(row[1] for row in rows)
+                # Replied tweets are never deleted, so new rows always get larger rowids
+                self._replied_rowid = max([self._replied_rowid, *(row[0] for row in rows)])
+                self._data_version = version
+            return self.replied_ids
+
+_state_connections: Dict[str, StateConnection] = {}
+_state_connections_lock = threading.Lock()
+
+def get_state_connection(db_name: Optional[str] = None) -> StateConnection:
+    """Return the shared connection to db_name (default: this character's state database)."""
+    path = os.path.abspath(db_name or state_db_name())
+    with _state_connections_lock:
+        if path not in _state_connections:
+            _state_connections[path] = StateConnection(path)
+        return _state_connections[path]
 
 class TwitterState:
     def __init__(self):
@@ -16,24 +96,16 @@ class TwitterState:
         self.reset_time = None
         # Get character name from env and create DB name
         self.db_name = self._get_db_name()
+        self.db = get_state_connection(self.db_name)
         self._init_db()
         
     def _get_db_name(self):
         """Generate database name based on character file."""
-        character_file = os.getenv('CHARACTER_FILE')
-        if not character_file:
-            return 'twitter_state.db'  # fallback to default
-        
-        try:
-            # Extract filename without extension
-            char_name = os.path.splitext(os.path.basename(character_file))[0]
-            return f'twitter_state_{char_name}.db'
-        except Exception:
-            return 'twitter_state.db'  # fallback to default
+        return state_db_name()
 
     def _init_db(self):
         """Initialize SQLite database for state and replied tweets."""
-        with sqlite3.connect(self.db_name) as conn:
+        with self.db.transaction() as conn:
             # Create replied tweets table
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS replied_tweets (
@@ -60,54 +132,70 @@ class TwitterState:
             
             conn.execute('CREATE INDEX IF NOT EXISTS idx_replied_at ON replied_tweets(replied_at)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_reposted_at ON reposted_tweets(reposted_at)')
+        
+        self.db.sync_replied_ids()
     
     def load(self):
         """Load state from SQLite database."""
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.execute('SELECT key, value FROM twitter_state')
-            for key, value in cursor.fetchall():
-                if key == 'last_mention_id':
-                    self.last_mention_id = value
-                elif key == 'last_check_time':
-                    self.last_check_time = datetime.fromisoformat(value) if value else None
-                elif key == 'reset_time':
-                    self.reset_time = datetime.fromisoformat(value) if value else None
-                elif key == 'mentions_count':
-                    self.mentions_count = int(value)
+        for key, value in self.db.query('SELECT key, value FROM twitter_state'):
+            if key == 'last_mention_id':
+                self.last_mention_id = value
+            elif key == 'last_check_time':
+                self.last_check_time = datetime.fromisoformat(value) if value else None
+            elif key == 'reset_time':
+                self.reset_time = datetime.fromisoformat(value) if value else None
+            elif key == 'mentions_count':
+                self.mentions_count = int(value)
 
     def save(self):
-        """Save state to SQLite database."""
-        with sqlite3.connect(self.db_name) as conn:
-            state_data = {
-                'last_mention_id': self.last_mention_id,
-                'last_check_time': self.last_check_time.isoformat() if self.last_check_time else None,
-                'mentions_count': str(self.mentions_count),
-                'reset_time': self.reset_time.isoformat() if self.reset_time else None
-            }
-            
-            for key, value in state_data.items():
-                conn.execute('''
-                    INSERT OR REPLACE INTO twitter_state (key, value) 
-                    VALUES (?, ?)
-                ''', (key, value))
-            conn.commit()
-  
+        """Save state to SQLite database in a single transaction."""
+        state_data = {
+            'last_mention_id': self.last_mention_id,
+            'last_check_time': self.last_check_time.isoformat() if self.last_check_time else None,
+            'mentions_count': str(self.mentions_count),
+            'reset_time': self.reset_time.isoformat() if self.reset_time else None
+        }
+        with self.db.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO twitter_state (key, value) VALUES (?, ?)',
+                state_data.items()
+            )
 
     def add_replied_tweet(self, tweet_id):
         """Add a tweet ID to the database of replied tweets."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                conn.execute('INSERT OR REPLACE INTO replied_tweets (tweet_id) VALUES (?)', (tweet_id,))
-                conn.commit()
+            self.mark_replied_many([tweet_id])
             return f"Successfully added tweet {tweet_id} to replied tweets database"
         except Exception as e:
             return f"Error adding tweet {tweet_id} to database: {str(e)}"
 
+    def mark_replied_many(self, tweet_ids: Iterable[str]) -> int:
+        """Record several replied tweets in one transaction. Returns the number of IDs written."""
+        ids = list(dict.fromkeys(str(tweet_id) for tweet_id in tweet_ids))
+        if not ids:
+            return 0
+        with self.db.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO replied_tweets (tweet_id) VALUES (?)',
+                ((tweet_id,) for tweet_id in ids)
+            )
+            self.db.sync_replied_ids().update(ids)
+        return len(ids)
+
     def has_replied_to(self, tweet_id):
         """Check if we've already replied to this tweet."""
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.execute('SELECT 1 FROM replied_tweets WHERE tweet_id = ?', (tweet_id,))
-            return cursor.fetchone() is not None
+        return not self.filter_unreplied([tweet_id])
+
+    def filter_unreplied(self, tweet_ids: Iterable[str]) -> List[str]:
+        """Return the tweet IDs we have not replied to yet, in their original order.
+
+        The in-memory set answers every ID, hits and misses alike; it is topped up
+        from sqlite only when another process has written to the database.
+        """
+        ids = [str(tweet_id) for tweet_id in tweet_ids]
+        replied = self.db.sync_replied_ids()
+        with self.db.lock:
+            return [i for i in ids if i not in replied]
 
     def can_check_mentions(self):
         """Check if enough time has passed since last mention check."""
@@ -120,19 +208,20 @@ class TwitterState:
         return time_since_last_check >= MENTION_CHECK_INTERVAL
 
     def update_rate_limit(self):
-        """Update and check rate limits."""
-        now = datetime.now()
-        if not self.reset_time or now >= self.reset_time:
-            self.mentions_count = 0
-            self.reset_time = now + timedelta(minutes=15)
-        
-        self.mentions_count += 1
-        return self.mentions_count <= MAX_MENTIONS_PER_INTERVAL 
+        """Take a mentions call from the shared rate limiter; False if the window's budget is spent.
+
+        Mentions are fetched by the agentkit Twitter provider, whose responses never reach
+        the limiter, so the endpoint gets a local budget of MAX_MENTIONS_PER_INTERVAL per window.
+        """
+        from twitter_agent.rate_limiter import get_rate_limiter
+        limiter = get_rate_limiter()
+        limiter.ensure_budget(MENTIONS_ENDPOINT, MAX_MENTIONS_PER_INTERVAL)
+        return limiter.try_acquire(MENTIONS_ENDPOINT)
 
     def add_reposted_tweet(self, tweet_id: str) -> str:
         """Add a tweet ID to the database of reposted tweets."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.db.transaction() as conn:
                 conn.execute(
                     'INSERT INTO reposted_tweets (tweet_id) VALUES (?)',
                     (tweet_id,)
@@ -143,9 +232,7 @@ class TwitterState:
 
     def has_reposted(self, tweet_id: str) -> bool:
         """Check if we have already reposted a tweet."""
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.execute(
-                'SELECT 1 FROM reposted_tweets WHERE tweet_id = ?',
-                (tweet_id,)
-            )
-            return cursor.fetchone() is not None 
\ No newline at end of file
+        return bool(self.db.query(
+            'SELECT 1 FROM reposted_tweets WHERE tweet_id = ?',
+            (tweet_id,)
+        ))